@@ -0,0 +1,86 @@
+"""Benchmarks parse_listing_page against BeautifulSoup and ``pd.read_html``
+
+Run from the repository root with ``python -m src.benchmarks.bench_listing_parser``,
+optionally followed by paths of listing pages saved from chessgames.com. Without
+them, synthetic pages with the layout of the site are used.
+"""
+
+import io
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from src.extraction.listing import parse_listing_page
+from src.tests.testing import make_listing_page
+
+N_PAGES = 200
+GAMES_PER_PAGE = 25
+
+
+def parse_listing_page_bs4(content: str) -> tuple[pd.DataFrame, list[str], int]:
+    """Previous PageGames and PlayerGames.page_numbers parsing, kept as the baseline"""
+    html = BeautifulSoup(content, "html.parser")
+    table_html = str(html.find_all("table")[1])
+
+    games_df = pd.read_html(io.StringIO(table_html))[2]
+    games_df.columns = games_df.loc[0]
+    games_df = games_df.loc[1:].reset_index(drop=True)
+
+    links = [
+        game["href"]
+        for game in html.find_all("a")
+        if "chessgame?gid=" in game["href"] and game.find("img") is None
+    ]
+
+    # page_numbers parsed the first page again, from scratch
+    html = BeautifulSoup(content, "html.parser")
+    page_numbers = pd.read_html(io.StringIO(str(html.find_all("table")[1])))[0]
+    page_numbers = int(page_numbers[0].iloc[0].split(";")[0].split("of ")[1])
+
+    return games_df, links, page_numbers
+
+
+def synthetic_pages(n_pages: int) -> list[str]:
+    return [
+        make_listing_page(
+            page_number,
+            n_pages,
+            [
+                (f"{page_number}{i}", "Carlsen, Magnus", "Nakamura, Hikaru", 2024)
+                for i in range(GAMES_PER_PAGE)
+            ],
+        )
+        for page_number in range(1, n_pages + 1)
+    ]
+
+
+def timed(function, pages: list[str]) -> tuple[float, list]:
+    start = time.perf_counter()
+    output = [function(page) for page in pages]
+    return time.perf_counter() - start, output
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    pages = (
+        [Path(path).read_text() for path in paths]
+        if paths
+        else synthetic_pages(N_PAGES)
+    )
+
+    bs4_secs, expected = timed(parse_listing_page_bs4, pages)
+    lxml_secs, parsed = timed(parse_listing_page, pages)
+
+    for (games_df, links, page_numbers), listing in zip(expected, parsed):
+        # read_html gives NaN for empty cells, parse_listing_page gives None
+        games_df = games_df.astype(object).where(games_df.notna(), None)
+        assert games_df.values.tolist() == listing.games.values.tolist()
+        assert links == listing.links
+        assert page_numbers == listing.page_numbers
+
+    print(f"{len(pages)} pages")
+    print(f"BeautifulSoup + read_html: {bs4_secs:.2f}s")
+    print(f"parse_listing_page:        {lxml_secs:.2f}s ({bs4_secs / lxml_secs:.1f}x)")
@@ -0,0 +1,78 @@
+"""Benchmarks merge_data against the per-row ``apply(pd.Series)`` expansion
+
+Run from the repository root with ``python -m src.benchmarks.bench_merge_data``.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.extraction.processing import merge_data
+
+N_GAMES = 100_000
+PGN = "1. d4 Nf6 2. c4 e6 3. Nc3 Bb4 4. f3 d5 5. a3 Bxc3+ 6. bxc3 c5 7. cxd5 Nxd5 8.\ndxc5 Qa5 1/2-1/2"
+FENS = [("rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 0 1",) * 2] * 20
+
+
+def merge_data_apply(
+    player_games_input: pd.DataFrame, games_data_input: pd.DataFrame
+) -> pd.DataFrame:
+    """Previous implementation of merge_data, kept as the baseline"""
+    games_data = games_data_input.copy()
+    player_games = player_games_input.copy()
+
+    games_data = player_games.merge(games_data, on="gid")
+    games_data.loc[:, ["fens", "game_type", "pgn"]] = (
+        games_data["data"].apply(pd.Series).drop(columns=["result"])
+    )
+
+    games_data = games_data.drop(columns="data")
+    games_data["pgn"] = games_data["pgn"].str.replace("\n", " ")
+    games_data["pgn"] = games_data["pgn"].str.replace(
+        "( ?1-0)|( ?0-1)|( ?1/2-1/2)", "", regex=True
+    )
+
+    return games_data
+
+
+def synthetic_games(n_games: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    gids = np.arange(n_games).astype(str)
+    player_games = pd.DataFrame(
+        {
+            "gid": gids,
+            "result": "1/2-1/2",
+            "year": 2024,
+            "is_white": np.arange(n_games) % 2 == 0,
+        }
+    )
+    games_data = pd.DataFrame(
+        {
+            "gid": gids,
+            "data": [
+                {"pgn": PGN, "game_type": None, "fens": FENS, "result": "1/2-1/2"}
+                for _ in range(n_games)
+            ],
+        }
+    )
+
+    return player_games, games_data
+
+
+def timed(function, *args) -> tuple[float, pd.DataFrame]:
+    start = time.perf_counter()
+    output = function(*args)
+    return time.perf_counter() - start, output
+
+
+if __name__ == "__main__":
+    player_games, games_data = synthetic_games(N_GAMES)
+
+    apply_secs, expected = timed(merge_data_apply, player_games, games_data)
+    merge_secs, merged = timed(merge_data, player_games, games_data)
+
+    pd.testing.assert_frame_equal(merged[expected.columns], expected, check_dtype=False)
+
+    print(f"{N_GAMES} games")
+    print(f"apply(pd.Series): {apply_secs:.2f}s")
+    print(f"merge_data:       {merge_secs:.2f}s ({apply_secs / merge_secs:.1f}x)")
@@ -0,0 +1,35 @@
+"""Benchmarks tokenizing a whole PGN column with pgns2moves against pgn2array per game
+
+Run from the repository root with ``python -m src.benchmarks.bench_pgns2moves``.
+"""
+
+import time
+
+import pandas as pd
+
+from src.extraction.processing import pgn2array, pgns2moves
+
+from .bench_merge_data import PGN
+
+N_GAMES = 100_000
+
+
+if __name__ == "__main__":
+    pgns = pd.Series([PGN.replace("\n", " ")] * N_GAMES)
+
+    start = time.perf_counter()
+    arrays = [pgn2array(pgn) for pgn in pgns]
+    loop_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    moves = pgns2moves(pgns)
+    batch_secs = time.perf_counter() - start
+
+    assert (
+        moves.values.to_pylist()[: arrays[0].size - 1]
+        == arrays[0].flatten()[:-1].tolist()
+    )
+
+    print(f"{N_GAMES} games")
+    print(f"pgn2array per game: {loop_secs:.2f}s")
+    print(f"pgns2moves:         {batch_secs:.2f}s ({loop_secs / batch_secs:.1f}x)")
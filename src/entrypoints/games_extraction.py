@@ -1,74 +1,161 @@
+"""Scrapes the games of a player from chessgames.com"""
+
+import argparse
 import asyncio
-import time
 
 import pandas as pd
 
+from extraction.cache import ResponseCache
+from extraction.client import HttpClient, HttpStatusError
 from extraction.extraction import GameScrapper, PageGames, PlayerGames
+from extraction.filters import HeaderFilter
+from extraction.game_index import GameIndex
+from extraction.parsing import PgnParsePool, parse_pgn_batch
+from extraction.players import PlayerCache
+from extraction.processing import iter_game_data
+from extraction.rate_limiter import RateLimiter
+from extraction.storage import (
+    GameDataWriter,
+    append_partition,
+    dataset_exists,
+    read_dataset,
+    replace_dataset,
+    write_games,
+)
 
 PLAYER = "Magnus Carlsen"
 MIN_YEAR = 2014
 MAX_YEAR = 2024
 
+# Request budget for chessgames.com
+REQUESTS_PER_SECOND = 2.0
+MAX_CONCURRENCY = 8
+PAGE_WINDOW = 8
+
+# Responses are cached on disk so re-runs do not download unchanged pages again
+CACHE_DIR = "../data/http_cache"
+
+PLAYER_GAMES_PATH = "../data/player_games.parquet"
+GAME_DATA_PATH = "../data/game_data.parquet"
+
+# Events of the games that are not scraped
+EVENTS_OUT = "(blitz)|(bullet)|(simultaneous)|(simul)|(960)|(lichess)|(exhibition)|(speed)|(chess.com)|(fischer)|(titled)"
+
+# Games dropped from their PGN headers, before the game page or the moves are
+# looked at. The listing only shows the event, the headers also tell time controls
+HEADER_FILTER = HeaderFilter(
+    events_out=EVENTS_OUT, game_types=("CLASSICAL", "RAPID", "ARMAGEDDON")
+)
 
-async def get_game_data(gid: str) -> dict[str, str | list[tuple[str]]]:
+# Games stored so far, shared by the runs of every player
+GAME_INDEX_PATH = "../data/game_index.sqlite"
+
+# Facts about players kept between runs, such as how well listed names match them
+PLAYER_CACHE_PATH = "../data/players.sqlite"
+
+
+async def get_game_data(
+    gid: str,
+    client: HttpClient | None = None,
+    parse_pool: PgnParsePool | None = None,
+    game_index: GameIndex | None = None,
+    header_filter: HeaderFilter | None = HEADER_FILTER,
+) -> tuple[str, dict[str, str | list[int] | list[tuple[str]]]] | None:
     """Gets data from a game, using the game id (gid)
 
     Args:
         gid (str): game id from chessgames.com website
+        client (HttpClient | None): shared HTTP client. Defaults to the process-wide one
+        parse_pool (PgnParsePool | None): worker processes that parse the PGN. When
+        None, the PGN is parsed in this process
+        game_index (GameIndex | None): index of the stored games. Games in it are
+        not fetched again
+        header_filter (HeaderFilter | None): filter on the PGN headers, games it
+        drops are not parsed. None keeps every game
 
     Returns:
-        dict[str, str | list[tuple[str]]]: dictionary with game data or
-        None if unable to get data
+        tuple[str, dict[str, str | list[int] | list[tuple[str]]]] | None: gid and
+        dictionary with game data, its positions stored as packed moves, or None if
+        the game is already stored, filtered out, answered with an error status or
+        has no moves
     """
-    game_scrapper = GameScrapper(gid)
+    # Games stored by a previous run, for this or another player, are not fetched
+    if game_index is not None and gid in game_index:
+        return None
 
-    result = await game_scrapper.result
-    game_type = game_scrapper.game_type
+    game_scrapper = GameScrapper(gid, client=client)
 
+    # The game type comes from the PGN headers, the game page is only fetched for
+    # games whose headers do not tell it. Games the server refused are not written,
+    # so they are fetched again on the next run
     try:
-        pgn = await game_scrapper.pgn
-        fens = await game_scrapper.convert_to_fen()
-    except:
+        pgn_text = await game_scrapper.pgn_text()
+
+        if header_filter is not None and not header_filter.keep(pgn_text):
+            return None
+
+        game_type = await game_scrapper.game_type
+
+    except HttpStatusError:
+        return None
+
+    # Parsing is CPU bound, so it runs away from the event loop when there is a pool
+    if parse_pool is not None:
+        parsed_game = await parse_pool.parse(pgn_text)
+    else:
+        parsed_game = parse_pgn_batch([pgn_text])[0]
+
+    if parsed_game is None:
         return None
 
     return (
         gid,
         {
-            "pgn": pgn,
+            "pgn": parsed_game["pgn"],
             "game_type": game_type,
-            "fens": fens,
-            "result": result,
+            "fens": parsed_game["fens"],
+            "result": parsed_game["result"],
+            "packed_moves": parsed_game["packed_moves"],
         },
     )
 
 
-async def main():
-    # Get player page
-    player = PlayerGames(PLAYER)
+async def scrape_games(
+    gids: list[str],
+    client: HttpClient,
+    writer: GameDataWriter,
+    parse_pool: PgnParsePool | None = None,
+    game_index: GameIndex | None = None,
+    dedup_movetext: bool = False,
+) -> int:
+    """Scrapes the data of a list of games, writing each batch as soon as it is done
 
-    #  Get player games in date range
-    player_games = player.get_player_games(max_year=MAX_YEAR, min_year=MIN_YEAR)
-
-    # Remove Blitz games, Simultaneous, Chess.com, 960 and lichess games
-    events_out = "(blitz)|(bullet)|(simultaneous)|(simul)|(960)|(lichess)|(exhibition)|(speed)|(chess.com)|(fischer)|(titled)"
-    player_games = player_games.loc[
-        ~player_games["event/locale"].str.lower().str.contains(events_out, regex=True)
-    ].reset_index(drop=True)
+    Games already written by a previous run are skipped, so an interrupted run
+    resumes where it stopped. With a game index, games already stored for another
+    player are skipped too. With ``dedup_movetext``, a game whose movetext is
+    already stored under another gid is only recorded in the index as a duplicate
+    of it.
 
-    # Export
-    player_games = player_games.drop(columns="links")
-    player_games.to_parquet("../data/player_games.parquet")
+    Args:
+        gids (list[str]): game ids from chessgames.com website
+        client (HttpClient): shared HTTP client
+        writer (GameDataWriter): checkpointed writer of the game data
+        parse_pool (PgnParsePool | None): worker processes that parse the PGNs
+        game_index (GameIndex | None): index of the stored games
+        dedup_movetext (bool): whether games with the movetext of a stored game are
+        only recorded in the index, see ``write_games``. Off by default, a
+        chessgames.com gid already identifies a game
 
-    # Get game data
-    player_games = pd.read_parquet("../data/player_games.parquet")
+    Returns:
+        int: number of games written
+    """
+    gids = [gid for gid in gids if gid not in writer.completed_gids]
 
-    # Async gather pages. We do it batched to avoid timeout issues
+    # Async gather pages. The rate limiter paces requests, batches are flushed to disk
     batch_size = 100
-    gids = player_games["gid"].tolist()
     gid_batches = [gids[i : i + batch_size] for i in range(0, len(gids), batch_size)]
 
-    # List that will store the results
-    game_data_responses = []
+    n_written = 0
 
     for batch_idx, gid_batch in enumerate(gid_batches):
         print(f"Batch {batch_idx + 1} of {len(gid_batches)}")
@@ -76,25 +163,175 @@ async def main():
         game_data_tasks = []
 
         for gid in gid_batch:
-            game_data_tasks.append(get_game_data(gid))
+            game_data_tasks.append(
+                get_game_data(
+                    gid, client=client, parse_pool=parse_pool, game_index=game_index
+                )
+            )
 
         batch_data = await asyncio.gather(*game_data_tasks)
-        game_data_responses.append(batch_data)
 
-        # Sleep for 120 seconds
-        sleep_secs = 120
-        print(f"Sleeping for {sleep_secs} seconds")
-        time.sleep(sleep_secs)
+        # Games that could not be scraped are None, and are retried on the next run
+        batch_data = [item for item in batch_data if item is not None]
+
+        n_written += write_games(
+            batch_data, writer, game_index=game_index, dedup_movetext=dedup_movetext
+        )
+
+    return n_written
+
+
+def filter_events(player_games: pd.DataFrame) -> pd.DataFrame:
+    """Removes Blitz games, Simultaneous, Chess.com, 960 and lichess games
+
+    Args:
+        player_games (pd.DataFrame): games of a player, with their event
+
+    Returns:
+        pd.DataFrame: games of classical events only
+    """
+    return player_games.loc[
+        ~player_games["event/locale"].str.lower().str.contains(EVENTS_OUT, regex=True)
+    ].reset_index(drop=True)
+
+
+def open_game_index(index_path: str, game_data_path: str) -> GameIndex:
+    """Opens the game index, filling it with the stored games the first time
+
+    Args:
+        index_path (str): SQLite file of the index
+        game_data_path (str): parquet dataset of the game data
+
+    Returns:
+        GameIndex: index of every stored game
+    """
+    game_index = GameIndex(index_path)
+
+    # Game data written before there was an index
+    if len(game_index) == 0 and dataset_exists(game_data_path):
+        for games_data in iter_game_data(game_data_path):
+            game_index.add_many(games_data["gid"], games_data["pgn"])
+
+    return game_index
+
+
+def read_stored_games(path: str) -> pd.DataFrame:
+    """Player games stored so far, with a player column even in older datasets
+
+    Args:
+        path (str): parquet file or folder of the player games
+
+    Returns:
+        pd.DataFrame: stored games, None as the player of rows written before
+        there was a player column
+    """
+    if not dataset_exists(path):
+        return pd.DataFrame({"player": [], "gid": [], "year": []}, dtype=object)
+
+    stored_games = read_dataset(path)
+
+    if "player" not in stored_games.columns:
+        stored_games["player"] = None
+
+    return stored_games
+
+
+async def main(incremental: bool = False, dedup_movetext: bool = False):
+    # One pooled, rate limited and cached client for the whole crawl
+    rate_limiter = RateLimiter(
+        rate=REQUESTS_PER_SECOND, max_concurrency=MAX_CONCURRENCY
+    )
+    client = HttpClient(rate_limiter=rate_limiter, cache=ResponseCache(CACHE_DIR))
+
+    # Games of every player crawled so far, each row tagged with its player
+    stored_games = read_stored_games(PLAYER_GAMES_PATH)
+    is_player_game = stored_games["player"] == PLAYER
 
-    game_data_responses_unwrapped = [
-        item for sublist in game_data_responses for item in sublist
-    ]
+    # In incremental mode we only look for games newer than the ones already stored
+    known_gids = None
+    min_year = MIN_YEAR
 
-    game_data_df = pd.DataFrame(game_data_responses_unwrapped, columns=["gid", "data"])
-    game_data_df.to_parquet("../data/game_data.parquet", index=False)
+    if incremental and is_player_game.any():
+        known_games = stored_games.loc[is_player_game]
+        known_gids = set(known_games["gid"])
+        min_year = max(MIN_YEAR, int(known_games["year"].max()))
+
+    # Get player page. Incremental runs look for games added since the last one, so
+    # the newest listing pages and the page count must not come from the caches
+    player_cache = PlayerCache(PLAYER_CACHE_PATH)
+    player = PlayerGames(
+        PLAYER,
+        client=client,
+        player_cache=player_cache,
+        refresh_listing=known_gids is not None,
+    )
+
+    #  Get player games in date range
+    player_games = await player.get_player_games_async(
+        max_year=MAX_YEAR, min_year=min_year, window=PAGE_WINDOW, known_gids=known_gids
+    )
+    player_cache.close()
+
+    if player_games.empty:
+        print("No new games found")
+        await client.close_async()
+        return player_games
+
+    # Remove Blitz games, Simultaneous, Chess.com, 960 and lichess games
+    player_games = filter_events(player_games)
+
+    # Export
+    player_games = player_games.drop(columns="links").assign(player=PLAYER)
+
+    # A full run replaces the games of its player, and keeps the other players'.
+    # Rows without a player predate the column, when every run replaced them all
+    if known_gids is None:
+        other_games = stored_games.loc[stored_games["player"].notna() & ~is_player_game]
+        replace_dataset(
+            pd.concat([other_games, player_games], ignore_index=True),
+            PLAYER_GAMES_PATH,
+        )
+    else:
+        append_partition(player_games, PLAYER_GAMES_PATH)
+
+    # Get game data
+    writer = GameDataWriter(GAME_DATA_PATH)
+    game_index = open_game_index(GAME_INDEX_PATH, GAME_DATA_PATH)
+
+    with PgnParsePool() as parse_pool:
+        n_written = await scrape_games(
+            player_games["gid"].tolist(),
+            client,
+            writer,
+            parse_pool=parse_pool,
+            game_index=game_index,
+            dedup_movetext=dedup_movetext,
+        )
+
+    game_index.close()
+    await client.close_async()
+    print(f"Wrote {n_written} games to {GAME_DATA_PATH}")
 
     return player_games
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only fetch games newer than the ones already stored, appending them as new partitions",
+    )
+    parser.add_argument(
+        "--dedup-movetexts",
+        action="store_true",
+        help="only index games whose moves are already stored under another gid",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        main(
+            incremental=args.incremental,
+            dedup_movetext=args.dedup_movetexts,
+        )
+    )
@@ -1,49 +1,146 @@
+"""Turns the scraped games into (context, next move) examples for training"""
+
+import argparse
+import shutil
+from pathlib import Path
+
 import pandas as pd
 
+from src.extraction.examples import (
+    ExampleStore,
+    ExampleStoreWriter,
+    example_store_exists,
+)
+from src.extraction.game_index import GameIndex
 from src.extraction.processing import (
-    get_positions_with_black,
-    get_positions_with_white,
+    get_positions_sharded,
+    iter_merged_data,
+    iter_positions,
     merge_data,
+    pgns2moves,
+    read_game_data,
 )
+from src.extraction.tokens import MoveVocabulary
 
 SEED = 42
 N_POSITIONS = 12
 BOG_TOKEN = "<BOG>"
 EOG_TOKEN = "<EOG>"
 
+PLAYER_GAMES_PATH = "data/player_games.parquet"
+GAME_DATA_PATH = "data/game_data.parquet"
+
+# Games scraped as duplicates of a stored game are only recorded here
+GAME_INDEX_PATH = "data/game_index.sqlite"
+
+# Token shards and sampled examples, memory mapped by training
+DATASET_DIR = "data/dataset"
+
+# Games read from the parquet files at a time
+BATCH_SIZE = 10_000
+
+
+def open_game_index() -> GameIndex | None:
+    """Index of the stored games, None for data scraped before there was one"""
+    if not Path(GAME_INDEX_PATH).exists():
+        return None
+
+    return GameIndex(GAME_INDEX_PATH)
+
 
 def load_player_games_data() -> pd.DataFrame:
-    player_games = pd.read_parquet("data/player_games.parquet")
-    games_data = pd.read_parquet("data/game_data.parquet")
-    games_data = merge_data(player_games, games_data)
+    player_games = pd.read_parquet(PLAYER_GAMES_PATH)
+    games_data = read_game_data(GAME_DATA_PATH)
+    game_index = open_game_index()
+    games_data = merge_data(player_games, games_data, game_index=game_index)
+
+    if game_index is not None:
+        game_index.close()
+
     return games_data
 
 
-if __name__ == "__main__":
-    player_games_data = load_player_games_data()
-    print(player_games_data.iloc[0])
+def build_example_store(batch_size: int = BATCH_SIZE) -> ExampleStore:
+    """Tokenizes the games and samples their positions into a memory-mapped store
+
+    Games are streamed from the parquet files batch by batch, and each batch is
+    written as soon as its positions are sampled, so the corpus never has to fit
+    in memory. A store left incomplete by an earlier build is cleared first, its
+    shards would otherwise be written twice.
+    """
+
+    shutil.rmtree(DATASET_DIR, ignore_errors=True)
+    game_index = open_game_index()
+
+    def iter_games():
+        return iter_merged_data(
+            PLAYER_GAMES_PATH,
+            GAME_DATA_PATH,
+            batch_size=batch_size,
+            game_index=game_index,
+        )
 
-    white_games = player_games_data[player_games_data["is_white"]].reset_index(
-        drop=True
+    # First pass: the vocabulary needs every move before any game is encoded
+    vocabulary = MoveVocabulary.from_move_batches(
+        pgns2moves(games["pgn"]) for games in iter_games()
     )
-    black_games = player_games_data[~player_games_data["is_white"]].reset_index(
-        drop=True
+
+    # Second pass: sample and write one shard per batch
+    writer = ExampleStoreWriter(DATASET_DIR, vocabulary)
+    positions_batches = iter_positions(
+        iter_games(),
+        seed=SEED,
+        n_positions=N_POSITIONS,
+        special_tokens=(BOG_TOKEN, EOG_TOKEN),
+    )
+
+    for _, positions in positions_batches:
+        writer.write_batch(positions)
+
+    writer.finish()
+
+    if game_index is not None:
+        game_index.close()
+
+    return ExampleStore(DATASET_DIR)
+
+
+def check_positions(player_games_data: pd.DataFrame) -> list[tuple[str, Exception]]:
+    """Generates the positions of every game over all cores, reporting the failures"""
+    results = get_positions_sharded(
+        player_games_data,
+        seed=SEED,
+        n_positions=N_POSITIONS,
+        special_tokens=(BOG_TOKEN, EOG_TOKEN),
+    )
+
+    n_games = sum(len(result.positions) for result in results)
+    errors = [error for result in results for error in result.errors]
+    print(f"{n_games} games with positions, {len(errors)} failed")
+
+    for gid, e in errors:
+        print(f"{gid}: {e!r}")
+
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--check-positions",
+        action="store_true",
+        help="generate the positions of every game in parallel and report the games that fail",
     )
+    args = parser.parse_args()
 
-    # white_games["positions"] = white_games["pgn"].apply(
-    #     lambda x: get_positions_with_white(
-    #         x, seed=SEED, n_positions=N_POSITIONS, special_tokens=(BOG_TOKEN, EOG_TOKEN)
-    #     )
-    # )
-    for i, pgn in enumerate(white_games["pgn"]):
-        try:
-            get_positions_with_white(
-                pgn,
-                seed=SEED,
-                n_positions=N_POSITIONS,
-                special_tokens=(BOG_TOKEN, EOG_TOKEN),
-            )
-        except:
-            print(i)
+    if args.check_positions:
+        check_positions(load_player_games_data())
 
+    # The store only has to be built once, later runs map the files written then
+    elif example_store_exists(DATASET_DIR):
+        example_store = ExampleStore(DATASET_DIR)
+        print(f"{len(example_store)} examples in {DATASET_DIR}")
 
+    else:
+        example_store = build_example_store()
+        print(f"{len(example_store)} examples in {DATASET_DIR}")
@@ -0,0 +1,158 @@
+"""Loads games from local PGN files and archives into the game data
+
+Multi-game PGN dumps (plain, .gz, .bz2 or .zst) are streamed, split into games and
+parsed in worker processes, and written chunk by chunk to the same dataset as the
+scraped games. Games already stored, scraped or from another file, are skipped.
+
+Ingested games have no player_games rows, games_processing builds examples from
+the games of the players only. They join the examples through the game index: when
+a player's scraped game has the movetext of an ingested game, it is recorded as a
+duplicate and merged with the ingested data instead of a copy.
+"""
+
+import argparse
+import itertools
+from pathlib import Path
+
+from entrypoints.games_extraction import (
+    GAME_DATA_PATH,
+    GAME_INDEX_PATH,
+    open_game_index,
+)
+from extraction.filters import HeaderFilter
+from extraction.game_index import GameIndex
+from extraction.ingestion import (
+    file_fingerprint,
+    ingested_gid,
+    open_pgn,
+    parse_pgn_chunks,
+    split_games,
+)
+from extraction.storage import GameDataWriter, write_games
+
+# Games parsed by a worker, and written as one partition, at a time
+CHUNK_SIZE = 1000
+
+
+def ingest_pgn_file(
+    path: str | Path,
+    writer: GameDataWriter,
+    game_index: GameIndex | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_workers: int | None = None,
+    header_filter: HeaderFilter | None = None,
+    dedup_movetext: bool = True,
+) -> int:
+    """Writes the games of a PGN file to the game data
+
+    Each game gets a numeric gid hashed from the contents of the file and its game
+    number (see ``ingested_gid``), so a rerun over the same file skips the chunks
+    already written, and another file with the same name does not.
+
+    Args:
+        path (str | Path): PGN file or archive
+        writer (GameDataWriter): checkpointed writer of the game data
+        game_index (GameIndex | None): index of the stored games. Games whose
+        movetext is already stored are only recorded in it
+        chunk_size (int): games per chunk
+        max_workers (int | None): parsing processes. Defaults to the number of CPUs
+        header_filter (HeaderFilter | None): filter on the headers, games it drops
+        are never sent to the parsing processes. None keeps every game
+        dedup_movetext (bool): whether games with the movetext of a stored game are
+        only recorded in the index, see ``write_games``
+
+    Returns:
+        int: number of games written
+    """
+    path = Path(path)
+    file_id = file_fingerprint(path)
+
+    with open_pgn(path) as pgn_file:
+        games = (
+            (ingested_gid(file_id, game_number), pgn_text)
+            for game_number, pgn_text in enumerate(split_games(pgn_file), start=1)
+        )
+        # Duplicates of stored games are only in the index, not in the written gids
+        new_games = (
+            (gid, pgn_text)
+            for gid, pgn_text in games
+            if gid not in writer.completed_gids
+            and (game_index is None or gid not in game_index)
+            and (header_filter is None or header_filter.keep(pgn_text))
+        )
+        chunks = iter(lambda: list(itertools.islice(new_games, chunk_size)), [])
+
+        n_written = 0
+
+        for rows in parse_pgn_chunks(chunks, max_workers=max_workers):
+            n_written += write_games(
+                rows, writer, game_index=game_index, dedup_movetext=dedup_movetext
+            )
+
+    return n_written
+
+
+def main(
+    paths: list[str],
+    chunk_size: int = CHUNK_SIZE,
+    header_filter: HeaderFilter | None = None,
+    dedup_movetext: bool = True,
+) -> int:
+    writer = GameDataWriter(GAME_DATA_PATH)
+    game_index = open_game_index(GAME_INDEX_PATH, GAME_DATA_PATH)
+
+    n_written = 0
+
+    for path in paths:
+        n_file = ingest_pgn_file(
+            path,
+            writer,
+            game_index,
+            chunk_size=chunk_size,
+            header_filter=header_filter,
+            dedup_movetext=dedup_movetext,
+        )
+        n_written += n_file
+        print(f"{path}: wrote {n_file} games")
+
+    game_index.close()
+
+    return n_written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="PGN files or archives")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--events-out", help="regex of events to skip")
+    parser.add_argument(
+        "--game-types", nargs="+", help="game types to keep, e.g. CLASSICAL RAPID"
+    )
+    parser.add_argument("--min-elo", type=int, help="lowest rating of both players")
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        default=["standard"],
+        help="variants to keep, lowercased",
+    )
+    parser.add_argument("--min-plies", type=int, help="shortest game kept")
+    parser.add_argument(
+        "--keep-duplicate-movetexts",
+        action="store_true",
+        help="store games whose moves are already stored under another gid",
+    )
+    args = parser.parse_args()
+
+    header_filter = HeaderFilter(
+        events_out=args.events_out,
+        game_types=args.game_types,
+        min_elo=args.min_elo,
+        variants=args.variants,
+        min_plies=args.min_plies,
+    )
+    main(
+        args.paths,
+        chunk_size=args.chunk_size,
+        header_filter=header_filter,
+        dedup_movetext=not args.keep_duplicate_movetexts,
+    )
@@ -0,0 +1,317 @@
+"""Scrapes the games of a roster of players from chessgames.com
+
+Every listing page and game of every player is a job on one shared queue, run by a
+fixed number of workers under a single rate limit. Jobs are handed out round robin
+across players, so a roster keeps the request budget busy instead of crawling one
+player after another.
+"""
+
+import argparse
+import asyncio
+import functools
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from entrypoints.games_extraction import (
+    CACHE_DIR,
+    GAME_DATA_PATH,
+    GAME_INDEX_PATH,
+    MAX_CONCURRENCY,
+    MAX_YEAR,
+    MIN_YEAR,
+    PLAYER_CACHE_PATH,
+    REQUESTS_PER_SECOND,
+    filter_events,
+    get_game_data,
+    open_game_index,
+)
+from extraction.cache import ResponseCache
+from extraction.client import HttpClient
+from extraction.extraction import PlayerGames, resolve_players
+from extraction.game_index import GameIndex
+from extraction.parsing import PgnParsePool
+from extraction.players import PlayerCache
+from extraction.rate_limiter import RateLimiter
+from extraction.scheduling import FairQueue, run_jobs
+from extraction.storage import (
+    GameDataWriter,
+    append_partition,
+    dataset_exists,
+    read_dataset,
+    write_games,
+)
+
+# Player games of the whole roster, with a "player" column
+ROSTER_GAMES_PATH = "../data/roster_games.parquet"
+
+# Games written to the game data at a time
+BATCH_SIZE = 100
+
+
+@dataclass
+class PlayerCrawl:
+    """Progress of the listing crawl of one player"""
+
+    player: PlayerGames
+    pending_pages: int = 0
+    stop_page: int | None = None
+    pages: dict[int, pd.DataFrame] = field(default_factory=dict)
+
+
+class RosterCrawl:
+    """Crawl of many players on one shared work queue
+
+    Jobs of a player are, in order: finding its pages, crawling each listing page
+    (newest first) and, once every page is done, scraping each of its games.
+    """
+
+    def __init__(
+        self,
+        client: HttpClient,
+        writer: GameDataWriter,
+        game_index: GameIndex,
+        parse_pool: PgnParsePool,
+        player_cache: PlayerCache | None = None,
+        max_year: int | None = MAX_YEAR,
+        min_year: int | None = MIN_YEAR,
+        player_games_path: str = ROSTER_GAMES_PATH,
+        dedup_movetext: bool = False,
+    ) -> None:
+        self.client = client
+        self.writer = writer
+        self.game_index = game_index
+        self.parse_pool = parse_pool
+        self.player_cache = player_cache
+        self.max_year = max_year
+        self.min_year = min_year
+        self.player_games_path = player_games_path
+        self.dedup_movetext = dedup_movetext
+
+        self.queue = FairQueue()
+        self.errors = []
+        self.n_written = 0
+        self._queued_gids = set()
+        self._batch = []
+
+        # Games of each player stored by earlier runs, which are not appended again
+        self._stored_games = set()
+        if dataset_exists(player_games_path):
+            stored_games = read_dataset(player_games_path, columns=["player", "gid"])
+            self._stored_games = set(zip(stored_games["player"], stored_games["gid"]))
+
+    async def run(self, players: list[str], n_workers: int) -> int:
+        """Crawls every player and scrapes their games
+
+        Args:
+            players (list[str]): names of the players
+            n_workers (int): jobs running at the same time
+
+        Returns:
+            int: number of games written
+        """
+        # Pids and page counts of the whole roster are resolved concurrently first
+        resolved_players = await resolve_players(
+            players, client=self.client, player_cache=self.player_cache
+        )
+
+        for name, player in resolved_players.items():
+            if player is None:
+                self.on_error(name, ValueError(f"Could not resolve {name}"))
+                continue
+
+            self.queue.put(name, functools.partial(self.find_pages, player))
+
+        await run_jobs(self.queue, n_workers, on_error=self.on_error)
+        self.flush()
+
+        return self.n_written
+
+    def on_error(self, name: str, e: Exception) -> None:
+        self.errors.append((name, e))
+        print(f"{name}: {e!r}")
+
+    async def find_pages(self, player: PlayerGames) -> None:
+        page_numbers = await player.page_numbers_async()
+
+        crawl = PlayerCrawl(player, pending_pages=page_numbers)
+
+        # The last page holds the newest games, so we walk back in time
+        for page_number in range(page_numbers, 0, -1):
+            self.queue.put(
+                player.player_name,
+                functools.partial(self.crawl_page, crawl, page_number),
+            )
+
+    async def crawl_page(self, crawl: PlayerCrawl, page_number: int) -> None:
+        try:
+            # Pages older than the one that stopped the crawl are not needed
+            if crawl.stop_page is None or page_number > crawl.stop_page:
+                games_df, stop = await crawl.player.get_page_games_async(
+                    page_number, self.max_year, self.min_year
+                )
+                crawl.pages[page_number] = games_df
+
+                if stop:
+                    crawl.stop_page = max(crawl.stop_page or 0, page_number)
+        finally:
+            crawl.pending_pages -= 1
+
+            if crawl.pending_pages == 0:
+                self.queue_games(crawl)
+
+    def queue_games(self, crawl: PlayerCrawl) -> None:
+        """Stores the games found for a player and queues the ones to scrape"""
+        stop_page = crawl.stop_page or 0
+        pages_games = [
+            games_df
+            for page_number, games_df in sorted(crawl.pages.items(), reverse=True)
+            if page_number >= stop_page and games_df.shape[0] > 0
+        ]
+        player_games = crawl.player.join_pages(pages_games)
+
+        if player_games.empty:
+            return
+
+        name = crawl.player.player_name
+        player_games = filter_events(player_games).drop(columns="links")
+        player_games = player_games.drop_duplicates("gid")
+
+        new_games = ~player_games["gid"].map(
+            lambda gid: (name, gid) in self._stored_games
+        )
+        if new_games.any():
+            append_partition(
+                player_games.loc[new_games].assign(player=name), self.player_games_path
+            )
+            self._stored_games.update((name, gid) for gid in player_games["gid"])
+
+        # Games between two players of the roster are only scraped once
+        for gid in player_games["gid"]:
+            if gid in self.writer.completed_gids or gid in self._queued_gids:
+                continue
+
+            self._queued_gids.add(gid)
+            self.queue.put(name, functools.partial(self.scrape_game, gid))
+
+    async def scrape_game(self, gid: str) -> None:
+        game = await get_game_data(
+            gid,
+            client=self.client,
+            parse_pool=self.parse_pool,
+            game_index=self.game_index,
+        )
+
+        if game is not None:
+            self._batch.append(game)
+
+        if len(self._batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the games scraped since the last flush"""
+        batch, self._batch = self._batch, []
+
+        if batch:
+            self.n_written += write_games(
+                batch, self.writer, self.game_index, self.dedup_movetext
+            )
+            print(f"Wrote {self.n_written} games")
+
+
+def read_roster(players: list[str], players_file: str | None) -> list[str]:
+    """Players given on the command line and in a file, one name per line
+
+    Args:
+        players (list[str]): names given on the command line
+        players_file (str | None): text file with one name per line
+
+    Returns:
+        list[str]: unique names, in the order given
+    """
+    if players_file is not None:
+        lines = Path(players_file).read_text().splitlines()
+        players = players + [line.strip() for line in lines if line.strip()]
+
+    return list(dict.fromkeys(players))
+
+
+async def main(
+    players: list[str],
+    n_workers: int = MAX_CONCURRENCY,
+    requests_per_second: float = REQUESTS_PER_SECOND,
+    max_year: int | None = MAX_YEAR,
+    min_year: int | None = MIN_YEAR,
+    dedup_movetext: bool = False,
+) -> int:
+    # One pooled, rate limited and cached client for the whole roster
+    rate_limiter = RateLimiter(rate=requests_per_second, max_concurrency=n_workers)
+    client = HttpClient(rate_limiter=rate_limiter, cache=ResponseCache(CACHE_DIR))
+
+    writer = GameDataWriter(GAME_DATA_PATH)
+    game_index = open_game_index(GAME_INDEX_PATH, GAME_DATA_PATH)
+    player_cache = PlayerCache(PLAYER_CACHE_PATH)
+
+    with PgnParsePool() as parse_pool:
+        crawl = RosterCrawl(
+            client,
+            writer,
+            game_index,
+            parse_pool,
+            player_cache=player_cache,
+            max_year=max_year,
+            min_year=min_year,
+            dedup_movetext=dedup_movetext,
+        )
+        n_written = await crawl.run(players, n_workers)
+
+    game_index.close()
+    player_cache.close()
+    await client.close_async()
+    print(
+        f"Wrote {n_written} games of {len(players)} players, {len(crawl.errors)} errors"
+    )
+
+    return n_written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("players", nargs="*", help="names of the players")
+    parser.add_argument("--players-file", help="text file with one player per line")
+    parser.add_argument("--min-year", type=int, default=MIN_YEAR)
+    parser.add_argument("--max-year", type=int, default=MAX_YEAR)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help="requests in flight at the same time, across all players",
+    )
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=REQUESTS_PER_SECOND,
+        help="request budget shared by all players",
+    )
+    parser.add_argument(
+        "--dedup-movetexts",
+        action="store_true",
+        help="only index games whose moves are already stored under another gid",
+    )
+    args = parser.parse_args()
+
+    roster = read_roster(args.players, args.players_file)
+    if not roster:
+        parser.error("no players given")
+
+    asyncio.run(
+        main(
+            roster,
+            n_workers=args.workers,
+            requests_per_second=args.requests_per_second,
+            max_year=args.max_year,
+            min_year=args.min_year,
+            dedup_movetext=args.dedup_movetexts,
+        )
+    )
@@ -1,3 +1,18 @@
+from .cache import ResponseCache
+from .client import HttpClient, HttpStatusError
 from .extraction import GameScrapper, PageGames, PlayerGames
+from .game_index import GameIndex
+from .players import PlayerCache
+from .rate_limiter import RateLimiter
 
-__all__ = ["GameScrapper", "PlayerGames", "PageGames"]
+__all__ = [
+    "GameScrapper",
+    "PlayerGames",
+    "PageGames",
+    "HttpClient",
+    "HttpStatusError",
+    "RateLimiter",
+    "ResponseCache",
+    "GameIndex",
+    "PlayerCache",
+]
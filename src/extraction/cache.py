@@ -0,0 +1,240 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+# Time to live in seconds for each class of URL, first match wins. None never expires
+DEFAULT_TTLS = (
+    ("viewGamePGN", None),
+    ("chessgame\\?gid=", None),
+    ("chessplayer\\?pid=", 7 * 24 * 3600),
+    ("ezsearch\\.pl", 7 * 24 * 3600),
+    ("chess\\.pl\\?page=", 24 * 3600),
+)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    encoding: str | None
+    etag: str | None
+    last_modified: str | None
+    fresh: bool
+
+
+class ResponseCache:
+    """Persistent, content-addressed cache of HTTP responses keyed by URL
+
+    Bodies are stored once per content hash, so identical pages share a file, and an
+    SQLite index maps each URL to its body and validators (ETag, Last-Modified).
+    Stale entries are revalidated with conditional requests, and the least recently
+    used entries are evicted once the bodies exceed ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int = 2**30,
+        ttls: tuple[tuple[str, int | None], ...] = DEFAULT_TTLS,
+        default_ttl: int | None = 3600,
+    ) -> None:
+        """
+        Args:
+            directory (str | Path): folder where the index and bodies are stored
+            max_bytes (int): maximum total size of the stored bodies
+            ttls (tuple[tuple[str, int | None], ...]): (URL regex, TTL in seconds) pairs
+            default_ttl (int | None): TTL of URLs that match no pattern
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.default_ttl = default_ttl
+
+        (self.directory / "bodies").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.directory / "index.sqlite", check_same_thread=False
+        )
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bodies (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+            CREATE INDEX IF NOT EXISTS responses_digest ON responses (digest);
+            """)
+
+    def ttl(self, url: str) -> int | None:
+        """Time to live of a URL
+
+        Args:
+            url (str): URL of the response
+
+        Returns:
+            int | None: seconds a response stays fresh, None if it never expires
+        """
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+
+        return self.default_ttl
+
+    def _body_path(self, digest: str) -> Path:
+        return self.directory / "bodies" / digest[:2] / digest
+
+    def lookup(self, url: str) -> CachedResponse | None:
+        """Looks up the stored response of a URL
+
+        Args:
+            url (str): URL of the response
+
+        Returns:
+            CachedResponse | None: stored response, or None if the URL is not cached
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, encoding, etag, last_modified, stored_at "
+                "FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            digest, encoding, etag, last_modified, stored_at = row
+
+            try:
+                body = self._body_path(digest).read_bytes()
+            except FileNotFoundError:
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._db.commit()
+                return None
+
+            now = time.time()
+            self._db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url)
+            )
+            self._db.commit()
+
+        ttl = self.ttl(url)
+        fresh = ttl is None or now - stored_at < ttl
+
+        return CachedResponse(body, encoding, etag, last_modified, fresh)
+
+    def store(
+        self,
+        url: str,
+        body: bytes,
+        encoding: str | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        """Stores the response of a URL and evicts old entries if over the size limit
+
+        Args:
+            url (str): URL of the response
+            body (bytes): body of the response
+            encoding (str | None): charset of the body
+            etag (str | None): ETag header of the response
+            last_modified (str | None): Last-Modified header of the response
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._body_path(digest)
+
+        with self._lock:
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_bytes(body)
+                os.replace(tmp_path, path)
+
+            previous = self._db.execute(
+                "SELECT digest FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+
+            now = time.time()
+            self._db.execute(
+                "INSERT OR IGNORE INTO bodies (digest, size) VALUES (?, ?)",
+                (digest, len(body)),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, encoding, etag, last_modified, now, now),
+            )
+
+            if previous is not None and previous[0] != digest:
+                self._drop_body_if_unused(previous[0])
+
+            self._evict()
+            self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """Marks the response of a URL as fresh again, after a 304 Not Modified
+
+        Args:
+            url (str): URL of the response
+        """
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+            self._db.commit()
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored bodies
+
+        Returns:
+            int: size in bytes
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM bodies"
+            ).fetchone()[0]
+
+    def _drop_body_if_unused(self, digest: str) -> None:
+        in_use = self._db.execute(
+            "SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+
+        if in_use is None:
+            self._db.execute("DELETE FROM bodies WHERE digest = ?", (digest,))
+            self._body_path(digest).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        # Drop least recently used URLs until the bodies fit in the size limit
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM bodies"
+        ).fetchone()[0]
+
+        while total > self.max_bytes:
+            oldest = self._db.execute(
+                "SELECT url, digest FROM responses ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+
+            if oldest is None:
+                break
+
+            self._db.execute("DELETE FROM responses WHERE url = ?", (oldest[0],))
+            self._drop_body_if_unused(oldest[1])
+            total = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM bodies"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Closes the index"""
+        self._db.close()
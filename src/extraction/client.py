@@ -0,0 +1,314 @@
+import asyncio
+import contextlib
+from typing import Mapping, NamedTuple
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import CachedResponse, ResponseCache
+from .rate_limiter import RETRY_STATUSES, RateLimiter, parse_retry_after
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36"
+
+# Stands in for the rate limiter when there is none. Usable with both "with" and "async with"
+NULL_THROTTLE = contextlib.nullcontext()
+
+
+class HttpStatusError(Exception):
+    """Error status (4xx or 5xx) still answered once the retries are spent"""
+
+    def __init__(self, url: str, status: int) -> None:
+        super().__init__(f"{status} for {url}")
+        self.url = url
+        self.status = status
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+    encoding: str | None
+
+
+class HttpClient:
+    """Pooled HTTP client shared by every scraper of chessgames.com
+
+    A single instance keeps one blocking ``requests.Session`` and one
+    ``aiohttp.ClientSession``, both with keep-alive and a per-host connection
+    limit, so a whole crawl reuses a small set of warm connections. When given a
+    ``RateLimiter``, every request goes through it and 429/503 answers are retried
+    after backing off. When given a ``ResponseCache``, fresh responses are served
+    from disk and stale ones are revalidated with conditional requests.
+    """
+
+    def __init__(
+        self,
+        user_agent: str = USER_AGENT,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 60.0,
+        rate_limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        self.user_agent = user_agent
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._session = None
+        self._async_session = None
+        self._loop = None
+        self._closing = set()
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Headers sent with every request
+
+        Returns:
+            dict[str, str]: request headers
+        """
+        return {"User-Agent": self.user_agent, "Connection": "keep-alive"}
+
+    @property
+    def session(self) -> requests.Session:
+        """Blocking session, created on first use
+
+        Returns:
+            requests.Session: session with a pooled adapter for http and https
+        """
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.limit_per_host,
+                pool_maxsize=self.limit_per_host,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(self.headers)
+            self._session = session
+
+        return self._session
+
+    @property
+    def async_session(self) -> aiohttp.ClientSession:
+        """Async session bound to the running event loop, created on first use
+
+        A session cannot outlive its event loop, so a new one is opened when
+        the client is used from a different loop (e.g. a second ``asyncio.run``).
+        The session of the previous loop is closed in the background, and awaited
+        by ``close_async``.
+
+        Returns:
+            aiohttp.ClientSession: session with a pooled, DNS-caching connector
+        """
+        loop = asyncio.get_running_loop()
+
+        if (
+            self._async_session is None
+            or self._async_session.closed
+            or self._loop is not loop
+        ):
+            if self._async_session is not None and not self._async_session.closed:
+                task = loop.create_task(self._close_stale(self._async_session))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._async_session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._loop = loop
+
+        return self._async_session
+
+    @staticmethod
+    async def _close_stale(session: aiohttp.ClientSession) -> None:
+        """Closes the session of a previous event loop"""
+        # Connections still bound to a closed loop cannot be closed gracefully
+        with contextlib.suppress(RuntimeError):
+            await session.close()
+
+    def _send(self, url: str, headers: dict[str, str]) -> Response:
+        """Sends a request with the blocking session, retrying when throttled"""
+        for attempt in range(self._max_retries + 1):
+            with self._throttle():
+                r = self.session.get(url, headers=headers, timeout=self.timeout)
+
+            response = Response(r.status_code, r.headers, r.content, r.encoding)
+
+            if response.status not in RETRY_STATUSES or attempt == self._max_retries:
+                return response
+
+            self.rate_limiter.backoff(
+                parse_retry_after(response.headers.get("Retry-After")), attempt
+            )
+
+    async def _send_async(self, url: str, headers: dict[str, str]) -> Response:
+        """Sends a request with the async session, retrying when throttled"""
+        for attempt in range(self._max_retries + 1):
+            async with self._throttle():
+                async with self.async_session.get(url, headers=headers) as r:
+                    body = await r.read()
+                    response = Response(r.status, r.headers, body, r.get_encoding())
+
+            if response.status not in RETRY_STATUSES or attempt == self._max_retries:
+                return response
+
+            self.rate_limiter.backoff(
+                parse_retry_after(response.headers.get("Retry-After")), attempt
+            )
+
+    @property
+    def _max_retries(self) -> int:
+        return self.rate_limiter.max_retries if self.rate_limiter is not None else 0
+
+    def _throttle(self) -> RateLimiter | contextlib.nullcontext:
+        return self.rate_limiter if self.rate_limiter is not None else NULL_THROTTLE
+
+    def _lookup(self, url: str) -> tuple[CachedResponse | None, dict[str, str]]:
+        """Looks a URL up in the cache
+
+        Returns:
+            tuple[CachedResponse | None, dict[str, str]]: cached response and the
+            conditional headers to revalidate it
+        """
+        cached = self.cache.lookup(url) if self.cache is not None else None
+        headers = {}
+
+        if cached is not None and cached.etag is not None:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified is not None:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        return cached, headers
+
+    def _resolve(
+        self, url: str, cached: CachedResponse | None, response: Response
+    ) -> tuple[bytes, str | None]:
+        """Keeps the cache up to date with a response
+
+        Returns:
+            tuple[bytes, str | None]: body to return and its charset
+
+        Raises:
+            HttpStatusError: if the server answered with an error status
+        """
+        # Conditional headers are only sent for cached responses
+        if response.status == 304 and cached is not None:
+            self.cache.touch(url)
+            return cached.body, cached.encoding
+
+        if response.status >= 400:
+            raise HttpStatusError(url, response.status)
+
+        if self.cache is not None and response.status == 200:
+            self.cache.store(
+                url,
+                response.body,
+                encoding=response.encoding,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+
+        return response.body, response.encoding
+
+    def get(self, url: str, revalidate: bool = False) -> bytes:
+        """Fetches a URL with the blocking session
+
+        Args:
+            url (str): URL to fetch
+            revalidate (bool): check a cached response with the server even while
+            it is fresh, for pages known to change (e.g. the newest listing page)
+
+        Returns:
+            bytes: body of the response
+
+        Raises:
+            HttpStatusError: if the server answered with an error status, after
+            retrying 429 and 503
+        """
+        cached, headers = self._lookup(url)
+
+        if cached is not None and cached.fresh and not revalidate:
+            return cached.body
+
+        body, _ = self._resolve(url, cached, self._send(url, headers))
+
+        return body
+
+    async def get_async(self, url: str, revalidate: bool = False) -> str:
+        """Fetches a URL with the async session
+
+        Args:
+            url (str): URL to fetch
+            revalidate (bool): check a cached response with the server even while
+            it is fresh, for pages known to change (e.g. the newest listing page)
+
+        Returns:
+            str: decoded body of the response
+
+        Raises:
+            HttpStatusError: if the server answered with an error status, after
+            retrying 429 and 503
+        """
+        cached, headers = self._lookup(url)
+
+        if cached is not None and cached.fresh and not revalidate:
+            body, encoding = cached.body, cached.encoding
+        else:
+            response = await self._send_async(url, headers)
+            body, encoding = self._resolve(url, cached, response)
+
+        return body.decode(encoding or "utf-8", errors="replace")
+
+    def close(self) -> None:
+        """Closes the blocking session"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    async def close_async(self) -> None:
+        """Closes both sessions"""
+        self.close()
+
+        if self._closing:
+            await asyncio.gather(*self._closing)
+
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+
+        self._async_session = None
+        self._loop = None
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close_async()
+
+
+_default_client = None
+
+
+def get_default_client() -> HttpClient:
+    """Client shared by scrapers that are not given one explicitly
+
+    Returns:
+        HttpClient: process-wide default client
+    """
+    global _default_client
+
+    if _default_client is None:
+        _default_client = HttpClient()
+
+    return _default_client
@@ -0,0 +1,295 @@
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from .processing import PositionIndex
+from .tokens import (
+    VOCABULARY_NAME,
+    MoveVocabulary,
+    TokenShards,
+    _save_array,
+    write_token_shard,
+)
+
+# One row per example: where its context is in the token shards and its target id
+EXAMPLE_DTYPE = np.dtype(
+    [
+        ("shard", np.uint16),
+        ("start", np.int64),
+        ("length", np.uint32),
+        ("target", np.uint16),
+    ]
+)
+
+
+# Written once every shard of a store is on disk, a store without it is partial
+COMPLETE_NAME = "_COMPLETE"
+
+
+def _examples_path(directory: Path, shard_index: int) -> Path:
+    return directory / f"shard-{shard_index:05d}.examples.npy"
+
+
+def example_store_exists(directory: str | Path) -> bool:
+    """Whether a complete example store has been written in a folder
+
+    :param directory: folder of the token shards and examples
+    :type directory: str | Path
+    :return: True if the store was finished, a build that stopped halfway is not
+    :rtype: bool
+    """
+    return (Path(directory) / COMPLETE_NAME).exists()
+
+
+def _n_example_shards(directory: Path) -> int:
+    """Shards with their examples on disk, a shard is written before its examples"""
+    n_shards = 0
+    while _examples_path(directory, n_shards).exists():
+        n_shards += 1
+
+    return n_shards
+
+
+def _shard_examples(
+    tokens: np.ndarray,
+    offsets: np.ndarray,
+    shard_index: int,
+    game_indices: np.ndarray,
+    plies: np.ndarray,
+) -> np.ndarray:
+    """Example rows of positions of the games of one shard
+
+    :param game_indices: index of the game of each position within the shard
+    :param plies: ply of each position
+    """
+    # Contexts start at the beginning of game token of their game
+    starts = np.asarray(offsets)[game_indices]
+    lengths = plies.astype(np.int64) + 1
+
+    examples = np.empty(starts.size, dtype=EXAMPLE_DTYPE)
+    examples["shard"] = shard_index
+    examples["start"] = starts
+    examples["length"] = lengths
+    examples["target"] = tokens[starts + lengths]
+
+    return examples
+
+
+def write_examples(positions: PositionIndex, directory: str | Path) -> list[Path]:
+    """Stores sampled positions as (context, next move) examples of the token shards
+
+    The context of a position is the beginning of game token and every move before
+    its ply, and the target is the move played at the ply, or the end of game token
+    when the game ended before it. Only token ranges are stored, not the moves, in
+    one ``shard-NNNNN.examples.npy`` file per token shard.
+
+    :param positions: sampled positions, of the same games (and in the same order)
+    as the shards written by ``write_token_shards`` in ``directory``
+    :type positions: PositionIndex
+    :param directory: folder of the token shards, where the examples are written
+    :type directory: str | Path
+    :return: paths of the examples files
+    :rtype: list[Path]
+    """
+    directory = Path(directory)
+    shards = TokenShards(directory)
+
+    game_indices = positions.game_indices.astype(np.int64)
+    shard_indices = np.searchsorted(shards.shard_starts, game_indices, side="right") - 1
+
+    examples_paths = []
+
+    for shard, (tokens, offsets) in enumerate(zip(shards.tokens, shards.offsets)):
+        in_shard = shard_indices == shard
+        examples = _shard_examples(
+            tokens,
+            offsets,
+            shard,
+            game_indices[in_shard] - shards.shard_starts[shard],
+            positions.plies[in_shard],
+        )
+
+        examples_paths.append(_examples_path(directory, shard))
+        _save_array(examples, examples_paths[-1])
+
+    (directory / COMPLETE_NAME).touch()
+
+    return examples_paths
+
+
+class ExampleStoreWriter:
+    """Builds an example store batch by batch, for corpora that do not fit in memory
+
+    Every batch becomes one token shard and its examples file, written as soon as
+    the batch is done, so memory use only depends on the size of a batch. The store
+    only counts as complete once ``finish`` is called.
+    """
+
+    def __init__(self, directory: str | Path, vocabulary: MoveVocabulary) -> None:
+        """
+        :param directory: folder of the store, appended to if it already has shards
+        :type directory: str | Path
+        :param vocabulary: vocabulary the moves are encoded with. It has to be the
+        vocabulary of the shards already in the folder
+        :type vocabulary: MoveVocabulary
+        :raises ValueError: if the folder has shards encoded with another vocabulary
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vocabulary = vocabulary
+        self.n_shards = _n_example_shards(self.directory)
+
+        vocabulary_path = self.directory / VOCABULARY_NAME
+        if self.n_shards > 0 and vocabulary_path.exists():
+            if MoveVocabulary.load(vocabulary_path).tokens != vocabulary.tokens:
+                raise ValueError(
+                    f"{self.directory} has shards encoded with another vocabulary"
+                )
+
+        self.vocabulary.save(vocabulary_path)
+
+        # Appending makes the store partial again until the writer is finished
+        (self.directory / COMPLETE_NAME).unlink(missing_ok=True)
+
+    def write_batch(self, positions: PositionIndex) -> int:
+        """Writes the games of a batch as a token shard, and their positions
+
+        :param positions: sampled positions of the batch, with its moves
+        :type positions: PositionIndex
+        :return: number of examples written
+        :rtype: int
+        """
+        if len(positions.moves) == 0:
+            return 0
+
+        ids, offsets = self.vocabulary.encode(positions.moves)
+        examples = _shard_examples(
+            ids, offsets, self.n_shards, positions.game_indices, positions.plies
+        )
+
+        # Examples go last, a shard only counts once its examples are on disk
+        write_token_shard(ids, offsets, self.directory, self.n_shards)
+        _save_array(examples, _examples_path(self.directory, self.n_shards))
+        self.n_shards += 1
+
+        return examples.size
+
+    def finish(self) -> None:
+        """Marks the store as complete, once every batch has been written"""
+        (self.directory / COMPLETE_NAME).touch()
+
+
+class ExampleStore:
+    """Memory-mapped (context, next move) examples for training
+
+    Examples and token shards are memory mapped read-only, so every worker reading
+    the same folder shares one copy in the page cache. A context is a view into its
+    shard, nothing is copied until examples are padded into a batch.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        """
+        :param directory: folder with the token shards and their examples
+        :type directory: str | Path
+        """
+        self.directory = Path(directory)
+        self.shards = TokenShards(self.directory)
+        self.vocabulary = self.shards.vocabulary
+        # A token shard whose examples were never written (a crash between the
+        # two) is left out, it is always the last one
+        self.examples = [
+            np.load(_examples_path(self.directory, shard), mmap_mode="r")
+            for shard in range(_n_example_shards(self.directory))
+        ]
+
+        # First example of each shard, to find the shard of an example
+        self.example_starts = np.concatenate(
+            [[0], np.cumsum([examples.shape[0] for examples in self.examples])]
+        ).astype(np.int64)
+
+    def __len__(self) -> int:
+        return int(self.example_starts[-1])
+
+    def rows(self, indices: np.ndarray) -> np.ndarray:
+        """Example rows at some indices, read shard by shard
+
+        :param indices: indices of the examples
+        :type indices: np.ndarray
+        :return: rows of ``EXAMPLE_DTYPE``, in the order of ``indices``
+        :rtype: np.ndarray
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        shards = np.searchsorted(self.example_starts, indices, side="right") - 1
+
+        rows = np.empty(indices.size, dtype=EXAMPLE_DTYPE)
+        for shard in np.unique(shards):
+            in_shard = shards == shard
+            rows[in_shard] = self.examples[shard][
+                indices[in_shard] - self.example_starts[shard]
+            ]
+
+        return rows
+
+    def __getitem__(self, i: int) -> tuple[np.ndarray, int]:
+        """Context and target of example ``i``
+
+        :param i: index of the example
+        :type i: int
+        :return: token ids of the context (a view into its shard) and the target id
+        :rtype: tuple[np.ndarray, int]
+        """
+        if not 0 <= i < len(self):
+            raise IndexError(f"Example {i} out of range for {len(self)} examples")
+
+        shard, start, length, target = self.rows([i])[0].tolist()
+        return self.shards.tokens[shard][start : start + length], target
+
+    def batches(
+        self,
+        batch_size: int,
+        shuffle: bool = False,
+        seed: int | None = None,
+        max_length: int | None = None,
+    ) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yields padded batches of examples
+
+        :param batch_size: examples per batch, the last one may be smaller
+        :type batch_size: int
+        :param shuffle: whether to visit the examples in random order, defaults to False
+        :type shuffle: bool, optional
+        :param seed: seed of the shuffle, defaults to None
+        :type seed: int | None, optional
+        :param max_length: longest context kept, longer ones keep their last moves.
+        Defaults to the longest context of each batch
+        :type max_length: int | None, optional
+        :yield: contexts right-padded with the padding id, their lengths and targets
+        :rtype: Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]
+        """
+        order = np.arange(len(self))
+
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+
+        for batch_start in range(0, len(self), batch_size):
+            examples = self.rows(order[batch_start : batch_start + batch_size])
+
+            lengths = examples["length"].astype(np.int64)
+            if max_length is not None:
+                lengths = np.minimum(lengths, max_length)
+
+            contexts = np.full(
+                (examples.shape[0], lengths.max(initial=0)),
+                self.vocabulary.pad_id,
+                dtype=np.uint16,
+            )
+
+            for row, (shard, start, length) in enumerate(
+                zip(examples["shard"], examples["start"], examples["length"])
+            ):
+                end = start + length
+                contexts[row, : lengths[row]] = self.shards.tokens[shard][
+                    end - lengths[row] : end
+                ]
+
+            yield contexts, lengths, examples["target"].copy()
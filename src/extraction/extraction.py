@@ -1,15 +1,17 @@
 import asyncio
 import io
 import re
-from typing import TextIO
+from typing import Iterable, Mapping, TextIO
 
-import aiohttp
 import chess
 import chess.pgn
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
-from rapidfuzz import fuzz
+
+from .client import HttpClient, get_default_client
+from .fens import iter_fens, pair_fens
+from .listing import ListingPage, parse_listing_page, parse_search_page
+from .players import PlayerCache, score_names
 
 
 class PageGames:
@@ -19,70 +21,162 @@ class PageGames:
         self,
         pid: int,
         page_number: int,
+        client: HttpClient | None = None,
+        revalidate: bool = False,
     ) -> None:
         self.pid = pid
         self.page_number = page_number
-        self._html = None
+        self.client = client if client is not None else get_default_client()
+        self.revalidate = revalidate
+        self._listing = None
 
     @property
-    def html(self) -> BeautifulSoup:
-        """HTML of the page
+    def url(self) -> str:
+        """URL of the page
 
         Returns:
-            BeautifulSoup: html of the page containing a player's games
+            str: URL of the page containing a player's games
         """
-        if self._html is None:
-            page_url = f"https://www.chessgames.com/perl/chess.pl?page={self.page_number}&pid={self.pid}"
+        return f"https://www.chessgames.com/perl/chess.pl?page={self.page_number}&pid={self.pid}"
 
-            with requests.Session() as s:
-                r = s.get(
-                    page_url,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36"
-                    },
-                )
-                self._html = BeautifulSoup(r.content, "html.parser")
+    @property
+    def listing(self) -> ListingPage:
+        """Games, links and page count of the page
 
-        return self._html
+        Returns:
+            ListingPage: parsed page containing a player's games
+        """
+        if self._listing is None:
+            content = self.client.get(self.url, revalidate=self.revalidate)
+            self._listing = parse_listing_page(content)
 
-    def process_games_table(self) -> pd.DataFrame:
-        """Extracts games from a player's page
+        return self._listing
+
+    async def fetch_listing(self) -> ListingPage:
+        """Fetches and parses the page without blocking the event loop
 
         Returns:
-            pd.DataFrame: DataFrame with details of the player's games
+            ListingPage: parsed page containing a player's games
         """
+        if self._listing is None:
+            content = await self.client.get_async(self.url, revalidate=self.revalidate)
+            self._listing = parse_listing_page(content)
 
-        # The table at index 1 contains the player's games
-        table_html = str(self.html.find_all("table")[1])
+        return self._listing
 
-        # Reorganize the table so that it is easier to read
-        games_df = pd.read_html(io.StringIO(table_html))[2]
-        games_df.columns = games_df.loc[0]
-        games_df = games_df.loc[1:].reset_index(drop=True)
+    def process_games_table(self) -> pd.DataFrame:
+        """Extracts games from a player's page
 
-        return games_df
+        Returns:
+            pd.DataFrame: DataFrame with details of the player's games
+        """
+        return self.listing.games.copy()
 
-    def extract_games_links(self) -> list:
+    def extract_games_links(self) -> list[str]:
         """Extracts links to games from a player's page
 
         Returns:
-            list: List of links to games
+            list[str]: href of the link to each game, in the order of the games
         """
-
-        games_links = [
-            game
-            for game in self.html.find_all("a")
-            if "chessgame?gid=" in game["href"] and game.find("img") is None
-        ]
-
-        return games_links
+        return list(self.listing.links)
 
 
 class PlayerGames:
-    def __init__(self, player_name: str) -> None:
+    def __init__(
+        self,
+        player_name: str,
+        client: HttpClient | None = None,
+        player_cache: PlayerCache | None = None,
+        refresh_listing: bool = False,
+    ) -> None:
+        """
+        Args:
+            player_name (str): name of the player, as searched for
+            client (HttpClient | None): shared HTTP client. Defaults to the
+            process-wide one
+            player_cache (PlayerCache | None): pids, page counts and name scores
+            kept between runs
+            refresh_listing (bool): revalidate the listing pages and count the pages
+            again, instead of trusting what is cached. Incremental crawls need it to
+            see the games added since the last one
+        """
         self.player_name = player_name
+        self.client = client if client is not None else get_default_client()
+        self.player_cache = player_cache
+        self.refresh_listing = refresh_listing
         self._pid = None
         self._page_numbers = None
+        self._first_page = None
+        self._name_scores = None
+
+    @property
+    def name_scores(self) -> dict[str, float]:
+        """Memo of how well each listed name matches the player
+
+        Returns:
+            dict[str, float]: listed name to score, loaded from the player cache
+        """
+        if self._name_scores is None:
+            self._name_scores = (
+                self.player_cache.name_scores(self.player_name)
+                if self.player_cache is not None
+                else {}
+            )
+
+        return self._name_scores
+
+    def is_white(self, whites: pd.Series, blacks: pd.Series) -> pd.Series:
+        """Whether the player has white in each game, from the listed names
+
+        Every distinct name is scored once, in one batched call, and the scores are
+        memoized (and stored in the player cache) for later pages and runs.
+
+        Args:
+            whites (pd.Series): listed white player of each game
+            blacks (pd.Series): listed black player of each game
+
+        Returns:
+            pd.Series: True where the white name is the closer match to the player
+        """
+        known_names = set(self.name_scores)
+        names = pd.concat([whites, blacks]).fillna("")
+        scores = score_names(self.player_name, names, self.name_scores)
+
+        if self.player_cache is not None and len(self.name_scores) > len(known_names):
+            self.player_cache.add_name_scores(
+                self.player_name,
+                {
+                    name: score
+                    for name, score in self.name_scores.items()
+                    if name not in known_names
+                },
+            )
+
+        n_games = whites.shape[0]
+        return pd.Series(scores[:n_games] > scores[n_games:], index=whites.index)
+
+    @property
+    def search_url(self) -> str:
+        return f"https://www.chessgames.com/perl/ezsearch.pl?search={self.player_name}"
+
+    def _set_pid(self, content: str | bytes) -> int:
+        """Reads the pid from the search results and stores it in the player cache"""
+        pid = parse_search_page(content)
+
+        if pid is None:
+            raise ValueError(f"No player found for {self.player_name}")
+
+        self._pid = pid
+        if self.player_cache is not None:
+            self.player_cache.add_pid(self.player_name, pid)
+
+        return pid
+
+    def _cached_pid(self) -> int | None:
+        if self._pid is None and self.player_cache is not None:
+            self._pid = self.player_cache.pid(self.player_name)
+
+        return self._pid
 
     @property
     def pid(self) -> int:
@@ -92,30 +186,46 @@ class PlayerGames:
         Returns:
             int: The id for the player, if found.
         """
-        if self._pid is None:
-            url_search = (
-                f"https://www.chessgames.com/perl/ezsearch.pl?search={self.player_name}"
-            )
+        if self._cached_pid() is None:
+            self._set_pid(self.client.get(self.search_url))
 
-            with requests.Session() as s:
-                r = s.get(
-                    url_search,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36"
-                    },
-                )
-                html_search = BeautifulSoup(r.content, "html.parser")
+        return self._pid
 
-            # Get all links and filter by the one that contains the player's id (pid)
-            links = html_search.find_all("a")
-            pid_ref = [
-                link["href"] for link in links if "chessplayer?pid" in link["href"]
-            ][0]
+    async def pid_async(self) -> int:
+        """Resolves the pid without blocking the event loop
 
-            self._pid = int(pid_ref.split("pid=")[-1])
+        Returns:
+            int: The id for the player, if found.
+        """
+        if self._cached_pid() is None:
+            self._set_pid(await self.client.get_async(self.search_url))
 
         return self._pid
 
+    def _set_page_numbers(self, first_page: PageGames) -> int:
+        """Keeps the first page, which holds the page count, for the crawl to reuse"""
+        page_numbers = first_page.listing.page_numbers
+
+        if page_numbers is None:
+            raise ValueError(f"No page count in the games of {self.player_name}")
+
+        self._first_page = first_page
+        self._page_numbers = page_numbers
+        if self.player_cache is not None:
+            self.player_cache.add_page_numbers(first_page.pid, page_numbers)
+
+        return page_numbers
+
+    def _cached_page_numbers(self, pid: int) -> int | None:
+        if (
+            self._page_numbers is None
+            and self.player_cache is not None
+            and not self.refresh_listing
+        ):
+            self._page_numbers = self.player_cache.page_numbers(pid)
+
+        return self._page_numbers
+
     @property
     def page_numbers(self) -> int:
         """
@@ -124,70 +234,229 @@ class PlayerGames:
         Returns:
         int: The number of pages of games found for a given player
         """
-        if self._page_numbers is None:
-            base_url = (
-                f"https://www.chessgames.com/perl/chess.pl?page={1}&pid={self.pid}"
-            )
+        if self._cached_page_numbers(self.pid) is None:
+            first_page = self._new_page(self.pid, 1)
+            self._set_page_numbers(first_page)
 
-            with requests.Session() as s:
-                r = s.get(
-                    base_url,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36"
-                    },
-                )
-                html = BeautifulSoup(r.content, "html.parser")
+        return self._page_numbers
 
-            table_games = str(html.find_all("table")[1])
+    async def page_numbers_async(self) -> int:
+        """Finds the number of pages without blocking the event loop
 
-            page_numbers = pd.read_html(io.StringIO(table_games))[0]
-            page_numbers = int(page_numbers[0].iloc[0].split(";")[0].split("of ")[1])
-            self._page_numbers = page_numbers
+        Returns:
+            int: The number of pages of games found for a given player
+        """
+        pid = await self.pid_async()
+
+        if self._cached_page_numbers(pid) is None:
+            first_page = self._new_page(pid, 1)
+            await first_page.fetch_listing()
+            self._set_page_numbers(first_page)
 
         return self._page_numbers
 
+    def _new_page(self, pid: int, page_number: int) -> PageGames:
+        return PageGames(
+            pid, page_number, client=self.client, revalidate=self.refresh_listing
+        )
+
+    def _page(self, page_number: int) -> PageGames:
+        """Page of the player, the first one is not fetched twice"""
+        if page_number == 1 and self._first_page is not None:
+            return self._first_page
+
+        return self._new_page(self.pid, page_number)
+
+    def _filter_page(
+        self,
+        page: PageGames,
+        max_year: int | None,
+        min_year: int | None,
+        known_gids: set[str] | None = None,
+    ) -> tuple[pd.DataFrame, bool]:
+        """Keeps the games of a page that are in the year range and not known yet
+
+        Args:
+            page (PageGames): page of the player, already fetched or fetched on demand
+            max_year (int | None): maximum year to consider for a player's games
+            min_year (int | None): minimum year to consider for a player's games
+            known_gids (set[str] | None): gids already stored, which are dropped
+
+        Returns:
+            tuple[pd.DataFrame, bool]: games to keep and whether the crawl can stop,
+            which happens when older pages only hold older or already known games
+        """
+        games_df = page.process_games_table()
+        games_df["links"] = page.extract_games_links()
+
+        # We ensure that the games are in the correct range, if not, we stop the crawl
+        games_df["Year"] = games_df["Year"].astype(int)
+
+        lower_bound_cond = (
+            games_df["Year"] >= min_year
+            if min_year is not None
+            else pd.Series(True, index=games_df.index)
+        )
+        upper_bound_cond = (
+            games_df["Year"] <= max_year
+            if max_year is not None
+            else pd.Series(True, index=games_df.index)
+        )
+
+        page_years = games_df["Year"]
+        games_df = games_df.loc[(lower_bound_cond) & (upper_bound_cond)]
+
+        # Pages newer than "max_year" are skipped, the first one older than "min_year" ends the crawl
+        stop = (
+            games_df.shape[0] == 0
+            and min_year is not None
+            and bool((page_years < min_year).any())
+        )
+
+        # Pages are sorted by date, so the first page with a known game is the last one to read
+        if known_gids:
+            gids = games_df["links"].str.split("gid=").str[-1]
+            is_known = gids.isin(known_gids)
+            stop = stop or bool(is_known.any())
+            games_df = games_df.loc[~is_known]
+
+        return games_df, stop
+
     def get_player_games(
-        self, max_year: int | None, min_year: int | None
+        self,
+        max_year: int | None,
+        min_year: int | None,
+        known_gids: set[str] | None = None,
     ) -> pd.DataFrame:
         """Finds a player's games in a given year range
 
         Args:
             max_year (int | None): maximum year to consider for a player's games
             min_year (int | None): minimum year to consider for a player's games
+            known_gids (set[str] | None): gids already stored. When given, only newer
+            games are crawled
 
         Returns:
             pd.DataFrame: DataFrame containing games, details and links to it for the player
         """
+        if max_year is not None and min_year is not None:
+            assert (
+                max_year >= min_year
+            ), '"max_year" must be greater than or equal to "min_year"'
+
+        pages_games = []
+
+        # The last page holds the newest games, so we walk back in time
+        for page_number in range(self.page_numbers, 0, -1):
+            page = self._page(page_number)
+            games_df, stop = self._filter_page(page, max_year, min_year, known_gids)
 
-        player_games = pd.DataFrame()
+            if games_df.shape[0] > 0:
+                pages_games.append(games_df)
+
+            if stop:
+                break
+
+        return self._process_player_games(pages_games)
+
+    async def get_player_games_async(
+        self,
+        max_year: int | None,
+        min_year: int | None,
+        window: int = 8,
+        known_gids: set[str] | None = None,
+    ) -> pd.DataFrame:
+        """Finds a player's games in a given year range, fetching pages concurrently
+
+        Pages are fetched in windows of ``window`` pages and filtered in order, so the
+        crawl stops at the same page as ``get_player_games`` does.
+
+        Args:
+            max_year (int | None): maximum year to consider for a player's games
+            min_year (int | None): minimum year to consider for a player's games
+            window (int): number of pages fetched concurrently
+            known_gids (set[str] | None): gids already stored. When given, only newer
+            games are crawled
 
+        Returns:
+            pd.DataFrame: DataFrame containing games, details and links to it for the player
+        """
         if max_year is not None and min_year is not None:
             assert (
                 max_year >= min_year
             ), '"max_year" must be greater than or equal to "min_year"'
 
-        for page_number in range(self.page_numbers, 0, -1):
-            page = PageGames(self.pid, page_number)
+        page_numbers = await self.page_numbers_async()
+        pages_games = []
 
-            games_df = page.process_games_table()
-            games_df["links"] = page.extract_games_links()
+        for first_page in range(page_numbers, 0, -window):
+            pages = [
+                self._page(page_number)
+                for page_number in range(first_page, max(first_page - window, 0), -1)
+            ]
+            await asyncio.gather(*[page.fetch_listing() for page in pages])
 
-            # We ensure that the games are in the correct range, if not, we break the loop
-            games_df["Year"] = games_df["Year"].astype(int)
+            for page in pages:
+                games_df, stop = self._filter_page(page, max_year, min_year, known_gids)
 
-            lower_bound_cond = (
-                games_df["Year"] >= min_year if min_year is not None else True
-            )
-            upper_bound_cond = (
-                games_df["Year"] <= max_year if max_year is not None else True
-            )
+                if games_df.shape[0] > 0:
+                    pages_games.append(games_df)
 
-            games_df = games_df.loc[(lower_bound_cond) & (upper_bound_cond)]
+                if stop:
+                    return self._process_player_games(pages_games)
 
-            if games_df.shape[0] == 0:
-                break
+        return self._process_player_games(pages_games)
+
+    async def get_page_games_async(
+        self,
+        page_number: int,
+        max_year: int | None,
+        min_year: int | None,
+        known_gids: set[str] | None = None,
+    ) -> tuple[pd.DataFrame, bool]:
+        """Fetches and filters a single page, for callers that schedule pages themselves
+
+        ``page_numbers_async`` has to be awaited first.
 
-            player_games = pd.concat([player_games, games_df], ignore_index=True)
+        Args:
+            page_number (int): page of the player to fetch
+            max_year (int | None): maximum year to consider for a player's games
+            min_year (int | None): minimum year to consider for a player's games
+            known_gids (set[str] | None): gids already stored, which are dropped
+
+        Returns:
+            tuple[pd.DataFrame, bool]: games of the page to keep and whether older
+            pages can be skipped, to be joined with ``join_pages``
+        """
+        page = self._page(page_number)
+        await page.fetch_listing()
+
+        return self._filter_page(page, max_year, min_year, known_gids)
+
+    def join_pages(self, pages_games: list[pd.DataFrame]) -> pd.DataFrame:
+        """Joins the games of pages fetched with ``get_page_games_async``
+
+        Args:
+            pages_games (list[pd.DataFrame]): games to keep of each page, newest page first
+
+        Returns:
+            pd.DataFrame: DataFrame containing games, details and links to it for the player
+        """
+        return self._process_player_games(pages_games)
+
+    def _process_player_games(self, pages_games: list[pd.DataFrame]) -> pd.DataFrame:
+        """Joins the games of every page and finds the player's colour
+
+        Args:
+            pages_games (list[pd.DataFrame]): games in range of each crawled page
+
+        Returns:
+            pd.DataFrame: DataFrame containing games, details and links to it for the player
+        """
+        if not pages_games:
+            return pd.DataFrame()
+
+        player_games = pd.concat(pages_games, ignore_index=True)
 
         # Final preprocessing
         player_games = player_games.dropna(axis=1)
@@ -195,9 +464,7 @@ class PlayerGames:
             col.lower().replace(" ", "_") for col in player_games.columns
         ]
 
-        player_games["url"] = "https://www.chessgames.com/" + player_games[
-            "links"
-        ].apply(lambda x: x["href"])
+        player_games["url"] = "https://www.chessgames.com/" + player_games["links"]
 
         player_games["gid"] = player_games["url"].str.split("gid=").str[-1]
 
@@ -209,29 +476,122 @@ class PlayerGames:
             .str.split(" vs ")
         )
 
-        player_games["fuzzy_similarity"] = player_games["players"].apply(
-            lambda x: (
-                (0, fuzz.token_set_ratio(x[0], self.player_name)),
-                (1, fuzz.token_set_ratio(x[1], self.player_name)),
-            )
+        player_games["is_white"] = self.is_white(
+            player_games["players"].str[0], player_games["players"].str[1]
         )
 
-        player_games["is_white"] = player_games["fuzzy_similarity"].apply(
-            lambda x: x[0][1] > x[1][1]
-        )
+        return player_games
 
-        player_games = player_games.drop(columns="fuzzy_similarity")
 
-        return player_games
+async def resolve_players(
+    player_names: Iterable[str],
+    client: HttpClient | None = None,
+    player_cache: PlayerCache | None = None,
+) -> dict[str, PlayerGames | None]:
+    """Resolves the pid and page count of many players concurrently
+
+    Players fresh in the player cache take no request. The others are searched
+    and have their first page fetched concurrently, paced by the client's rate
+    limiter, and the first page is kept for their crawl.
+
+    Args:
+        player_names (Iterable[str]): names of the players
+        client (HttpClient | None): shared HTTP client. Defaults to the process-wide one
+        player_cache (PlayerCache | None): cache of pids and page counts
+
+    Returns:
+        dict[str, PlayerGames | None]: player of each name, ready to crawl, None for
+        the names that could not be resolved
+    """
+    players = {
+        name: PlayerGames(name, client=client, player_cache=player_cache)
+        for name in dict.fromkeys(player_names)
+    }
+    results = await asyncio.gather(
+        *[player.page_numbers_async() for player in players.values()],
+        return_exceptions=True,
+    )
+
+    return {
+        name: None if isinstance(result, Exception) else player
+        for (name, player), result in zip(players.items(), results)
+    }
+
+
+# Fields GameScrapper.scrape can get
+SCRAPE_FIELDS = ("pgn", "result", "fens", "game_type")
+
+# Game types named in the Event header, first match wins
+EVENT_GAME_TYPES = (
+    ("armageddon", "ARMAGEDDON"),
+    ("bullet", "BULLET"),
+    ("blitz", "BLITZ"),
+    ("rapid", "RAPID"),
+)
+
+
+def infer_game_type(headers: Mapping[str, str]) -> str | None:
+    """Infers the game type from the Event and TimeControl headers of a PGN
+
+    The TimeControl of the first period (e.g. "5400+30" or "40/7200:3600") is turned
+    into the time of each player for a 60 move game, base time plus 60 increments,
+    and classified as FIDE does: up to 10 minutes is blitz (bullet under 3), under
+    60 minutes rapid, and 60 minutes or more classical.
+
+    Args:
+        headers (Mapping[str, str]): headers of the game
+
+    Returns:
+        str | None: BULLET, BLITZ, RAPID, CLASSICAL or ARMAGEDDON, None if the
+        headers do not tell
+    """
+    event = headers.get("Event", "").lower()
+
+    for keyword, game_type in EVENT_GAME_TYPES:
+        if keyword in event:
+            return game_type
+
+    time_control = re.fullmatch(
+        "(?:[0-9]+/)?([0-9]+)(?:\\+([0-9]+))?",
+        headers.get("TimeControl", "").split(":")[0],
+    )
+
+    if time_control is None:
+        return None
+
+    base, increment = time_control.groups()
+    duration = int(base) + 60 * int(increment or 0)
+
+    if duration < 180:
+        return "BULLET"
+    if duration <= 600:
+        return "BLITZ"
+    if duration < 3600:
+        return "RAPID"
+    return "CLASSICAL"
 
 
 class GameScrapper:
     """Scrapes games, PGN files, and information from chessgames.com"""
 
-    def __init__(self, gid: str) -> None:
+    def __init__(self, gid: str, client: HttpClient | None = None) -> None:
         self.gid = gid
+        self.client = client if client is not None else get_default_client()
         self._game = None
         self._html = None
+        self._pgn_text = None
+
+    async def pgn_text(self) -> str:
+        """Raw PGN of the game as served by chessgames.com, headers included
+
+        Returns:
+            str: PGN text of the game
+        """
+        if self._pgn_text is None:
+            pgn_buffer = await self._get_pgn_from_url()
+            self._pgn_text = pgn_buffer.getvalue()
+
+        return self._pgn_text
 
     @property
     async def game(self) -> chess.pgn.Game:
@@ -241,15 +601,20 @@ class GameScrapper:
             chess.pgn.Game: object that stores result, FENs and PGN string for entire game
         """
         if self._game is None:
-            pgn_buffer = await self._get_pgn_from_url()
-            self._game = chess.pgn.read_game(pgn_buffer)
+            pgn_text = await self.pgn_text()
+            self._game = chess.pgn.read_game(io.StringIO(pgn_text))
 
         return self._game
 
     @property
-    def html_game(self) -> BeautifulSoup:
+    async def html_game(self) -> BeautifulSoup:
+        """HTML page of the game
+
+        Returns:
+            BeautifulSoup: html of the game page
+        """
         if self._html is None:
-            self._html = self._get_game_data()
+            self._html = await self._get_game_data()
 
         return self._html
 
@@ -265,14 +630,25 @@ class GameScrapper:
         return game.headers["Result"]
 
     @property
-    def game_type(self) -> str | None:
-        """Returns the game type (BLITZ, CLASSICAL, ARMAGGEDON, RAPID, etc.)
+    async def game_type(self) -> str | None:
+        """Returns the game type (BLITZ, CLASSICAL, ARMAGEDDON, RAPID, etc.)
+
+        The type is inferred from the Event and TimeControl headers of the PGN when
+        it has been fetched already, and read from the HTML page of the game
+        otherwise, so most games need a single request.
 
         Returns:
             str | None: game type (time control) if not None. None otherwise
         """
+        if self._pgn_text is not None:
+            # Only the headers are read, the moves are left to the PGN parser
+            headers = chess.pgn.read_headers(io.StringIO(self._pgn_text))
+            game_type = infer_game_type(headers) if headers is not None else None
+
+            if game_type is not None:
+                return game_type
 
-        html_game = self.html_game
+        html_game = await self.html_game
 
         try:
             game_type = html_game.find(class_="gametype_cs_notice").text
@@ -305,19 +681,50 @@ class GameScrapper:
             list[tuple[str]]: containing all positions reached in the game,
             starting from the first move
         """
-        fens = []
         game = await self.game
-        while game.next():
-            fens.append(game.board().fen())
-            game = game.next()
 
-        # Drop the first FEN because its the starting position
-        fens = fens[1:]
+        # The position after the last move has never been stored, so we keep leaving it out
+        fens = list(iter_fens(game))[:-1]
 
         # Pair FENs my move. So the list will contain tuples of FEN
-        fens = list(zip(fens[::2], fens[1::2]))
+        return pair_fens(fens)
+
+    async def scrape(
+        self, fields: Iterable[str] = SCRAPE_FIELDS
+    ) -> dict[str, str | list[tuple[str]] | None]:
+        """Scrapes only the fields asked for, with as few requests as possible
 
-        return fens
+        The PGN endpoint is only requested for pgn, result and fens, and the game
+        page only for a game type that cannot be inferred from the PGN headers. A
+        game type on its own is read from the game page directly.
+
+        The two requests are sequential on purpose: whether the game page is needed
+        is only known once the PGN headers are read, and fetching it alongside the
+        PGN would double the requests of the games whose headers tell their type.
+
+        Args:
+            fields (Iterable[str]): any of "pgn", "result", "fens" and "game_type"
+
+        Returns:
+            dict[str, str | list[tuple[str]] | None]: value of each field asked for
+        """
+        fields = tuple(fields)
+        unknown_fields = set(fields) - set(SCRAPE_FIELDS)
+
+        if unknown_fields:
+            raise ValueError(f"Unknown fields: {sorted(unknown_fields)}")
+
+        if set(fields) & {"pgn", "result", "fens"}:
+            await self.pgn_text()
+
+        getters = {
+            "pgn": lambda: self.pgn,
+            "result": lambda: self.result,
+            "fens": self.convert_to_fen,
+            "game_type": lambda: self.game_type,
+        }
+
+        return {field: await getters[field]() for field in fields}
 
     async def _get_pgn_from_url(self) -> TextIO:
         """Reads PGN from a URL
@@ -330,35 +737,14 @@ class GameScrapper:
             f"https://www.chessgames.com/nodejs/game/viewGamePGN?text=1&gid={self.gid}"
         )
 
-        async with aiohttp.ClientSession() as s:
+        text = await self.client.get_async(url_pgn)
 
-            async with s.get(
-                url_pgn,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36"
-                },
-            ) as r:
-                text = await r.text()
-
-                # Sleep for 1 second
-                asyncio.sleep(1)
-
-                return io.StringIO(text)
+        return io.StringIO(text)
 
     async def _get_game_data(self) -> BeautifulSoup:
 
         url_game = f"https://www.chessgames.com/perl/chessgame?gid={self.gid}"
 
-        async with aiohttp.ClientSession() as s:
-            async with s.get(
-                url_game,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/102.0.0.0 Safari/537.36"
-                },
-            ) as r:
-                html_text = await r.text()
-
-                # Sleep for 1 second
-                asyncio.sleep(1)
+        html_text = await self.client.get_async(url_game)
 
-                return BeautifulSoup(html_text, "html.parser")
+        return BeautifulSoup(html_text, "html.parser")
@@ -0,0 +1,144 @@
+from typing import Iterable, Iterator
+
+import chess
+import chess.pgn
+
+# How each position is written: full FEN, EPD (FEN without move counters) or
+# only the piece placement part of the FEN
+NOTATIONS = {
+    "fen": chess.Board.fen,
+    "epd": chess.Board.epd,
+    "board": chess.Board.board_fen,
+}
+
+
+def iter_fens(game: chess.pgn.Game, notation: str = "fen") -> Iterator[str]:
+    """Yields the position after every move of the main line of a game
+
+    Moves are pushed onto a single board, so a game of n plies costs n move
+    applications instead of the O(n^2) of calling ``node.board()`` on every node.
+
+    Args:
+        game (chess.pgn.Game): parsed game
+        notation (str): "fen", "epd" or "board"
+
+    Yields:
+        Iterator[str]: position after each ply, starting with the first move
+    """
+    encode = NOTATIONS[notation]
+    board = game.board()
+
+    for move in game.mainline_moves():
+        board.push(move)
+        yield encode(board)
+
+
+def iter_games_fens(
+    games: Iterable[chess.pgn.Game], notation: str = "fen"
+) -> Iterator[list[str]]:
+    """Yields the positions of many games, one list per game
+
+    Args:
+        games (Iterable[chess.pgn.Game]): parsed games
+        notation (str): "fen", "epd" or "board"
+
+    Yields:
+        Iterator[list[str]]: position after each ply of each game
+    """
+    for game in games:
+        yield list(iter_fens(game, notation))
+
+
+def pair_fens(fens: list[str]) -> list[tuple[str, str]]:
+    """Pairs consecutive positions by move, white's position first
+
+    Args:
+        fens (list[str]): position after each ply
+
+    Returns:
+        list[tuple[str, str]]: (position after white's move, position after black's move)
+    """
+    return list(zip(fens[::2], fens[1::2]))
+
+
+def encode_move(move: chess.Move) -> int:
+    """Packs a move into 15 bits: from square, to square and promotion piece
+
+    Args:
+        move (chess.Move): move to pack
+
+    Returns:
+        int: from_square | to_square << 6 | promotion << 12, which fits in a uint16
+    """
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(code: int) -> chess.Move:
+    """Unpacks a move packed by ``encode_move``
+
+    Args:
+        code (int): packed move
+
+    Returns:
+        chess.Move: the move
+    """
+    code = int(code)
+    return chess.Move(code & 63, code >> 6 & 63, promotion=(code >> 12) or None)
+
+
+def encode_moves(game: chess.pgn.Game) -> list[int]:
+    """Packs the main line of a game, 2 bytes per ply instead of a ~60 byte FEN
+
+    Packed moves are always replayed from the standard starting position, so games
+    set up from another position (``[SetUp]``/``[FEN]`` headers) are rejected.
+
+    Args:
+        game (chess.pgn.Game): parsed game
+
+    Returns:
+        list[int]: packed moves, see ``encode_move``
+    """
+    if game.board().fen() != chess.STARTING_FEN:
+        raise ValueError(
+            f"Game starts from {game.board().fen()}, not the initial position"
+        )
+
+    return [encode_move(move) for move in game.mainline_moves()]
+
+
+def replay_fens(
+    codes: Iterable[int], notation: str = "fen", board: chess.Board | None = None
+) -> Iterator[str]:
+    """Rebuilds the positions of a game from its packed moves
+
+    Moves are pushed without checking that they are legal, as they were legal
+    when the game was parsed.
+
+    Args:
+        codes (Iterable[int]): packed moves, see ``encode_move``
+        notation (str): "fen", "epd" or "board"
+        board (chess.Board | None): position before the first move. Defaults to the
+        standard starting position
+
+    Yields:
+        Iterator[str]: position after each ply, starting with the first move
+    """
+    encode = NOTATIONS[notation]
+    board = chess.Board() if board is None else board.copy(stack=False)
+
+    for code in codes:
+        board.push(decode_move(code))
+        yield encode(board)
+
+
+def moves_to_fens(codes: Iterable[int]) -> list[tuple[str, str]]:
+    """Rebuilds the stored FENs of a game, as ``GameScrapper.convert_to_fen`` gives them
+
+    Args:
+        codes (Iterable[int]): packed moves, see ``encode_move``
+
+    Returns:
+        list[tuple[str, str]]: FENs paired by move, without the position after the
+        last move
+    """
+    return pair_fens(list(replay_fens(codes))[:-1])
@@ -0,0 +1,104 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+from .extraction import infer_game_type
+
+HEADER = re.compile(r'^\[([A-Za-z0-9_]+)\s+"(.*)"\]\s*$', re.MULTILINE)
+
+
+def pgn_headers(pgn_text: str) -> dict[str, str]:
+    """Header tags of a game, read with a regex instead of the PGN parser
+
+    Only the tag lines are looked at, so this costs a fraction of building the
+    game tree with ``chess.pgn.read_game``.
+
+    Args:
+        pgn_text (str): PGN of a single game
+
+    Returns:
+        dict[str, str]: tag name to value
+    """
+    return dict(HEADER.findall(pgn_text))
+
+
+def _header_int(headers: Mapping[str, str], name: str) -> int | None:
+    """Integer value of a tag, None when it is missing or unknown (e.g. "?")"""
+    try:
+        return int(headers.get(name, ""))
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class HeaderFilter:
+    """Declarative filter on the header tags of a game
+
+    Games are kept when they pass every condition that is set. A tag that is
+    missing or unknown does not drop a game, so sources with sparse headers are not
+    emptied by a filter they cannot answer.
+
+    Attributes:
+        events_out (str | None): regex of events to drop, matched anywhere in the
+        lowercased Event tag
+        game_types (Iterable[str] | None): game types to keep, as ``infer_game_type``
+        reads them from the Event and TimeControl tags
+        min_elo (int | None): lowest WhiteElo and BlackElo kept
+        variants (Iterable[str] | None): variants to keep, lowercased. A game without
+        a Variant tag is standard chess
+        min_plies (int | None): shortest PlyCount kept
+    """
+
+    events_out: str | None = None
+    game_types: Iterable[str] | None = None
+    min_elo: int | None = None
+    variants: Iterable[str] | None = ("standard",)
+    min_plies: int | None = None
+
+    def __call__(self, headers: Mapping[str, str]) -> bool:
+        """Whether a game passes the filter
+
+        Args:
+            headers (Mapping[str, str]): header tags of the game
+
+        Returns:
+            bool: True if the game is kept
+        """
+        if self.events_out is not None and re.search(
+            self.events_out, headers.get("Event", "").lower()
+        ):
+            return False
+
+        if self.variants is not None:
+            variant = headers.get("Variant", "standard").lower()
+            if variant not in self.variants:
+                return False
+
+        if self.game_types is not None:
+            game_type = infer_game_type(headers)
+            if game_type is not None and game_type not in self.game_types:
+                return False
+
+        if self.min_elo is not None:
+            for name in ("WhiteElo", "BlackElo"):
+                elo = _header_int(headers, name)
+                if elo is not None and elo < self.min_elo:
+                    return False
+
+        if self.min_plies is not None:
+            plies = _header_int(headers, "PlyCount")
+            if plies is not None and plies < self.min_plies:
+                return False
+
+        return True
+
+    def keep(self, pgn_text: str) -> bool:
+        """Whether a game passes the filter, reading only its header tags
+
+        Args:
+            pgn_text (str): PGN of a single game, headers included
+
+        Returns:
+            bool: True if the game is kept
+        """
+        return self(pgn_headers(pgn_text))
@@ -0,0 +1,214 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+
+# Parts of a movetext that do not change the game: comments, NAGs, move numbers and
+# the result. Variations are removed separately, as they can be nested
+MOVETEXT_NOISE = re.compile(
+    r"\{[^}]*\}|;[^\n]*|\$[0-9]+|[0-9]+\.+|1-0|0-1|1/2-1/2|\*|[!?]+"
+)
+VARIATION = re.compile(r"\([^()]*\)")
+
+
+def normalize_movetext(pgn: str) -> str:
+    """Reduces a movetext to its moves, so the same game from any source matches
+
+    Args:
+        pgn (str): movetext of a game, with or without comments, variations, move
+        numbers and result
+
+    Returns:
+        str: moves of the main line separated by single spaces
+    """
+    # Innermost variations first, until no parentheses are left
+    n_variations = 1
+    while n_variations:
+        pgn, n_variations = VARIATION.subn(" ", pgn)
+
+    return " ".join(MOVETEXT_NOISE.sub(" ", pgn).split())
+
+
+def movetext_hash(pgn: str) -> str | None:
+    """Hash of the normalized movetext of a game
+
+    Args:
+        pgn (str): movetext of a game
+
+    Returns:
+        str | None: hex SHA-256 of ``normalize_movetext(pgn)``, None when there are
+        no moves (forfeits, unplayed games), which are never the same game
+    """
+    movetext = normalize_movetext(pgn)
+
+    if not movetext:
+        return None
+
+    return hashlib.sha256(movetext.encode()).hexdigest()
+
+
+class GameIndex:
+    """Persistent index of the games already stored, across players and runs
+
+    Every stored gid is recorded with the hash of its normalized movetext. A game
+    whose movetext was already stored under another gid (the same game listed
+    twice, or coming from another source) is recorded as a duplicate pointing to
+    the gid of the stored copy, its canonical gid, and is not stored again.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        Args:
+            path (str | Path): SQLite file of the index
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS games (
+                gid TEXT PRIMARY KEY,
+                movetext_hash TEXT,
+                canonical_gid TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS games_hash ON games (movetext_hash);
+            """)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def __contains__(self, gid: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM games WHERE gid = ?", (gid,)
+            ).fetchone()
+
+        return row is not None
+
+    def _resolve(
+        self, gids: Iterable[str], pgns: Iterable[str | None]
+    ) -> list[tuple[str, str | None, str, bool]]:
+        """(gid, movetext hash, canonical gid, whether it is new) of each game
+
+        Games earlier in the list count as stored for the ones after them.
+        """
+        resolved = []
+        batch_hashes = {}
+        batch_gids = {}
+
+        for gid, pgn in zip(gids, pgns):
+            if gid in batch_gids:
+                resolved.append((gid, None, batch_gids[gid], False))
+                continue
+
+            row = self._db.execute(
+                "SELECT movetext_hash, canonical_gid FROM games WHERE gid = ?", (gid,)
+            ).fetchone()
+
+            if row is not None:
+                resolved.append((gid, row[0], row[1], False))
+                continue
+
+            digest = movetext_hash(pgn) if pgn else None
+            canonical_gid = batch_hashes.get(digest) if digest is not None else None
+
+            if digest is not None and canonical_gid is None:
+                row = self._db.execute(
+                    "SELECT canonical_gid FROM games WHERE movetext_hash = ? LIMIT 1",
+                    (digest,),
+                ).fetchone()
+                canonical_gid = None if row is None else row[0]
+
+            canonical_gid = canonical_gid or gid
+            batch_gids[gid] = canonical_gid
+            if digest is not None:
+                batch_hashes.setdefault(digest, canonical_gid)
+
+            resolved.append((gid, digest, canonical_gid, True))
+
+        return resolved
+
+    def resolve(self, gids: Iterable[str], pgns: Iterable[str | None]) -> list[str]:
+        """Finds the canonical gid of games without recording them
+
+        Args:
+            gids (Iterable[str]): game ids
+            pgns (Iterable[str | None]): movetext of each game. Without it, a game can
+            only be matched by gid
+
+        Returns:
+            list[str]: canonical gid of each game, the gid itself unless the same
+            movetext is stored (or comes earlier in the list) under another gid
+        """
+        with self._lock:
+            return [
+                canonical_gid for _, _, canonical_gid, _ in self._resolve(gids, pgns)
+            ]
+
+    def add(self, gid: str, pgn: str | None = None) -> str:
+        """Records a game once it is stored, or found to be a duplicate
+
+        Args:
+            gid (str): game id
+            pgn (str | None): movetext of the game
+
+        Returns:
+            str: canonical gid of the game
+        """
+        return self.add_many([gid], [pgn])[0]
+
+    def add_many(self, gids: Iterable[str], pgns: Iterable[str | None]) -> list[str]:
+        """Records many games in one transaction
+
+        Args:
+            gids (Iterable[str]): game ids
+            pgns (Iterable[str | None]): movetext of each game
+
+        Returns:
+            list[str]: canonical gid of each game, as ``resolve`` gives them
+        """
+        with self._lock, self._db:
+            resolved = self._resolve(gids, pgns)
+            self._db.executemany(
+                "INSERT INTO games (gid, movetext_hash, canonical_gid) VALUES (?, ?, ?)",
+                [
+                    (gid, digest, canonical_gid)
+                    for gid, digest, canonical_gid, new in resolved
+                    if new
+                ],
+            )
+
+        return [canonical_gid for _, _, canonical_gid, _ in resolved]
+
+    def canonical_gids(self, gids: Iterable[str]) -> dict[str, str]:
+        """Canonical gid of every indexed game among some gids
+
+        Args:
+            gids (Iterable[str]): game ids
+
+        Returns:
+            dict[str, str]: gid to canonical gid, for the gids in the index
+        """
+        gids = list(set(gids))
+        canonical_gids = {}
+
+        # SQLite limits the number of parameters of a query
+        with self._lock:
+            for start in range(0, len(gids), 500):
+                chunk = gids[start : start + 500]
+                rows = self._db.execute(
+                    "SELECT gid, canonical_gid FROM games "
+                    f"WHERE gid IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                canonical_gids.update(rows)
+
+        return canonical_gids
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,211 @@
+import bz2
+import gzip
+import hashlib
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from .extraction import infer_game_type
+from .filters import pgn_headers
+from .parsing import parse_pgn_batch
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Ingested gids have this bit set, scraped chessgames.com gids are far below it
+INGESTED_GID_BIT = 1 << 62
+
+# Bytes of a PGN file hashed to tell it from other files
+FINGERPRINT_BLOCK_SIZE = 1 << 20
+
+
+def file_fingerprint(path: str | Path) -> str:
+    """Identifies a PGN file by its contents, wherever it is and whatever its name
+
+    Only the size and the first block of the file are hashed, so archives of many
+    gigabytes are told apart without reading them twice. Dumps of different months
+    sharing a name (e.g. ``games.pgn.zst``) differ from their first games on.
+
+    Args:
+        path (str | Path): PGN file or archive
+
+    Returns:
+        str: hex digest of the size and the first block of the file
+    """
+    path = Path(path)
+    digest = hashlib.blake2b(str(path.stat().st_size).encode(), digest_size=16)
+
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+
+    return digest.hexdigest()
+
+
+def ingested_gid(file_id: str, game_number: int) -> str:
+    """Gid of a game of a PGN file, numeric like the scraped gids
+
+    The gid is a hash of the file and the position of the game in it, so a rerun
+    over the same file gives the same gids. It fits in an int64 and is at least
+    ``INGESTED_GID_BIT``, out of the range of the chessgames.com gids.
+
+    Args:
+        file_id (str): identifier of the file, see ``file_fingerprint``
+        game_number (int): position of the game in the file, from 1
+
+    Returns:
+        str: decimal gid, as the gids of the scraped games are stored
+    """
+    digest = hashlib.blake2b(f"{file_id}:{game_number}".encode(), digest_size=8)
+    hashed = int.from_bytes(digest.digest(), "big") % INGESTED_GID_BIT
+
+    return str(INGESTED_GID_BIT | hashed)
+
+
+def open_pgn(path: str | Path) -> TextIO:
+    """Opens a PGN file for streaming, decompressing it on the fly
+
+    Compression is told by the suffix: .gz, .bz2 and .zst (which needs the
+    ``zstandard`` package), anything else is read as plain text.
+
+    Args:
+        path (str | Path): PGN file or archive
+
+    Returns:
+        TextIO: text stream of the PGN
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    # Latin-1 archives are common, so undecodable bytes are replaced, not fatal
+    text_options = {"encoding": "utf-8-sig", "errors": "replace", "newline": None}
+
+    if suffix == ".gz":
+        return gzip.open(path, "rt", **text_options)
+
+    if suffix == ".bz2":
+        return bz2.open(path, "rt", **text_options)
+
+    if suffix == ".zst":
+        if zstandard is None:
+            raise ImportError("Reading .zst archives needs the zstandard package")
+
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return io.TextIOWrapper(reader, **text_options)
+
+    return open(path, "r", **text_options)
+
+
+def split_games(lines: Iterable[str]) -> Iterator[str]:
+    """Splits a multi-game PGN stream into the text of each game
+
+    Games are cut where a header line follows movetext, without parsing the moves,
+    so splitting runs at the speed of reading lines.
+
+    Args:
+        lines (Iterable[str]): lines of a PGN file, e.g. the stream of ``open_pgn``
+
+    Yields:
+        Iterator[str]: PGN of each game, headers included
+    """
+    game_lines = []
+    in_movetext = False
+
+    for line in lines:
+        # Escaped lines are comments for other programs
+        if line.startswith("%"):
+            continue
+
+        if line.startswith("[") and in_movetext:
+            yield "".join(game_lines)
+            game_lines = []
+            in_movetext = False
+
+        if not line.strip():
+            if game_lines:
+                game_lines.append(line)
+            continue
+
+        game_lines.append(line)
+
+        if not line.startswith("["):
+            in_movetext = True
+
+    if game_lines:
+        yield "".join(game_lines)
+
+
+def parse_ingested_batch(
+    games: list[tuple[str, str]],
+) -> list[tuple[str, dict[str, str | list[int] | None]]]:
+    """Parses a chunk of games of a PGN file into rows of the game data
+
+    Args:
+        games (list[tuple[str, str]]): gid and PGN (headers included) of each game
+
+    Returns:
+        list[tuple[str, dict[str, str | list[int] | None]]]: gid and data of each game,
+        as ``GameDataWriter.write_batch`` takes them. Games that could not be parsed,
+        or have no moves, are left out. FENs are None, they are rebuilt from the moves
+    """
+    pgn_texts = [pgn_text for _, pgn_text in games]
+    rows = []
+
+    for (gid, pgn_text), parsed_game in zip(games, parse_pgn_batch(pgn_texts)):
+        if parsed_game is None:
+            continue
+
+        rows.append(
+            (
+                gid,
+                {
+                    "pgn": parsed_game["pgn"],
+                    "game_type": infer_game_type(pgn_headers(pgn_text)),
+                    "fens": None,
+                    "result": parsed_game["result"],
+                    "packed_moves": parsed_game["packed_moves"],
+                },
+            )
+        )
+
+    return rows
+
+
+def parse_pgn_chunks(
+    chunks: Iterable[list[tuple[str, str]]],
+    max_workers: int | None = None,
+    max_pending: int | None = None,
+) -> Iterator[list[tuple[str, dict[str, str | list[int] | None]]]]:
+    """Parses chunks of games in worker processes, in the order they come in
+
+    Only ``max_pending`` chunks are in flight at a time, so a file larger than
+    memory is read no faster than the workers parse it.
+
+    Args:
+        chunks (Iterable[list[tuple[str, str]]]): gid and PGN of the games of each
+        chunk
+        max_workers (int | None): number of worker processes. Defaults to the
+        number of CPUs
+        max_pending (int | None): chunks submitted but not yet yielded. Defaults to
+        twice the number of workers
+
+    Yields:
+        Iterator[list[tuple[str, dict[str, str | list[int] | None]]]]: rows of each
+        chunk, as returned by ``parse_ingested_batch``
+    """
+    max_pending = max_pending or 2 * (max_workers or os.cpu_count() or 1)
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk in chunks:
+            pending.append(executor.submit(parse_ingested_batch, chunk))
+
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,90 @@
+import re
+from typing import NamedTuple
+
+import lxml.html
+import pandas as pd
+
+PAGE_NUMBERS = re.compile(r"page [0-9]+ of ([0-9]+)")
+
+
+class ListingPage(NamedTuple):
+    """What a chessgames.com listing page of a player holds"""
+
+    games: pd.DataFrame
+    links: list[str]
+    page_numbers: int | None
+
+
+def _cell_text(cell: lxml.html.HtmlElement) -> str | None:
+    """Text of a table cell with whitespace collapsed, None when it is empty"""
+    text = " ".join(cell.text_content().split())
+    return text or None
+
+
+def _rows(table: lxml.html.HtmlElement) -> list[list[str | None]]:
+    """Text of the cells of the rows of a table, leaving nested tables out"""
+    return [
+        [_cell_text(cell) for cell in row.xpath("./td|./th")]
+        for row in table.xpath("./tr|./thead/tr|./tbody/tr|./tfoot/tr")
+    ]
+
+
+def parse_listing_page(content: str | bytes) -> ListingPage:
+    """Parses a listing page of a player in a single pass of lxml
+
+    The games are in the second table nested in the second table of the page, the
+    first cell of which tells the number of pages ("page 1 of 12; games 1-25 of
+    300"). Rows and links come from the same table, so they always line up.
+
+    Args:
+        content (str | bytes): html of the page
+
+    Returns:
+        ListingPage: games, with the header row as columns and every value as text
+        (None for empty cells), href of the link of each game, and the number of
+        pages of the player (None if the page does not tell)
+    """
+    root = lxml.html.fromstring(content)
+    listing_table = root.xpath("(//table)[2]")[0]
+
+    first_cell = listing_table.xpath("(./tr|./tbody/tr)[1]/td[1]")
+    page_numbers = PAGE_NUMBERS.search(
+        first_cell[0].text_content() if first_cell else ""
+    )
+
+    # The listing table itself comes first, then the navigation table
+    games_table = listing_table.xpath(".//table")[1]
+    header, *rows = _rows(games_table)
+    games = pd.DataFrame(rows, columns=header, dtype=object)
+
+    links = [
+        href
+        for link in games_table.iter("a")
+        if "chessgame?gid=" in (href := link.get("href", ""))
+        and next(link.iter("img"), None) is None
+    ]
+
+    return ListingPage(
+        games=games,
+        links=links,
+        page_numbers=int(page_numbers.groups()[0]) if page_numbers else None,
+    )
+
+
+def parse_search_page(content: str | bytes) -> int | None:
+    """Finds the pid of the first player in the results of a search
+
+    Args:
+        content (str | bytes): html of the ``ezsearch.pl`` results
+
+    Returns:
+        int | None: pid of the first player linked, None if there is none
+    """
+    hrefs = lxml.html.fromstring(content).xpath(
+        '//a[contains(@href, "chessplayer?pid")]/@href'
+    )
+
+    if not hrefs:
+        return None
+
+    return int(hrefs[0].split("pid=")[-1])
@@ -0,0 +1,167 @@
+import asyncio
+import functools
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+import chess.pgn
+
+from .fens import encode_moves, moves_to_fens
+
+
+def parse_pgn(
+    pgn_text: str, with_fens: bool = False
+) -> dict[str, str | list[int] | list[tuple[str]]] | None:
+    """Parses the PGN of a game into its movetext, result and packed moves
+
+    Positions are stored as packed moves (2 bytes per ply) and rebuilt on demand
+    with ``moves_to_fens``, instead of storing a FEN string per ply.
+
+    Args:
+        pgn_text (str): PGN of a single game, headers included
+        with_fens (bool): also return the FENs paired by move, as ``GameScrapper``
+        produces them
+
+    Returns:
+        dict[str, str | list[int] | list[tuple[str]]] | None: pgn (movetext only),
+        result, packed_moves (see ``encode_moves``) and fens (None unless
+        ``with_fens``).
+        None for a text without a game or a game without moves, e.g. an error page
+
+    Raises:
+        ValueError: if the game is set up from a position other than the initial
+        one, which packed moves cannot be replayed from
+    """
+    game = chess.pgn.read_game(io.StringIO(pgn_text))
+
+    if game is None:
+        return None
+
+    moves = encode_moves(game)
+
+    if not moves:
+        return None
+
+    exporter = chess.pgn.StringExporter(headers=False)
+
+    return {
+        "pgn": game.accept(exporter),
+        "result": game.headers["Result"],
+        "packed_moves": moves,
+        "fens": moves_to_fens(moves) if with_fens else None,
+    }
+
+
+def parse_pgn_batch(
+    pgn_texts: list[str],
+) -> list[dict[str, str | list[int] | list[tuple[str]]] | None]:
+    """Parses a chunk of games, the unit of work sent to a worker process
+
+    Args:
+        pgn_texts (list[str]): PGN of each game
+
+    Returns:
+        list[dict[str, str | list[int] | list[tuple[str]]] | None]: parsed games, None for the
+        ones that could not be parsed or have no moves
+    """
+    parsed_games = []
+
+    for pgn_text in pgn_texts:
+        try:
+            parsed_games.append(parse_pgn(pgn_text))
+        except Exception:
+            parsed_games.append(None)
+
+    return parsed_games
+
+
+class PgnParsePool:
+    """Parses PGN text in worker processes so parsing never blocks the event loop
+
+    Games submitted with ``parse`` are grouped into chunks of ``chunk_size`` (or
+    whatever is pending after ``max_delay`` seconds) before being sent to a worker,
+    so the cost of moving data between processes is paid per chunk, not per game.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        chunk_size: int = 16,
+        max_delay: float = 0.05,
+    ) -> None:
+        """
+        Args:
+            max_workers (int | None): number of worker processes. Defaults to the number of CPUs
+            chunk_size (int): games sent to a worker at once
+            max_delay (float): seconds a game waits for its chunk to fill up
+        """
+        self.chunk_size = chunk_size
+        self.max_delay = max_delay
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._pending = []
+        self._timer = None
+
+    async def parse(
+        self, pgn_text: str
+    ) -> dict[str, str | list[int] | list[tuple[str]]] | None:
+        """Parses a game in a worker process
+
+        Args:
+            pgn_text (str): PGN of a single game, headers included
+
+        Returns:
+            dict[str, str | list[int] | list[tuple[str]]] | None: parsed game as returned by
+            ``parse_pgn``, None if it could not be parsed
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((pgn_text, future))
+
+        if len(self._pending) >= self.chunk_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Sends the pending games to a worker as one chunk"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = self._pending, []
+
+        if not pending:
+            return
+
+        pgn_texts = [pgn_text for pgn_text, _ in pending]
+        futures = [future for _, future in pending]
+
+        chunk = asyncio.get_running_loop().run_in_executor(
+            self._executor, parse_pgn_batch, pgn_texts
+        )
+        chunk.add_done_callback(functools.partial(self._deliver, futures))
+
+    @staticmethod
+    def _deliver(futures: list[asyncio.Future], chunk: asyncio.Future) -> None:
+        """Hands the results of a chunk back to the games waiting for them"""
+        for i, future in enumerate(futures):
+            if future.done():
+                continue
+
+            if chunk.cancelled():
+                future.cancel()
+            elif chunk.exception() is not None:
+                future.set_exception(chunk.exception())
+            else:
+                future.set_result(chunk.result()[i])
+
+    def close(self) -> None:
+        """Waits for running chunks and shuts the workers down"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "PgnParsePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,200 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Mapping
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+def score_names(
+    player_name: str, names: Iterable[str], name_scores: dict[str, float]
+) -> np.ndarray:
+    """Similarity of listed names to a player, scoring each distinct name once
+
+    Names missing from ``name_scores`` are scored in a single batched
+    ``process.cdist`` call and added to it, so a memo shared across pages (and
+    runs, see ``PlayerCache``) makes later pages almost free.
+
+    Args:
+        player_name (str): name of the player searched for
+        names (Iterable[str]): names as listed, e.g. the white player of each game
+        name_scores (dict[str, float]): memo of name to score, updated in place
+
+    Returns:
+        np.ndarray: ``fuzz.token_set_ratio`` of each name with the player's name
+    """
+    names = list(names)
+    new_names = list(set(names).difference(name_scores))
+
+    if new_names:
+        scores = process.cdist(
+            [player_name],
+            new_names,
+            scorer=fuzz.token_set_ratio,
+            dtype=np.float64,
+            workers=-1,
+        )[0]
+        name_scores.update(zip(new_names, scores.tolist()))
+
+    return np.array([name_scores[name] for name in names], dtype=np.float64)
+
+
+class PlayerCache:
+    """Persistent facts about players, shared by every run
+
+    Holds the pid a player name resolves to and the number of listing pages of
+    each pid, so a run does not search for the player nor fetch its first page
+    again while they are fresh. It also holds the memo of how well each listed name
+    matches a player, so colours are not scored again for opponents seen in an
+    earlier crawl.
+
+    Page counts grow as players play, and the newest games are on the last page,
+    so they get a short time to live: a stale count misses the newest pages.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        pid_ttl: int | None = 30 * 24 * 3600,
+        page_count_ttl: int | None = 24 * 3600,
+    ) -> None:
+        """
+        Args:
+            path (str | Path): SQLite file of the cache
+            pid_ttl (int | None): seconds a resolved pid is used for. None never
+            expires
+            page_count_ttl (int | None): seconds a page count is used for. None never
+            expires
+        """
+        self.path = Path(path)
+        self.pid_ttl = pid_ttl
+        self.page_count_ttl = page_count_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS name_scores (
+                player TEXT NOT NULL,
+                name TEXT NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (player, name)
+            );
+            CREATE TABLE IF NOT EXISTS pids (
+                player TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS page_counts (
+                pid INTEGER PRIMARY KEY,
+                page_numbers INTEGER NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            """)
+
+    @staticmethod
+    def _is_fresh(stored_at: float, ttl: int | None) -> bool:
+        return ttl is None or time.time() - stored_at < ttl
+
+    def pid(self, player_name: str) -> int | None:
+        """Pid a player name resolved to, while it is fresh
+
+        Args:
+            player_name (str): name of the player, as searched for
+
+        Returns:
+            int | None: pid of the player, None if unknown or expired
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pid, stored_at FROM pids WHERE player = ?", (player_name,)
+            ).fetchone()
+
+        if row is None or not self._is_fresh(row[1], self.pid_ttl):
+            return None
+
+        return row[0]
+
+    def add_pid(self, player_name: str, pid: int) -> None:
+        """Stores the pid a player name resolved to
+
+        Args:
+            player_name (str): name of the player, as searched for
+            pid (int): pid of the player
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pids (player, pid, stored_at) VALUES (?, ?, ?)",
+                (player_name, pid, time.time()),
+            )
+
+    def page_numbers(self, pid: int) -> int | None:
+        """Number of listing pages of a player, while it is fresh
+
+        Args:
+            pid (int): pid of the player
+
+        Returns:
+            int | None: number of pages, None if unknown or expired
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT page_numbers, stored_at FROM page_counts WHERE pid = ?", (pid,)
+            ).fetchone()
+
+        if row is None or not self._is_fresh(row[1], self.page_count_ttl):
+            return None
+
+        return row[0]
+
+    def add_page_numbers(self, pid: int, page_numbers: int) -> None:
+        """Stores the number of listing pages of a player
+
+        Args:
+            pid (int): pid of the player
+            page_numbers (int): number of pages
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO page_counts (pid, page_numbers, stored_at) "
+                "VALUES (?, ?, ?)",
+                (pid, page_numbers, time.time()),
+            )
+
+    def name_scores(self, player_name: str) -> dict[str, float]:
+        """Scores of the names matched against a player so far
+
+        Args:
+            player_name (str): name of the player
+
+        Returns:
+            dict[str, float]: listed name to score
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, score FROM name_scores WHERE player = ?", (player_name,)
+            ).fetchall()
+
+        return dict(rows)
+
+    def add_name_scores(
+        self, player_name: str, name_scores: Mapping[str, float]
+    ) -> None:
+        """Stores new name scores of a player
+
+        Args:
+            player_name (str): name of the player
+            name_scores (Mapping[str, float]): listed name to score
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO name_scores (player, name, score) "
+                "VALUES (?, ?, ?)",
+                [(player_name, name, score) for name, score in name_scores.items()],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
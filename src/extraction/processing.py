@@ -1,40 +1,165 @@
 import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, NamedTuple
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from .game_index import GameIndex
 
 GAMES_SAMPLE = 5
 BEGINNING_OF_GAME_TOKEN = "<BOG>"
 END_OF_GAME_TOKEN = "<EOG>"
 
+# Fields of the nested "data" column of the game data
+GAME_DATA_FIELDS = ("pgn", "game_type", "fens", "result")
+
+
+def expand_game_data(games_data: pd.DataFrame) -> pd.DataFrame:
+    """Turns the nested ``data`` column of the game data into real columns
+
+    The dicts are unpacked field by field in one pass, instead of building a
+    ``pd.Series`` per row. Frames that are already flat are returned as they are.
+
+    :param games_data: fens and pgn for a game, nested in a ``data`` column or not
+    :type games_data: pd.DataFrame
+    :return: game data with one column per field of ``data``
+    :rtype: pd.DataFrame
+    """
+    if "data" not in games_data.columns:
+        return games_data
+
+    records = games_data["data"].tolist()
+    fields = {
+        field: [record.get(field) for record in records] for field in GAME_DATA_FIELDS
+    }
+
+    return games_data.drop(columns="data").assign(**fields)
+
+
+def read_game_data(path: str) -> pd.DataFrame:
+    """Reads game data from parquet with the ``data`` struct already flattened
+
+    Partitions are read one by one and concatenated, so older partitions without
+    the ``packed_moves`` column get nulls for it instead of hiding it from newer
+    ones. Partitions written when it was called ``moves`` are read as well.
+
+    :param path: parquet file or folder of parquet partitions
+    :type path: str
+    :return: gid plus one column per field of ``data``, and the packed moves
+    :rtype: pd.DataFrame
+    """
+    tables = [
+        fragment.to_table().flatten()
+        for fragment in ds.dataset(path, format="parquet").get_fragments()
+    ]
+    tables = [
+        table.rename_columns(
+            ["packed_moves" if name == "moves" else name for name in table.column_names]
+        )
+        for table in tables
+    ]
+    table = pa.concat_tables(tables, promote_options="permissive")
+    table = table.rename_columns(
+        [name.removeprefix("data.") for name in table.column_names]
+    )
+
+    return table.to_pandas()
+
+
+def iter_game_data(
+    path: str, fields: tuple[str, ...] = ("pgn",), batch_size: int = 10_000
+) -> Iterator[pd.DataFrame]:
+    """Streams game data batch by batch, reading only some fields of ``data``
+
+    Batches are read from the parquet row groups one after another, so only one
+    batch is in memory at a time whatever the size of the dataset.
+
+    :param path: parquet file or folder of parquet partitions
+    :type path: str
+    :param fields: fields of ``data`` to read, defaults to ("pgn",)
+    :type fields: tuple[str, ...], optional
+    :param batch_size: maximum rows per batch, defaults to 10_000
+    :type batch_size: int, optional
+    :yield: gid plus one column per field
+    :rtype: Iterator[pd.DataFrame]
+    """
+    dataset = ds.dataset(path, format="parquet")
+    nested = "data" in dataset.schema.names
+
+    columns = {"gid": pc.field("gid")}
+    for field in fields:
+        columns[field] = pc.field("data", field) if nested else pc.field(field)
+
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+        if batch.num_rows > 0:
+            yield batch.to_pandas()
+
+
+def with_data_gids(player_games: pd.DataFrame, game_index: GameIndex) -> pd.DataFrame:
+    """Adds the gid each player game is stored under in the game data
+
+    :param player_games: game information for a player, with a ``gid`` column
+    :type player_games: pd.DataFrame
+    :param game_index: index of the stored games
+    :type game_index: GameIndex
+    :return: player games with a ``_data_gid`` column, the canonical gid of each game
+    :rtype: pd.DataFrame
+    """
+    canonical_gids = game_index.canonical_gids(player_games["gid"])
+    data_gids = player_games["gid"].map(lambda gid: canonical_gids.get(gid, gid))
+
+    return player_games.assign(_data_gid=data_gids)
+
 
 def merge_data(
-    player_games_input: pd.DataFrame, games_data_input: pd.DataFrame
+    player_games_input: pd.DataFrame,
+    games_data_input: pd.DataFrame,
+    game_index: GameIndex | None = None,
 ) -> pd.DataFrame:
     """Merges game data with player games
 
     :param player_games_input: game information for a player
     :type player_games_input: pd.DataFrame
-    :param games_data_input: fens and pgn for a game
+    :param games_data_input: fens and pgn for a game, nested in a ``data`` column or flat
     :type games_data_input: pd.DataFrame
+    :param game_index: index of the stored games. When given, games stored once
+    under another gid (their canonical gid) are merged with that stored copy
+    :type game_index: GameIndex | None, optional
     :return: game data merged with its metadata
     :rtype: pd.DataFrame
     """
-    games_data = games_data_input.copy()
-    player_games = player_games_input.copy()
+    if game_index is not None:
+        player_games_input = with_data_gids(player_games_input, game_index)
 
-    # Merge by GID
-    games_data = player_games.merge(games_data, on="gid")
-    games_data.loc[:, ["fens", "game_type", "pgn"]] = (
-        games_data["data"].apply(pd.Series).drop(columns=["result"])
-    )
+    return _merge_game_data(player_games_input, games_data_input)
 
-    games_data = games_data.drop(columns="data")
-    games_data["pgn"] = games_data["pgn"].str.replace("\n", " ")
+
+def _merge_game_data(
+    player_games: pd.DataFrame, games_data_input: pd.DataFrame
+) -> pd.DataFrame:
+    """Merges on the ``_data_gid`` of ``with_data_gids`` when there is one, else on gid"""
+    # The result comes from the player's games, so the scraped one is dropped
+    games_data = expand_game_data(games_data_input)
+    games_data = games_data.drop(columns="result", errors="ignore")
+
+    # Merge by GID. The merge builds a new frame, so the inputs are never modified
+    if "_data_gid" not in player_games.columns:
+        games_data = player_games.merge(games_data, on="gid")
+    else:
+        games_data = player_games.merge(
+            games_data.rename(columns={"gid": "_data_gid"}), on="_data_gid"
+        )
+        games_data = games_data.drop(columns="_data_gid")
 
     # Remove the score from the pgn
-    games_data["pgn"] = games_data["pgn"].str.replace(
-        "( ?1-0)|( ?0-1)|( ?1/2-1/2)", "", regex=True
+    games_data["pgn"] = (
+        games_data["pgn"]
+        .str.replace("\n", " ", regex=False)
+        .str.replace("( ?1-0)|( ?0-1)|( ?1/2-1/2)", "", regex=True)
     )
 
     return games_data
@@ -84,11 +209,157 @@ def pgn2array(pgn: str) -> np.ndarray:
     return moves_padded_array
 
 
+def pgns2moves(
+    pgns: list[str] | pd.Series | pa.Array | pa.ChunkedArray,
+) -> pa.ListArray:
+    """Splits a whole column of PGNs into their moves at once
+
+    Results and move numbers are removed with compiled regexes over the entire
+    column, so no Python code runs per game. The output is ragged: ``.values`` holds
+    the moves of every game one after another and ``.offsets`` marks where each game
+    starts, so game ``i`` is ``values[offsets[i]:offsets[i + 1]]``.
+
+    :param pgns: PGN of each game
+    :type pgns: list[str] | pd.Series | pa.Array | pa.ChunkedArray
+    :return: list of moves (plies) of each game, an empty list for missing PGNs
+    :rtype: pa.ListArray
+    """
+    if isinstance(pgns, pa.ChunkedArray):
+        pgns = pgns.combine_chunks()
+    elif not isinstance(pgns, pa.Array):
+        pgns = pa.array(pgns, type=pa.string())
+
+    # Remove the move numbers, e.g. '1.' or '12...', and the result in a single pass
+    pgn_moves = pc.replace_substring_regex(pgns, "[0-9]+\\.+|1-0|0-1|1/2-1/2", " ")
+    pgn_moves = pc.ascii_split_whitespace(pgn_moves)
+
+    # Splitting leaves empty strings around the moves, which are dropped here
+    moves = pgn_moves.flatten()
+    game_indices = pc.list_parent_indices(pgn_moves)
+    is_move = pc.not_equal(moves, "")
+
+    moves = moves.filter(is_move)
+    game_indices = game_indices.filter(is_move).to_numpy()
+
+    moves_per_game = np.bincount(game_indices, minlength=len(pgns))
+    offsets = np.concatenate([[0], np.cumsum(moves_per_game)]).astype(np.int32)
+
+    return pa.ListArray.from_arrays(pa.array(offsets), moves)
+
+
+def moves2array(moves: pa.ListArray, game_index: int) -> np.ndarray:
+    """Converts the moves of one game from ``pgns2moves`` to the layout of ``pgn2array``
+
+    :param moves: moves of each game, as returned by ``pgns2moves``
+    :type moves: pa.ListArray
+    :param game_index: position of the game in ``moves``
+    :type game_index: int
+    :return: numpy array where first column represents white move and second column black moves.
+    Whenever black hasn't moved, the empty string "" represents absence of move.
+    :rtype: np.ndarray
+    """
+    offsets = moves.offsets
+    start = offsets[game_index].as_py()
+    end = offsets[game_index + 1].as_py()
+
+    game_moves = moves.values[start:end].to_numpy(zero_copy_only=False)
+
+    if game_moves.size % 2 == 1:
+        game_moves = np.append(game_moves, "")
+
+    return game_moves.astype("U10").reshape(-1, 2)
+
+
+# Increment of the splitmix64 generator, used to step through the draws of a game
+_SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, scrambles every bit of a uint64 array into every other"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def sample_moves_batch(
+    n_moves: np.ndarray,
+    seed: int,
+    n_positions: int,
+    game_keys: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Samples the moves at which positions are taken, for many games in one call
+
+    Every game has its own stream of draws, derived from the seed and its key (the
+    gid). Draw ``j`` of a game is a counter-based hash of (seed, key, j), so it does
+    not depend on which other games are sampled with it, in which order or in which
+    process, and shards of a dataset can be sampled in parallel with the same result.
+
+    :param n_moves: number of moves (rows of ``pgn2array``) of each game
+    :type n_moves: np.ndarray
+    :param seed: seed for sampling positions
+    :type seed: int
+    :param n_positions: draws per game. Repeated draws are merged
+    :type n_positions: int
+    :param game_keys: integer key of each game, e.g. its gid. Defaults to the position
+    of the game in ``n_moves``
+    :type game_keys: np.ndarray | None
+    :return: game index and move index of every sample, sorted by game and then move
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    n_moves = np.asarray(n_moves, dtype=np.int64).reshape(-1)
+
+    if game_keys is None:
+        game_keys = np.arange(n_moves.size)
+    game_keys = np.asarray(game_keys).astype(np.uint64).reshape(-1)
+
+    # SeedSequence spreads small, similar seeds over the whole key space
+    key = np.random.SeedSequence(seed).generate_state(1, dtype=np.uint64)
+    streams = _mix64(key ^ _mix64(game_keys))
+
+    counters = np.arange(1, n_positions + 1, dtype=np.uint64) * _SPLITMIX_GAMMA
+    draws = _mix64(streams[:, None] + counters[None, :])
+
+    # 53 random bits as a float in [0, 1), scaled to the number of moves of each game
+    uniform = (draws >> np.uint64(11)) * 2.0**-53
+    samples = np.sort((uniform * n_moves[:, None]).astype(np.int64), axis=1)
+
+    # Keep the first of every run of equal draws, and nothing from empty games
+    keep = np.ones(samples.shape, dtype=bool)
+    keep[:, 1:] = samples[:, 1:] != samples[:, :-1]
+    keep &= (n_moves > 0)[:, None]
+
+    game_indices = np.broadcast_to(np.arange(n_moves.size)[:, None], samples.shape)
+
+    return game_indices[keep], samples[keep]
+
+
+def sample_moves(
+    n_moves: int, seed: int, n_positions: int, game_key: int = 0
+) -> np.ndarray:
+    """Samples the moves of a game at which positions are taken
+
+    :param n_moves: number of moves (rows of ``pgn2array``) in the game
+    :type n_moves: int
+    :param seed: seed for sampling positions
+    :type seed: int
+    :param n_positions: number of draws. Repeated draws are merged
+    :type n_positions: int
+    :param game_key: integer key of the game, e.g. its gid, defaults to 0
+    :type game_key: int, optional
+    :return: sorted, unique indices of the sampled moves
+    :rtype: np.ndarray
+    """
+    _, moves_samples = sample_moves_batch([n_moves], seed, n_positions, [game_key])
+
+    return moves_samples
+
+
 def get_positions_with_white(
     pgn: str,
     seed: int = 42,
     n_positions=GAMES_SAMPLE,
     special_tokens=(BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN),
+    game_key: int = 0,
 ) -> list[tuple[str | np.ndarray, str]]:
     """Generates a set of positions from a game where the player is white
 
@@ -96,17 +367,16 @@ def get_positions_with_white(
     :type pgn: pgn
     :param seed: seed for sampling positions, defaults to 42
     :type seed: int, optional
+    :param game_key: integer key of the game (its gid), so games of the same length
+    are not sampled at the same moves, defaults to 0
+    :type game_key: int, optional
     :return: list of random positions within the game. All elements are tuples of size 2,
     where the first element of the tuple are the moves played up to a certain point and the
     second element of the tuple is the next move white makes.
     :rtype: list[tuple[str | np.ndarray, str]]
     """
     moves_array = pgn2array(pgn)
-
-    # Sample positions from the game, selecting the unique ones only and sorting to ensure reproducibility
-    np.random.seed(seed)
-    moves_samples = np.random.randint(0, moves_array.shape[0], n_positions)
-    moves_samples = np.sort(np.unique(moves_samples))
+    moves_samples = sample_moves(moves_array.shape[0], seed, n_positions, game_key)
 
     sample_positions = []
     for sample in moves_samples:
@@ -130,6 +400,7 @@ def get_positions_with_black(
     seed: int = 42,
     n_positions=GAMES_SAMPLE,
     special_tokens=(BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN),
+    game_key: int = 0,
 ) -> list[tuple[str | np.ndarray, str]]:
     """Generates a set of positions from a game where the player is white
 
@@ -137,6 +408,9 @@ def get_positions_with_black(
     :type pgn: pgn
     :param seed: seed for sampling positions, defaults to 42
     :type seed: int, optional
+    :param game_key: integer key of the game (its gid), so games of the same length
+    are not sampled at the same moves, defaults to 0
+    :type game_key: int, optional
     :return: list of random positions within the game. All elements are tuples of size 2,
     where the first element of the tuple are the moves played up to a certain point and the
     second element of the tuple is the next move white makes.
@@ -150,10 +424,7 @@ def get_positions_with_black(
     black_array[0] = special_tokens[0]
     black_array = black_array.reshape(-1, 2)
 
-    # Sample positions from the game, selecting the unique ones only and sorting to ensure reproducibility
-    np.random.seed(seed)
-    moves_samples = np.random.randint(0, moves_array.shape[0], n_positions)
-    moves_samples = np.sort(np.unique(moves_samples))
+    moves_samples = sample_moves(moves_array.shape[0], seed, n_positions, game_key)
 
     sample_positions = []
 
@@ -171,6 +442,331 @@ def get_positions_with_black(
     return sample_positions
 
 
+class ShardResult(NamedTuple):
+    """Positions of the games of a shard, and the games that failed"""
+
+    shard: int
+    positions: list[tuple[str, list[tuple[str | np.ndarray, str]]]]
+    errors: list[tuple[str, Exception]]
+
+
+def get_positions_shard(
+    shard: int,
+    gids: list[str],
+    pgns: list[str],
+    is_white: list[bool],
+    seed: int = 42,
+    n_positions: int = GAMES_SAMPLE,
+    special_tokens: tuple[str, str] = (BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN),
+) -> ShardResult:
+    """Generates the positions of a shard of games, the unit of work of a worker
+
+    :param shard: index of the shard
+    :type shard: int
+    :param gids: gid of each game
+    :type gids: list[str]
+    :param pgns: PGN of each game
+    :type pgns: list[str]
+    :param is_white: whether the player had white in each game
+    :type is_white: list[bool]
+    :param seed: seed for sampling positions, defaults to 42
+    :type seed: int, optional
+    :param n_positions: draws per game, defaults to GAMES_SAMPLE
+    :type n_positions: int, optional
+    :param special_tokens: beginning and end of game tokens
+    :type special_tokens: tuple[str, str]
+    :return: (gid, positions) of every game, and (gid, exception) of the failed ones
+    :rtype: ShardResult
+    """
+    positions, errors = [], []
+
+    for gid, pgn, white in zip(gids, pgns, is_white):
+        get_positions = get_positions_with_white if white else get_positions_with_black
+
+        try:
+            game_positions = get_positions(
+                pgn, seed, n_positions, special_tokens, game_key=int(gid)
+            )
+        except Exception as e:
+            errors.append((gid, e))
+        else:
+            positions.append((gid, game_positions))
+
+    return ShardResult(shard, positions, errors)
+
+
+def get_positions_sharded(
+    games: pd.DataFrame,
+    seed: int = 42,
+    n_positions: int = GAMES_SAMPLE,
+    special_tokens: tuple[str, str] = (BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN),
+    shard_size: int = 1_000,
+    max_workers: int | None = None,
+) -> list[ShardResult]:
+    """Generates the positions of every game over a pool of worker processes
+
+    Games are split in shards of ``shard_size`` and each shard is processed by
+    ``get_positions_shard`` in a worker. A game that fails is reported in the errors
+    of its shard, and a shard whose worker fails reports every one of its games.
+
+    :param games: merged games, with gid, pgn and is_white columns
+    :type games: pd.DataFrame
+    :param seed: seed for sampling positions, defaults to 42
+    :type seed: int, optional
+    :param n_positions: draws per game, defaults to GAMES_SAMPLE
+    :type n_positions: int, optional
+    :param special_tokens: beginning and end of game tokens
+    :type special_tokens: tuple[str, str]
+    :param shard_size: games per shard, defaults to 1_000
+    :type shard_size: int, optional
+    :param max_workers: number of worker processes, defaults to the number of CPUs
+    :type max_workers: int | None, optional
+    :return: result of each shard, in the order of the games
+    :rtype: list[ShardResult]
+    """
+    gids = games["gid"].tolist()
+    pgns = games["pgn"].tolist()
+    is_white = games["is_white"].tolist()
+    shard_starts = range(0, len(gids), shard_size)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                get_positions_shard,
+                shard,
+                gids[start : start + shard_size],
+                pgns[start : start + shard_size],
+                is_white[start : start + shard_size],
+                seed,
+                n_positions,
+                special_tokens,
+            )
+            for shard, start in enumerate(shard_starts)
+        ]
+
+        results = []
+        for shard, (start, future) in enumerate(zip(shard_starts, futures)):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                shard_gids = gids[start : start + shard_size]
+                results.append(ShardResult(shard, [], [(gid, e) for gid in shard_gids]))
+
+    return results
+
+
+class PositionIndex:
+    """Sampled positions stored as offsets into a shared buffer of moves
+
+    Each position is only a game index and a ply, so storing it costs a few bytes
+    instead of a copy of every move played before it. The context (moves before the
+    ply) and the target (the move played at the ply) are sliced out of the buffer
+    when a position is read, in the same layout ``get_positions_with_white`` and
+    ``get_positions_with_black`` return.
+
+    White positions are at even plies and black positions at odd plies.
+    """
+
+    def __init__(
+        self,
+        moves: pa.ListArray,
+        game_indices: np.ndarray,
+        plies: np.ndarray,
+        special_tokens: tuple[str, str] = (BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN),
+    ) -> None:
+        """
+        :param moves: moves of each game, as returned by ``pgns2moves``
+        :type moves: pa.ListArray
+        :param game_indices: game of each position
+        :type game_indices: np.ndarray
+        :param plies: ply of each position, i.e. the index of its target move in the game
+        :type plies: np.ndarray
+        :param special_tokens: beginning and end of game tokens
+        :type special_tokens: tuple[str, str]
+        """
+        self.moves = moves
+        self.game_indices = np.asarray(game_indices, dtype=np.int32)
+        self.plies = np.asarray(plies, dtype=np.int32)
+        self.special_tokens = special_tokens
+        self._values = moves.values
+        self._offsets = moves.offsets.to_numpy()
+
+    @classmethod
+    def from_games(
+        cls,
+        moves: pa.ListArray,
+        is_white: np.ndarray,
+        seed: int = 42,
+        n_positions: int = GAMES_SAMPLE,
+        special_tokens: tuple[str, str] = (BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN),
+        game_keys: np.ndarray | None = None,
+    ) -> "PositionIndex":
+        """Samples positions of every game, for the colour the player had in it
+
+        :param moves: moves of each game, as returned by ``pgns2moves``
+        :type moves: pa.ListArray
+        :param is_white: whether the player had white in each game
+        :type is_white: np.ndarray
+        :param seed: seed for sampling positions, defaults to 42
+        :type seed: int, optional
+        :param n_positions: draws per game, defaults to GAMES_SAMPLE
+        :type n_positions: int, optional
+        :param game_keys: integer key of each game (its gid), defaults to the index of
+        the game in ``moves``
+        :type game_keys: np.ndarray | None, optional
+        :return: sampled positions, in the same order as the position functions give them
+        :rtype: PositionIndex
+        """
+        n_plies = moves.value_lengths().fill_null(0).to_numpy()
+        is_white = np.asarray(is_white, dtype=bool)
+
+        # Moves are rows of pgn2array: a white ply and the black ply that follows it
+        game_indices, samples = sample_moves_batch(
+            (n_plies + 1) // 2, seed, n_positions, game_keys
+        )
+        plies = 2 * samples + np.where(is_white[game_indices], 0, 1)
+
+        return cls(moves, game_indices, plies, special_tokens)
+
+    def __len__(self) -> int:
+        return self.plies.size
+
+    def context(self, i: int) -> np.ndarray:
+        """Moves played before position ``i``, without special tokens
+
+        :param i: index of the position
+        :type i: int
+        :return: flat array of moves
+        :rtype: np.ndarray
+        """
+        start = self._offsets[self.game_indices[i]]
+        return self._values.slice(start, self.plies[i]).to_numpy(zero_copy_only=False)
+
+    def target(self, i: int) -> str:
+        """Move played at position ``i``
+
+        :param i: index of the position
+        :type i: int
+        :return: move in SAN, or "" when the game ended before it
+        :rtype: str
+        """
+        game_index = self.game_indices[i]
+        ply_index = self._offsets[game_index] + self.plies[i]
+
+        if ply_index >= self._offsets[game_index + 1]:
+            return ""
+
+        return self._values[ply_index].as_py()
+
+    def __getitem__(self, i: int) -> tuple[str | np.ndarray, str]:
+        """Materializes position ``i`` in the layout of the position functions
+
+        :param i: index of the position
+        :type i: int
+        :return: moves played up to the position and the next move
+        :rtype: tuple[str | np.ndarray, str]
+        """
+        ply = self.plies[i]
+        context = self.context(i).astype("U10")
+        target = self.target(i)
+
+        # White: whole moves played so far, or the beginning of game token
+        if ply % 2 == 0:
+            if ply == 0:
+                return (self.special_tokens[0], target)
+            return (context.reshape(-1, 2), target)
+
+        # Black: moves shifted by one ply, starting with the beginning of game token
+        context = np.concatenate([[self.special_tokens[0]], context]).astype("U10")
+
+        if ply == 1:
+            return (context, target)
+        return (context.reshape(-1, 2), target)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def iter_merged_data(
+    player_games_path: str,
+    game_data_path: str,
+    player_columns: tuple[str, ...] = ("gid", "is_white"),
+    batch_size: int = 10_000,
+    game_index: GameIndex | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Streams the game data merged with player games, one batch at a time
+
+    Only ``player_columns`` of the player games are kept in memory, as the lookup
+    table every batch of game data is merged with by gid.
+
+    :param player_games_path: parquet file or folder with the player games
+    :type player_games_path: str
+    :param game_data_path: parquet file or folder with the game data
+    :type game_data_path: str
+    :param player_columns: columns of the player games to keep, defaults to
+    ("gid", "is_white")
+    :type player_columns: tuple[str, ...], optional
+    :param batch_size: maximum games of game data read per batch, defaults to 10_000
+    :type batch_size: int, optional
+    :param game_index: index of the stored games. When given, games stored once
+    under another gid are merged with that stored copy, as ``merge_data`` does
+    :type game_index: GameIndex | None, optional
+    :yield: merged games, as ``merge_data`` returns them
+    :rtype: Iterator[pd.DataFrame]
+    """
+    player_games = (
+        ds.dataset(player_games_path, format="parquet")
+        .to_table(columns=list(player_columns))
+        .to_pandas()
+    )
+
+    # Canonical gids are looked up once, not for every batch
+    if game_index is not None:
+        player_games = with_data_gids(player_games, game_index)
+
+    for games_data in iter_game_data(game_data_path, batch_size=batch_size):
+        games = _merge_game_data(player_games, games_data)
+
+        if not games.empty:
+            yield games
+
+
+def iter_positions(
+    games_batches: Iterator[pd.DataFrame],
+    seed: int = 42,
+    n_positions: int = GAMES_SAMPLE,
+    special_tokens: tuple[str, str] = (BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN),
+) -> Iterator[tuple[pd.DataFrame, PositionIndex]]:
+    """Samples the positions of a stream of merged games, batch by batch
+
+    Games are sampled with their gid as key, so the positions of a game do not
+    depend on how the games are batched.
+
+    :param games_batches: merged games, e.g. from ``iter_merged_data``
+    :type games_batches: Iterator[pd.DataFrame]
+    :param seed: seed for sampling positions, defaults to 42
+    :type seed: int, optional
+    :param n_positions: draws per game, defaults to GAMES_SAMPLE
+    :type n_positions: int, optional
+    :param special_tokens: beginning and end of game tokens
+    :type special_tokens: tuple[str, str]
+    :yield: each batch of games and its sampled positions
+    :rtype: Iterator[tuple[pd.DataFrame, PositionIndex]]
+    """
+    for games in games_batches:
+        positions = PositionIndex.from_games(
+            pgns2moves(games["pgn"]),
+            games["is_white"].to_numpy(),
+            seed=seed,
+            n_positions=n_positions,
+            special_tokens=special_tokens,
+            game_keys=games["gid"].astype(np.int64).to_numpy(),
+        )
+
+        yield games, positions
+
+
 if __name__ == "__main__":
     player_games = pd.read_parquet("../../data/player_games.parquet")
     games_data = pd.read_parquet("../../data/game_data.parquet")
@@ -197,19 +793,3 @@ if __name__ == "__main__":
             )
         except:
             print(i)
-
-
-pgn = white_games["pgn"].iloc[145]
-
-import io 
-import chess.pgn
-
-pgn = io.StringIO("1. e4 b6 2. Nf3 *")
-game = chess.pgn.read_game(pgn)
-
-
-game.errors
-
-pgn
-
-white_games.iloc[604]
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+
+# Statuses that mean "slow down" rather than "this request is wrong"
+RETRY_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses a Retry-After header, given either in seconds or as an HTTP date
+
+    Args:
+        value (str | None): value of the header
+
+    Returns:
+        float | None: seconds to wait, or None if the header is missing or invalid
+    """
+    if value is None:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RateLimiter:
+    """Token bucket that caps the request rate and the number of requests in flight
+
+    It can be used both as ``with limiter:`` around blocking requests and as
+    ``async with limiter:`` around async ones. When the server answers 429 or 503,
+    ``backoff`` pauses every caller until the Retry-After delay (or an exponential
+    one) has passed.
+    """
+
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: int | None = None,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 120.0,
+    ) -> None:
+        """
+        Args:
+            rate (float): requests allowed per second
+            burst (int | None): size of the bucket. Defaults to one second's worth of tokens
+            max_concurrency (int): maximum number of requests in flight
+            max_retries (int): retries of a request answered with 429 or 503
+            backoff_base (float): first backoff delay when there is no Retry-After header
+            backoff_max (float): ceiling for the exponential backoff delay
+        """
+        assert rate > 0, '"rate" must be positive'
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._thread_slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = weakref.WeakKeyDictionary()
+
+    def _reserve(self) -> float:
+        """Takes a token from the bucket, possibly in advance
+
+        Returns:
+            float: seconds the caller must wait before using the token
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            # During a backoff the refill clock is set to the end of the pause
+            if now > self._updated:
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+            self._tokens -= 1
+
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            return self._updated - now + wait
+
+    def backoff(self, retry_after: float | None = None, attempt: int = 0) -> float:
+        """Pauses all callers after the server signalled overload
+
+        The bucket is emptied and only refills from the end of the pause, so the
+        callers waiting are released ``1 / rate`` apart instead of all at once.
+
+        Args:
+            retry_after (float | None): delay requested by the server, if any
+            attempt (int): number of retries already made for the request
+
+        Returns:
+            float: seconds the limiter is paused for
+        """
+        if retry_after is None:
+            retry_after = min(self.backoff_max, self.backoff_base * 2**attempt)
+
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+            # Tokens already reserved in advance keep their turn
+            next_token = self._updated + max(0.0, -self._tokens) / self.rate
+            self._updated = max(self._blocked_until, next_token)
+            self._tokens = 0.0
+
+        return retry_after
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent"""
+        time.sleep(self._reserve())
+
+    async def acquire_async(self) -> None:
+        """Waits, without blocking the event loop, until a request may be sent"""
+        await asyncio.sleep(self._reserve())
+
+    @property
+    def _async_slot(self) -> asyncio.Semaphore:
+        # Semaphores belong to an event loop, so keep one per loop
+        loop = asyncio.get_running_loop()
+
+        if loop not in self._async_slots:
+            self._async_slots[loop] = asyncio.Semaphore(self.max_concurrency)
+
+        return self._async_slots[loop]
+
+    def __enter__(self) -> "RateLimiter":
+        self._thread_slots.acquire()
+
+        try:
+            self.acquire()
+        except BaseException:
+            self._thread_slots.release()
+            raise
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._thread_slots.release()
+
+    async def __aenter__(self) -> "RateLimiter":
+        slot = self._async_slot
+        await slot.acquire()
+
+        try:
+            await self.acquire_async()
+        except BaseException:
+            slot.release()
+            raise
+
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._async_slot.release()
@@ -0,0 +1,112 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class FairQueue:
+    """Async work queue that interleaves the jobs of many owners round robin
+
+    Jobs are queued per owner (e.g. per player) and handed out one owner at a time,
+    so an owner with thousands of pending jobs does not starve the others. Within
+    an owner, jobs keep the order they were put in.
+    """
+
+    def __init__(self) -> None:
+        self._queues: dict[Hashable, deque] = {}
+        self._ready: deque[Hashable] = deque()
+        self._items = asyncio.Semaphore(0)
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def put(self, owner: Hashable, item: Any) -> None:
+        """Queues an item of an owner
+
+        Args:
+            owner (Hashable): key the item is interleaved by
+            item (Any): item to queue
+        """
+        queue = self._queues.setdefault(owner, deque())
+        queue.append(item)
+
+        # Owners are only in the rotation while they have items
+        if len(queue) == 1:
+            self._ready.append(owner)
+
+        self._unfinished += 1
+        self._finished.clear()
+        self._items.release()
+
+    async def get(self) -> tuple[Hashable, Any]:
+        """Takes the next item, from the owner whose turn it is
+
+        Returns:
+            tuple[Hashable, Any]: owner and item
+        """
+        await self._items.acquire()
+
+        owner = self._ready.popleft()
+        queue = self._queues[owner]
+        item = queue.popleft()
+
+        if queue:
+            self._ready.append(owner)
+        else:
+            del self._queues[owner]
+
+        return owner, item
+
+    def task_done(self) -> None:
+        """Marks an item taken with ``get`` as processed"""
+        self._unfinished -= 1
+
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self) -> None:
+        """Waits until every queued item has been processed"""
+        await self._finished.wait()
+
+
+async def run_jobs(
+    queue: FairQueue,
+    n_workers: int,
+    on_error: Callable[[Hashable, Exception], None] | None = None,
+) -> None:
+    """Runs the jobs of a queue with a fixed number of workers until it is drained
+
+    Jobs are coroutine functions and may put more jobs in the queue while running.
+
+    Args:
+        queue (FairQueue): queue of jobs
+        n_workers (int): jobs running at the same time
+        on_error (Callable[[Hashable, Exception], None] | None): called with the owner
+        and exception of a failed job. Failures are ignored when None
+    """
+
+    async def worker():
+        while True:
+            owner, job = await queue.get()
+
+            try:
+                await job()
+            except Exception as e:
+                if on_error is not None:
+                    on_error(owner, e)
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(n_workers)]
+
+    try:
+        await queue.join()
+    finally:
+        for worker_task in workers:
+            worker_task.cancel()
+
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,290 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .game_index import GameIndex
+
+
+def dataset_exists(path: str | Path) -> bool:
+    """Whether a parquet dataset has been written at a path
+
+    Args:
+        path (str | Path): parquet file or folder of parquet partitions
+
+    Returns:
+        bool: True if there is data at the path
+    """
+    path = Path(path)
+    return path.is_file() or (path.is_dir() and any(path.glob("*.parquet")))
+
+
+def read_dataset(path: str | Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """Reads a parquet dataset, either a single file or a folder of partitions
+
+    Partitions may have different columns, e.g. ones written before a column was
+    added: the columns of every partition are read, nulls filling the gaps.
+
+    Args:
+        path (str | Path): parquet file or folder of parquet partitions
+        columns (list[str] | None): columns to read. Defaults to all of them
+
+    Returns:
+        pd.DataFrame: rows of every partition
+    """
+    dataset = ds.dataset(path, format="parquet")
+    schema = pa.unify_schemas(
+        [fragment.physical_schema for fragment in dataset.get_fragments()]
+    )
+
+    return (
+        ds.dataset(path, schema=schema, format="parquet")
+        .to_table(columns=columns)
+        .to_pandas()
+    )
+
+
+# Layout of game_data.parquet: the gid, the scraped data of each game and its moves
+# packed 2 bytes per ply (see ``fens.encode_move``). FENs are rebuilt from the
+# moves on demand, so ``data.fens`` is only filled in games scraped before there
+# were packed moves. They are not called ``moves``, the listing of player_games
+# already has a ``moves`` column (the number of moves) that merges would clash with
+GAME_DATA_SCHEMA = pa.schema(
+    [
+        ("gid", pa.string()),
+        (
+            "data",
+            pa.struct(
+                [
+                    ("pgn", pa.string()),
+                    ("game_type", pa.string()),
+                    ("fens", pa.list_(pa.list_(pa.string()))),
+                    ("result", pa.string()),
+                ]
+            ),
+        ),
+        ("packed_moves", pa.list_(pa.uint16())),
+    ]
+)
+
+
+def _to_dataset_folder(path: Path) -> Path:
+    """Makes sure a dataset is a folder of partitions
+
+    A dataset stored as a single file is turned into a folder with the same name,
+    keeping the file as its first partition, so readers of the path still work.
+    """
+    if path.is_file():
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        os.replace(path, tmp_path)
+        path.mkdir()
+        os.replace(tmp_path, path / "part-00000.parquet")
+
+    path.mkdir(parents=True, exist_ok=True)
+
+    return path
+
+
+def _write_partition(table: pa.Table, path: Path) -> Path:
+    """Writes a new partition file atomically, so a crash never leaves half a file"""
+    partition_path = path / f"part-{time.time_ns()}.parquet"
+
+    # Files starting with "." are ignored by dataset readers until they are renamed
+    tmp_path = path / f".{partition_path.name}.tmp"
+
+    with pq.ParquetWriter(tmp_path, table.schema) as writer:
+        writer.write_table(table)
+
+    os.replace(tmp_path, partition_path)
+
+    return partition_path
+
+
+def append_partition(df: pd.DataFrame, path: str | Path) -> Path:
+    """Appends rows to a parquet dataset as a new partition file
+
+    A dataset stored as a single file is turned into a folder with the same name,
+    keeping the file as its first partition, so readers of the path still work.
+    New partitions are cast to the schema of the existing data.
+
+    Args:
+        df (pd.DataFrame): rows to append
+        path (str | Path): parquet file or folder of parquet partitions
+
+    Returns:
+        Path: path of the new partition file
+    """
+    path = _to_dataset_folder(Path(path))
+    schema = None
+
+    if dataset_exists(path):
+        schema = ds.dataset(path, format="parquet").schema.remove_metadata()
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    if schema is not None and set(schema.names) == set(table.column_names):
+        table = table.select(schema.names).cast(schema)
+
+    return _write_partition(table, path)
+
+
+def replace_dataset(df: pd.DataFrame, path: str | Path) -> Path:
+    """Replaces a parquet dataset, file or folder of partitions, with new rows
+
+    The rows are written to a new folder first and swapped in with renames, so
+    readers never see half a dataset, and a folder left by ``append_partition`` is
+    replaced as a whole.
+
+    Args:
+        df (pd.DataFrame): every row of the dataset
+        path (str | Path): parquet file or folder of parquet partitions
+
+    Returns:
+        Path: path of the partition file holding the rows
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    old_path = path.with_name(f".{path.name}.{os.getpid()}.old")
+
+    tmp_path.mkdir(parents=True)
+    _write_partition(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+
+    if path.exists():
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+
+    if old_path.is_dir():
+        shutil.rmtree(old_path)
+    elif old_path.exists():
+        old_path.unlink()
+
+    return next(path.glob("*.parquet"))
+
+
+class GameDataWriter:
+    """Streams scraped games to a parquet dataset as they are completed
+
+    Every batch is flushed as its own partition file, and its gids are then added to
+    a checkpoint manifest inside the dataset folder. A restarted run skips the gids
+    in ``completed_gids`` and carries on where the previous one stopped.
+
+    Each batch gets its own file rather than a row group of one long-lived file,
+    because a parquet file is unreadable until its footer is written at close.
+    """
+
+    MANIFEST_NAME = "_completed_gids.txt"
+
+    def __init__(self, path: str | Path, schema: pa.Schema = GAME_DATA_SCHEMA) -> None:
+        """
+        Args:
+            path (str | Path): parquet file or folder of parquet partitions
+            schema (pa.Schema): schema of the written rows
+        """
+        self.path = _to_dataset_folder(Path(path))
+        self.schema = schema
+        self.manifest_path = self.path / self.MANIFEST_NAME
+        self._completed_gids = None
+
+    @property
+    def completed_gids(self) -> set[str]:
+        """Gids already written, by this or a previous run
+
+        Returns:
+            set[str]: game ids in the dataset
+        """
+        if self._completed_gids is None:
+            if self.manifest_path.exists():
+                gids = self.manifest_path.read_text().split()
+            elif dataset_exists(self.path):
+                # Data written before there was a manifest
+                gids = read_dataset(self.path, columns=["gid"])["gid"].tolist()
+                self.manifest_path.write_text("".join(f"{gid}\n" for gid in gids))
+            else:
+                gids = []
+
+            self._completed_gids = set(gids)
+
+        return self._completed_gids
+
+    def write_batch(
+        self, games: list[tuple[str, dict[str, str | list[tuple[str]]]]]
+    ) -> Path | None:
+        """Flushes a batch of scraped games and checkpoints their gids
+
+        Args:
+            games (list[tuple[str, dict[str, str | list[tuple[str]]]]]): (gid, data)
+            of each game, as returned by ``get_game_data``
+
+        Returns:
+            Path | None: path of the new partition file, None if the batch was empty
+        """
+        if not games:
+            return None
+
+        table = pa.Table.from_pylist(
+            [
+                {"gid": gid, "data": data, "packed_moves": data.get("packed_moves")}
+                for gid, data in games
+            ],
+            schema=self.schema,
+        )
+        partition_path = _write_partition(table, self.path)
+
+        # The manifest is only updated once the data is safely on disk
+        gids = [gid for gid, _ in games]
+        with open(self.manifest_path, "a") as manifest:
+            manifest.write("".join(f"{gid}\n" for gid in gids))
+            manifest.flush()
+            os.fsync(manifest.fileno())
+
+        self.completed_gids.update(gids)
+
+        return partition_path
+
+
+def write_games(
+    games: list[tuple[str, dict[str, str | list[int] | list[tuple[str]]]]],
+    writer: GameDataWriter,
+    game_index: GameIndex | None = None,
+    dedup_movetext: bool = False,
+) -> int:
+    """Writes a batch of games, keeping a single copy of each gid, or of each movetext
+
+    Args:
+        games (list[tuple[str, dict[str, str | list[int] | list[tuple[str]]]]]): (gid,
+        data) of each game, as returned by ``get_game_data``
+        writer (GameDataWriter): checkpointed writer of the game data
+        game_index (GameIndex | None): index of the stored games. Games already
+        stored under another gid are only recorded in it
+        dedup_movetext (bool): whether games are matched by movetext too, to find
+        the same game coming from different sources. Short games (e.g. quick draws)
+        are often played move for move in different events, so without it every gid
+        is stored, and indexed by gid only
+
+    Returns:
+        int: number of games written
+    """
+    if game_index is None:
+        writer.write_batch(games)
+        return len(games)
+
+    # The index is only updated once the games are on disk. Games indexed without
+    # their movetext are never matched by it, now or later
+    gids = [gid for gid, _ in games]
+    pgns = [data["pgn"] if dedup_movetext else None for _, data in games]
+    canonical_gids = game_index.resolve(gids, pgns)
+    new_games = [
+        game
+        for game, canonical_gid in zip(games, canonical_gids)
+        if game[0] == canonical_gid
+    ]
+
+    writer.write_batch(new_games)
+    game_index.add_many(gids, pgns)
+
+    return len(new_games)
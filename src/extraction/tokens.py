@@ -0,0 +1,314 @@
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .processing import BEGINNING_OF_GAME_TOKEN, END_OF_GAME_TOKEN
+
+PADDING_TOKEN = "<PAD>"
+UNKNOWN_TOKEN = "<UNK>"
+
+# Ids are stored as uint16, so a vocabulary can hold at most this many tokens
+MAX_VOCABULARY_SIZE = np.iinfo(np.uint16).max + 1
+
+VOCABULARY_NAME = "vocabulary.txt"
+
+
+class MoveVocabulary:
+    """Maps moves (in SAN, as ``pgns2moves`` splits them) and special tokens to ids
+
+    The special tokens always come first, in the order padding, beginning of game,
+    end of game and unknown, so padding is id 0. Moves follow, most frequent first.
+    """
+
+    def __init__(self, tokens: list[str]) -> None:
+        """
+        :param tokens: every token of the vocabulary, the special tokens first
+        :type tokens: list[str]
+        """
+        if len(tokens) > MAX_VOCABULARY_SIZE:
+            raise ValueError(
+                f"Vocabulary of {len(tokens)} tokens does not fit in uint16 ids"
+            )
+
+        self.tokens = list(tokens)
+        self._tokens = pa.array(self.tokens, type=pa.string())
+        self._ids = {token: i for i, token in enumerate(self.tokens)}
+
+        self.pad_id = self._ids[PADDING_TOKEN]
+        self.bog_id = self._ids[BEGINNING_OF_GAME_TOKEN]
+        self.eog_id = self._ids[END_OF_GAME_TOKEN]
+        self.unk_id = self._ids[UNKNOWN_TOKEN]
+
+    @classmethod
+    def from_moves(cls, moves: pa.ListArray, min_count: int = 1) -> "MoveVocabulary":
+        """Builds the vocabulary of the moves played in a corpus
+
+        :param moves: moves of each game, as returned by ``pgns2moves``
+        :type moves: pa.ListArray
+        :param min_count: times a move has to be played to get its own id, rarer
+        moves are encoded as the unknown token, defaults to 1
+        :type min_count: int, optional
+        :return: vocabulary of the corpus
+        :rtype: MoveVocabulary
+        """
+        return cls.from_move_batches([moves], min_count)
+
+    @classmethod
+    def from_move_batches(
+        cls, move_batches: Iterable[pa.ListArray], min_count: int = 1
+    ) -> "MoveVocabulary":
+        """Builds the vocabulary of a corpus read in batches
+
+        Only the count of each distinct move is kept between batches, so the corpus
+        never has to fit in memory.
+
+        :param move_batches: moves of each game of each batch, as returned by
+        ``pgns2moves``
+        :type move_batches: Iterable[pa.ListArray]
+        :param min_count: times a move has to be played to get its own id, rarer
+        moves are encoded as the unknown token, defaults to 1
+        :type min_count: int, optional
+        :return: vocabulary of the corpus
+        :rtype: MoveVocabulary
+        """
+        counts = Counter()
+
+        for moves in move_batches:
+            batch_counts = pc.value_counts(moves.flatten())
+            counts.update(
+                dict(
+                    zip(
+                        batch_counts.field("values").to_pylist(),
+                        batch_counts.field("counts").to_pylist(),
+                    )
+                )
+            )
+
+        # Ties are broken by the move itself, so the ids do not depend on game order
+        moves_by_count = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        special_tokens = [
+            PADDING_TOKEN,
+            BEGINNING_OF_GAME_TOKEN,
+            END_OF_GAME_TOKEN,
+            UNKNOWN_TOKEN,
+        ]
+
+        return cls(
+            special_tokens
+            + [
+                move
+                for move, count in moves_by_count
+                if count >= min_count and move not in special_tokens
+            ]
+        )
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def token_id(self, token: str) -> int:
+        """Id of a single token
+
+        :param token: move or special token
+        :type token: str
+        :return: id of the token, the unknown id if it is not in the vocabulary
+        :rtype: int
+        """
+        return self._ids.get(token, self.unk_id)
+
+    def encode(self, moves: pa.ListArray) -> tuple[np.ndarray, np.ndarray]:
+        """Encodes the moves of many games at once
+
+        Every game is wrapped in the beginning and end of game tokens, so game ``i``
+        is ``ids[offsets[i]:offsets[i + 1]]``, starting with the beginning of game id.
+
+        :param moves: moves of each game, as returned by ``pgns2moves``
+        :type moves: pa.ListArray
+        :return: token ids of every game one after another, and where each game starts
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        move_ids = (
+            pc.index_in(moves.flatten(), value_set=self._tokens)
+            .fill_null(self.unk_id)
+            .to_numpy()
+        )
+        moves_per_game = moves.value_lengths().fill_null(0).to_numpy()
+
+        # Two more tokens per game: beginning and end of game
+        offsets = np.zeros(len(moves) + 1, dtype=np.int64)
+        np.cumsum(moves_per_game + 2, out=offsets[1:])
+
+        ids = np.empty(offsets[-1], dtype=np.uint16)
+        ids[offsets[:-1]] = self.bog_id
+        ids[offsets[1:] - 1] = self.eog_id
+
+        # Each move moves along by the two special tokens of every game before its own
+        game_indices = np.repeat(np.arange(len(moves)), moves_per_game)
+        ids[np.arange(move_ids.size) + 2 * game_indices + 1] = move_ids
+
+        return ids, offsets
+
+    def decode(self, ids: np.ndarray) -> np.ndarray:
+        """Converts token ids back to moves and special tokens
+
+        :param ids: token ids
+        :type ids: np.ndarray
+        :return: tokens of the ids
+        :rtype: np.ndarray
+        """
+        return np.asarray(self.tokens, dtype=object)[np.asarray(ids, dtype=np.int64)]
+
+    def save(self, path: str | Path) -> None:
+        """Writes the vocabulary, one token per line in id order
+
+        :param path: text file to write
+        :type path: str | Path
+        """
+        Path(path).write_text("".join(f"{token}\n" for token in self.tokens))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "MoveVocabulary":
+        """Reads a vocabulary written by ``save``
+
+        :param path: text file written by ``save``
+        :type path: str | Path
+        :return: the vocabulary
+        :rtype: MoveVocabulary
+        """
+        return cls(Path(path).read_text().splitlines())
+
+
+def _save_array(array: np.ndarray, path: Path) -> None:
+    """Writes a .npy file atomically, so readers never map half a file"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+
+    os.replace(tmp_path, path)
+
+
+def write_token_shards(
+    moves: pa.ListArray,
+    vocabulary: MoveVocabulary,
+    directory: str | Path,
+    games_per_shard: int = 100_000,
+) -> list[Path]:
+    """Encodes a corpus and writes it as memory-mappable shards
+
+    Each shard is a pair of .npy files: ``shard-NNNNN.tokens.npy`` with the uint16
+    ids of its games one after another, and ``shard-NNNNN.offsets.npy`` with where
+    each game starts. The vocabulary is written next to them.
+
+    :param moves: moves of each game, as returned by ``pgns2moves``
+    :type moves: pa.ListArray
+    :param vocabulary: vocabulary the moves are encoded with
+    :type vocabulary: MoveVocabulary
+    :param directory: folder of the shards
+    :type directory: str | Path
+    :param games_per_shard: games in each shard, defaults to 100_000
+    :type games_per_shard: int, optional
+    :return: paths of the token files, in game order
+    :rtype: list[Path]
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    vocabulary.save(directory / VOCABULARY_NAME)
+
+    shard_paths = []
+
+    for shard_index, start in enumerate(range(0, len(moves), games_per_shard)):
+        ids, offsets = vocabulary.encode(moves.slice(start, games_per_shard))
+        shard_paths.append(write_token_shard(ids, offsets, directory, shard_index))
+
+    return shard_paths
+
+
+def write_token_shard(
+    ids: np.ndarray, offsets: np.ndarray, directory: str | Path, shard_index: int
+) -> Path:
+    """Writes one shard of encoded games
+
+    :param ids: token ids of the games, as returned by ``MoveVocabulary.encode``
+    :type ids: np.ndarray
+    :param offsets: where each game starts in ``ids``
+    :type offsets: np.ndarray
+    :param directory: folder of the shards
+    :type directory: str | Path
+    :param shard_index: position of the shard in the corpus
+    :type shard_index: int
+    :return: path of the token file
+    :rtype: Path
+    """
+    directory = Path(directory)
+    tokens_path = directory / f"shard-{shard_index:05d}.tokens.npy"
+
+    # Offsets go last: a shard is only read once both of its files exist
+    _save_array(ids, tokens_path)
+    _save_array(offsets, directory / f"shard-{shard_index:05d}.offsets.npy")
+
+    return tokens_path
+
+
+class TokenShards:
+    """Read-only view of the shards written by ``write_token_shards``
+
+    The shards are memory mapped, so opening them reads nothing and a game is a
+    view into the page cache, shared by every process reading the same files.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        """
+        :param directory: folder of the shards
+        :type directory: str | Path
+        """
+        self.directory = Path(directory)
+        self.vocabulary = MoveVocabulary.load(self.directory / VOCABULARY_NAME)
+
+        offsets_paths = sorted(self.directory.glob("shard-*.offsets.npy"))
+        self.offsets = [np.load(path, mmap_mode="r") for path in offsets_paths]
+        self.tokens = [
+            np.load(str(path).replace(".offsets.npy", ".tokens.npy"), mmap_mode="r")
+            for path in offsets_paths
+        ]
+
+        # First game of each shard, to find the shard of a game with a binary search
+        games_per_shard = [offsets.size - 1 for offsets in self.offsets]
+        self.shard_starts = np.concatenate([[0], np.cumsum(games_per_shard)]).astype(
+            np.int64
+        )
+
+    def __len__(self) -> int:
+        return int(self.shard_starts[-1])
+
+    def locate(self, game_index: int) -> tuple[int, int, int]:
+        """Where the tokens of a game are
+
+        :param game_index: index of the game in the corpus
+        :type game_index: int
+        :return: shard of the game, and start and end of its tokens in that shard
+        :rtype: tuple[int, int, int]
+        """
+        if not 0 <= game_index < len(self):
+            raise IndexError(f"Game {game_index} out of range for {len(self)} games")
+
+        shard = int(np.searchsorted(self.shard_starts, game_index, side="right")) - 1
+        offsets = self.offsets[shard]
+        local_index = game_index - self.shard_starts[shard]
+
+        return shard, int(offsets[local_index]), int(offsets[local_index + 1])
+
+    def __getitem__(self, game_index: int) -> np.ndarray:
+        """Token ids of a game, beginning and end of game tokens included
+
+        :param game_index: index of the game in the corpus
+        :type game_index: int
+        :return: view into the memory mapped shard
+        :rtype: np.ndarray
+        """
+        shard, start, end = self.locate(game_index)
+        return self.tokens[shard][start:end]
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from src.extraction.examples import (
+    ExampleStore,
+    ExampleStoreWriter,
+    example_store_exists,
+    write_examples,
+)
+from src.extraction.processing import PositionIndex, pgns2moves
+from src.extraction.tokens import (
+    MoveVocabulary,
+    write_token_shard,
+    write_token_shards,
+)
+
+from .testing import test_games_dict
+
+
+def _write_store(directory) -> PositionIndex:
+    pgns = ["1. e4 e5 2. Nf3 1-0", "", "1. d4 0-1"] + [
+        game["data"]["pgn"].replace("\\n", " ") for game in test_games_dict
+    ]
+    moves = pgns2moves(pgns)
+    write_token_shards(
+        moves, MoveVocabulary.from_moves(moves), directory, games_per_shard=2
+    )
+
+    positions = PositionIndex.from_games(
+        moves, np.arange(len(pgns)) % 2 == 0, seed=0, n_positions=12
+    )
+    write_examples(positions, directory)
+
+    return positions
+
+
+def test_example_store_matches_positions(tmp_path):
+    positions = _write_store(tmp_path)
+    store = ExampleStore(tmp_path)
+
+    assert len(store) == len(positions)
+    for i in range(len(store)):
+        context, target = store[i]
+        decoded = store.vocabulary.decode(context).tolist()
+
+        assert decoded == ["<BOG>", *positions.context(i).tolist()]
+        assert store.vocabulary.tokens[target] == (positions.target(i) or "<EOG>")
+
+
+def test_example_store_batches(tmp_path):
+    _write_store(tmp_path)
+    store = ExampleStore(tmp_path)
+
+    seen = []
+    for contexts, lengths, targets in store.batches(4, shuffle=True, seed=1):
+        assert contexts.dtype == np.uint16
+        assert contexts.shape[0] == lengths.size == targets.size <= 4
+
+        for context, length, target in zip(contexts, lengths, targets):
+            assert (context[length:] == store.vocabulary.pad_id).all()
+            seen.append((tuple(context[:length]), target))
+
+    expected = [(tuple(context), target) for context, target in store]
+    assert sorted(seen) == sorted(expected)
+
+    contexts, lengths, _ = next(store.batches(len(store), max_length=3))
+    assert contexts.shape[1] <= 3
+    for i, (context, length) in enumerate(zip(contexts, lengths)):
+        assert np.array_equal(context[:length], store[i][0][-3:])
+
+
+def test_example_store_writer_matches_write_examples(tmp_path):
+    positions = _write_store(tmp_path / "whole")
+    whole = ExampleStore(tmp_path / "whole")
+
+    # The same games, written as a stream of batches of two games
+    assert not example_store_exists(tmp_path / "streamed")
+    writer = ExampleStoreWriter(tmp_path / "streamed", whole.vocabulary)
+
+    n_examples = 0
+    for start in range(0, len(positions.moves), 2):
+        in_batch = (positions.game_indices >= start) & (
+            positions.game_indices < start + 2
+        )
+        batch = PositionIndex(
+            positions.moves.slice(start, 2),
+            positions.game_indices[in_batch] - start,
+            positions.plies[in_batch],
+        )
+        n_examples += writer.write_batch(batch)
+
+    assert not example_store_exists(tmp_path / "streamed")
+    writer.finish()
+
+    streamed = ExampleStore(tmp_path / "streamed")
+    assert example_store_exists(tmp_path / "streamed")
+    assert len(streamed) == n_examples == len(whole)
+    for (context, target), (expected_context, expected_target) in zip(streamed, whole):
+        assert np.array_equal(context, expected_context)
+        assert target == expected_target
+
+
+def test_example_store_writer_resumes_safely(tmp_path):
+    positions = _write_store(tmp_path / "whole")
+    vocabulary = ExampleStore(tmp_path / "whole").vocabulary
+
+    writer = ExampleStoreWriter(tmp_path / "streamed", vocabulary)
+    n_examples = writer.write_batch(positions)
+    writer.finish()
+
+    # A crash between the token shard and its examples leaves a dangling shard
+    ids, offsets = vocabulary.encode(positions.moves)
+    write_token_shard(ids, offsets, tmp_path / "streamed", 1)
+    assert len(ExampleStore(tmp_path / "streamed")) == n_examples
+
+    # Appending reopens the store, and overwrites the dangling shard
+    writer = ExampleStoreWriter(tmp_path / "streamed", vocabulary)
+    assert writer.n_shards == 1
+    assert not example_store_exists(tmp_path / "streamed")
+
+    other_vocabulary = MoveVocabulary(vocabulary.tokens[:-1])
+    with pytest.raises(ValueError, match="another vocabulary"):
+        ExampleStoreWriter(tmp_path / "streamed", other_vocabulary)
@@ -0,0 +1,525 @@
+import asyncio
+import re
+import time
+
+import pandas as pd
+import pytest
+
+from src.extraction.cache import ResponseCache
+from src.extraction.client import HttpClient
+from src.extraction.extraction import GameScrapper, PlayerGames, infer_game_type
+from src.extraction.game_index import GameIndex, normalize_movetext
+from src.extraction.listing import parse_listing_page
+from src.extraction.players import PlayerCache
+from src.extraction.processing import read_game_data
+from src.extraction.rate_limiter import RateLimiter, parse_retry_after
+from src.extraction.storage import (
+    GameDataWriter,
+    append_partition,
+    read_dataset,
+    replace_dataset,
+)
+
+from .testing import make_listing_page, test_listing_pages
+
+
+class FakeClient:
+    """Serves synthetic chessgames.com pages and records the requested URLs"""
+
+    def __init__(self, pages: dict[int, list]) -> None:
+        self.pages = pages
+        self.requested = []
+        self.revalidated = []
+
+    def get(self, url: str, revalidate: bool = False) -> bytes:
+        self.requested.append(url)
+        if revalidate:
+            self.revalidated.append(url)
+
+        page_number = re.search("page=([0-9]+)", url)
+
+        if page_number is None:
+            return b'<a href="/perl/chessplayer?pid=1">Player</a>'
+
+        page_number = int(page_number.groups()[0])
+        html = make_listing_page(page_number, len(self.pages), self.pages[page_number])
+        return html.encode()
+
+    async def get_async(self, url: str, revalidate: bool = False) -> str:
+        return self.get(url, revalidate=revalidate).decode()
+
+
+@pytest.fixture
+def fake_client():
+    return FakeClient(test_listing_pages)
+
+
+@pytest.fixture
+def client():
+    return HttpClient(user_agent="test-agent", limit_per_host=4)
+
+
+def test_client_session_is_pooled(client: HttpClient):
+    session = client.session
+    adapter = session.get_adapter("https://www.chessgames.com")
+
+    assert session is client.session
+    assert session.headers["User-Agent"] == "test-agent"
+    assert adapter._pool_maxsize == 4
+    client.close()
+
+
+def test_client_async_session_reused_within_loop(client: HttpClient):
+    async def open_sessions():
+        first = client.async_session
+        second = client.async_session
+        limit = first.connector.limit_per_host
+        await client.close_async()
+        return first is second, limit
+
+    same_session, limit = asyncio.run(open_sessions())
+
+    assert same_session
+    assert limit == 4
+
+
+def test_client_closes_the_session_of_a_previous_loop(client: HttpClient):
+    async def open_session():
+        return client.async_session
+
+    async def reopen_session():
+        session = client.async_session
+        await client.close_async()
+        return session
+
+    first = asyncio.run(open_session())
+    second = asyncio.run(reopen_session())
+
+    assert first is not second
+    assert first.closed and second.closed
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [(None, None), ("3", 3.0), (" 10 ", 10.0), ("not a date", None)],
+)
+def test_parse_retry_after(header, expected):
+    assert parse_retry_after(header) == expected
+
+
+def test_rate_limiter_paces_requests():
+    limiter = RateLimiter(rate=50.0, burst=1)
+
+    async def send_requests():
+        start = time.monotonic()
+        for _ in range(6):
+            async with limiter:
+                pass
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(send_requests())
+
+    # The first request uses the initial token, the other five wait 1/50s each
+    assert elapsed >= 5 / 50 * 0.9
+
+
+def test_rate_limiter_backoff_uses_retry_after_or_exponential_delay():
+    limiter = RateLimiter(rate=10.0, backoff_base=0.5, backoff_max=3.0)
+
+    assert limiter.backoff(retry_after=0.01) == 0.01
+    assert limiter.backoff(attempt=1) == 1.0
+    assert limiter.backoff(attempt=10) == 3.0
+
+
+def test_rate_limiter_spaces_requests_after_backoff():
+    limiter = RateLimiter(rate=2.0, max_concurrency=8)
+    limiter.backoff(retry_after=10)
+
+    waits = [limiter._reserve() for _ in range(8)]
+
+    assert waits[0] >= 10
+    assert all(later > earlier for earlier, later in zip(waits, waits[1:]))
+    assert waits[-1] - waits[0] == pytest.approx(7 / 2.0, abs=0.01)
+
+
+def test_client_retries_throttled_requests(client: HttpClient):
+    class FakeResponse:
+        def __init__(self, status_code, content):
+            self.status_code = status_code
+            self.content = content
+            self.headers = {"Retry-After": "0"}
+            self.encoding = None
+
+    responses = [
+        FakeResponse(429, b""),
+        FakeResponse(503, b""),
+        FakeResponse(200, b"ok"),
+    ]
+
+    class FakeSession:
+        def get(self, url, headers, timeout):
+            return responses.pop(0)
+
+    client.rate_limiter = RateLimiter(rate=100.0)
+    client._session = FakeSession()
+
+    assert client.get("https://www.chessgames.com") == b"ok"
+    assert responses == []
+
+
+def test_parse_listing_page_returns_rows_links_and_page_count():
+    html = make_listing_page(
+        2, 7, [("11", "Carlsen,  M", "A", 2012), ("12", "B", "", 2013)]
+    )
+    listing = parse_listing_page(html.encode())
+
+    assert listing.page_numbers == 7
+    assert listing.links == ["/perl/chessgame?gid=11", "/perl/chessgame?gid=12"]
+    assert listing.games.columns.tolist() == [
+        "Game",
+        "Result",
+        "Moves",
+        "Year",
+        "Event/Locale",
+        "Opening",
+    ]
+    assert listing.games["Game"].tolist() == ["1. Carlsen, M vs A", "2. B vs"]
+    assert listing.games["Year"].tolist() == ["2012", "2013"]
+
+
+@pytest.mark.parametrize(
+    "max_year,min_year,expected_gids",
+    [
+        (None, None, ["41", "42", "31", "32", "21", "22", "11", "12"]),
+        (2024, 2014, ["41", "42", "31", "32", "21", "22"]),
+        (2016, 2014, ["31", "21", "22"]),
+    ],
+)
+def test_get_player_games_sync_and_async_match(
+    fake_client, max_year, min_year, expected_gids
+):
+    player = PlayerGames("Carlsen", client=fake_client)
+    sync_games = player.get_player_games(max_year=max_year, min_year=min_year)
+
+    async_games = asyncio.run(
+        player.get_player_games_async(max_year=max_year, min_year=min_year, window=3)
+    )
+
+    assert sync_games["gid"].tolist() == expected_gids
+    assert async_games["gid"].tolist() == expected_gids
+    assert (sync_games["is_white"] == async_games["is_white"]).all()
+
+
+def test_get_page_games_async_pages_join_like_a_crawl(fake_client):
+    player = PlayerGames("Carlsen", client=fake_client)
+    expected = player.get_player_games(max_year=2016, min_year=2014)
+
+    async def crawl_pages():
+        pages = await asyncio.gather(
+            *[
+                player.get_page_games_async(page_number, 2016, 2014)
+                for page_number in range(player.page_numbers, 0, -1)
+            ]
+        )
+        return [games_df for games_df, _ in pages], [stop for _, stop in pages]
+
+    pages_games, stops = asyncio.run(crawl_pages())
+    assert stops == [False, False, False, True]
+
+    games = player.join_pages(
+        [games_df for games_df in pages_games if not games_df.empty]
+    )
+    assert games["gid"].tolist() == expected["gid"].tolist()
+
+
+def test_get_player_games_stops_before_older_pages(fake_client):
+    player = PlayerGames("Carlsen", client=fake_client)
+    player.get_player_games(max_year=2024, min_year=2016)
+
+    # Page 1 is only read once, to find the number of pages
+    assert sum("page=1&" in url for url in fake_client.requested) == 1
+
+
+@pytest.fixture
+def cache(tmp_path):
+    response_cache = ResponseCache(tmp_path / "cache", max_bytes=10)
+    yield response_cache
+    response_cache.close()
+
+
+def test_cache_ttl_by_url_class(cache: ResponseCache):
+    assert cache.ttl("https://www.chessgames.com/nodejs/game/viewGamePGN?gid=1") is None
+    assert cache.ttl("https://www.chessgames.com/perl/chess.pl?page=1&pid=1") == 86400
+
+
+def test_cache_shares_bodies_and_evicts_least_recently_used(cache: ResponseCache):
+    cache.store("https://a", b"12345", etag='"a"')
+    cache.store("https://b", b"12345")
+    assert cache.size == 5
+
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.lookup("https://a").etag == '"a"'
+    cache.store("https://c", b"abcdefgh")
+
+    assert cache.lookup("https://b") is None
+    assert cache.lookup("https://c").body == b"abcdefgh"
+    assert cache.size == 8
+
+
+def test_client_revalidates_stale_responses(client: HttpClient, tmp_path):
+    url = "https://www.chessgames.com/perl/chess.pl?page=1&pid=1"
+    sent_headers = []
+
+    class FakeResponse:
+        def __init__(self, status_code, content, headers):
+            self.status_code = status_code
+            self.content = content
+            self.headers = headers
+            self.encoding = "utf-8"
+
+    responses = [
+        FakeResponse(200, b"listing", {"ETag": '"v1"'}),
+        FakeResponse(304, b"", {}),
+        FakeResponse(200, b"new listing", {"ETag": '"v2"'}),
+    ]
+
+    class FakeSession:
+        def get(self, url, headers, timeout):
+            sent_headers.append(headers)
+            return responses.pop(0)
+
+    client._session = FakeSession()
+    client.cache = ResponseCache(tmp_path / "cache", ttls=(("chess\\.pl", 0),))
+
+    assert client.get(url) == b"listing"
+    assert client.get(url) == b"listing"
+    assert sent_headers == [{}, {"If-None-Match": '"v1"'}]
+
+    # A URL that never expires is served without any request
+    client.cache.ttls = []
+    client.cache.default_ttl = None
+    assert client.get(url) == b"listing"
+    assert len(sent_headers) == 2
+
+    # Unless the page is known to change
+    assert client.get(url, revalidate=True) == b"new listing"
+    assert sent_headers[-1] == {"If-None-Match": '"v1"'}
+    client.cache.close()
+
+
+def test_get_player_games_only_crawls_new_games(fake_client):
+    player = PlayerGames("Carlsen", client=fake_client)
+    new_games = player.get_player_games(
+        max_year=None, min_year=None, known_gids={"21", "22", "31"}
+    )
+
+    assert new_games["gid"].tolist() == ["41", "42", "32"]
+    assert not any("page=2&" in url for url in fake_client.requested)
+
+
+def test_refreshed_listing_ignores_cached_page_count(fake_client, tmp_path):
+    player_cache = PlayerCache(tmp_path / "players.sqlite")
+    player_cache.add_pid("Carlsen", 1)
+    player_cache.add_page_numbers(1, 3)
+
+    # A cached count hides the newest page, which is the last one
+    player = PlayerGames("Carlsen", client=fake_client, player_cache=player_cache)
+    assert player.page_numbers == 3
+
+    player = PlayerGames(
+        "Carlsen", client=fake_client, player_cache=player_cache, refresh_listing=True
+    )
+    new_games = player.get_player_games(
+        max_year=None, min_year=None, known_gids={"31", "32"}
+    )
+
+    assert new_games["gid"].tolist() == ["41", "42"]
+    assert fake_client.revalidated == fake_client.requested
+    assert player_cache.page_numbers(1) == 4
+    player_cache.close()
+
+
+def test_append_partition_keeps_single_file_readable(tmp_path):
+    path = tmp_path / "player_games.parquet"
+    pd.DataFrame({"gid": ["1"], "year": pd.Series([2023], dtype="int32")}).to_parquet(
+        path
+    )
+
+    append_partition(pd.DataFrame({"gid": ["2"], "year": [2024]}), path)
+    games = read_dataset(path)
+
+    assert path.is_dir()
+    assert sorted(games["gid"]) == ["1", "2"]
+    assert games["year"].dtype == "int32"
+    assert sorted(pd.read_parquet(path)["gid"]) == ["1", "2"]
+
+
+def test_replace_dataset_after_incremental_appends(tmp_path):
+    path = tmp_path / "player_games.parquet"
+    replace_dataset(pd.DataFrame({"gid": ["1"]}), path)
+    append_partition(pd.DataFrame({"gid": ["2"]}), path)
+
+    # A full run replaces the folder left by the incremental one
+    replace_dataset(pd.DataFrame({"gid": ["3", "4"]}), path)
+
+    assert sorted(read_dataset(path)["gid"]) == ["3", "4"]
+    assert [p.name for p in tmp_path.iterdir()] == ["player_games.parquet"]
+
+    file_path = tmp_path / "file.parquet"
+    pd.DataFrame({"gid": ["5"]}).to_parquet(file_path)
+    replace_dataset(pd.DataFrame({"gid": ["6"]}), file_path)
+    assert read_dataset(file_path)["gid"].tolist() == ["6"]
+
+
+def test_game_data_writer_checkpoints_batches(tmp_path):
+    path = tmp_path / "game_data.parquet"
+    data = {"pgn": "1. e4 e5", "game_type": None, "fens": [("a", "b")], "result": "*"}
+
+    writer = GameDataWriter(path)
+    writer.write_batch([("1", data), ("2", data)])
+    writer.write_batch([])
+
+    # A restarted run sees the games of the previous one
+    resumed_writer = GameDataWriter(path)
+    assert resumed_writer.completed_gids == {"1", "2"}
+    resumed_writer.write_batch([("3", data)])
+
+    games = pd.read_parquet(path)
+    assert sorted(games["gid"]) == ["1", "2", "3"]
+    assert games["data"].iloc[0]["fens"].tolist()[0].tolist() == ["a", "b"]
+
+
+def test_game_data_writer_rebuilds_missing_manifest(tmp_path):
+    path = tmp_path / "game_data.parquet"
+    pd.DataFrame({"gid": ["7"], "data": [{"pgn": "", "result": "*"}]}).to_parquet(path)
+
+    assert GameDataWriter(path).completed_gids == {"7"}
+    assert (path / GameDataWriter.MANIFEST_NAME).read_text() == "7\n"
+
+
+def test_game_data_stores_packed_moves_next_to_older_partitions(tmp_path):
+    path = tmp_path / "game_data.parquet"
+    pd.DataFrame(
+        {"gid": ["1"], "data": [{"pgn": "1. e4", "fens": [("a", "b")], "result": "*"}]}
+    ).to_parquet(path)
+
+    data = {"pgn": "1. d4", "game_type": None, "fens": None, "result": "*"}
+    GameDataWriter(path).write_batch([("2", {**data, "packed_moves": [795, 3899]})])
+
+    # Written when the packed moves were called "moves"
+    pd.DataFrame({"gid": ["3"], "data": [data], "moves": [[796]]}).to_parquet(
+        path / "part-legacy.parquet"
+    )
+
+    games = read_game_data(path).sort_values("gid")
+    assert "moves" not in games.columns
+    assert games["packed_moves"].iloc[0] is None
+    assert games["packed_moves"].iloc[1].tolist() == [795, 3899]
+    assert games["packed_moves"].iloc[2].tolist() == [796]
+    assert games["fens"].iloc[0].tolist()[0].tolist() == ["a", "b"]
+    assert games["fens"].iloc[1] is None
+
+
+def test_normalize_movetext_ignores_annotations():
+    plain = "1. e4 e5 2. Nf3 Nc6 1-0"
+    annotated = "1. e4! {best by test} e5 (1... c5 2. Nf3 (2. c3)) 2. Nf3 $1 Nc6?! 1-0"
+
+    assert normalize_movetext(plain) == "e4 e5 Nf3 Nc6"
+    assert normalize_movetext(annotated) == normalize_movetext(plain)
+    assert normalize_movetext("1. e4 e5\n2. Nf3 Nc6\r\n1-0") == "e4 e5 Nf3 Nc6"
+
+
+def test_game_index_finds_duplicates_across_runs(tmp_path):
+    game_index = GameIndex(tmp_path / "game_index.sqlite")
+
+    # Nothing is recorded until the games are added
+    assert game_index.resolve(["1", "2"], ["1. e4 e5 1-0", "1. e4 {!} e5 1-0"]) == [
+        "1",
+        "1",
+    ]
+    assert "1" not in game_index
+
+    assert game_index.add_many(["1", "2", "3"], ["1. e4 e5", "1. e4 e5", None]) == [
+        "1",
+        "1",
+        "3",
+    ]
+    game_index.close()
+
+    # A later run, e.g. for another player, sees the games of the previous one
+    game_index = GameIndex(tmp_path / "game_index.sqlite")
+    assert len(game_index) == 3
+    assert "2" in game_index
+    assert game_index.add("4", "1. e4 e5 1/2-1/2") == "1"
+    assert game_index.add("2") == "1"
+    assert game_index.canonical_gids(["2", "3", "5"]) == {"2": "1", "3": "3"}
+
+    # Games without moves are never matched with each other
+    assert game_index.add_many(["6", "7"], ["1-0", "{forfeit} 1-0"]) == ["6", "7"]
+
+
+class FakeGameClient:
+    """Serves the PGN and the page of one game and records the requested URLs"""
+
+    def __init__(self, headers: str) -> None:
+        self.headers = headers
+        self.requested = []
+
+    async def get_async(self, url: str) -> str:
+        self.requested.append(url)
+
+        if "viewGamePGN" in url:
+            return f'{self.headers}\n[Result "1-0"]\n\n1. e4 e5 2. Qh5 Nc6 1-0\n'
+
+        return '<div class="gametype_cs_notice">This game is type: CLASSICAL. </div>'
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"Event": "World Blitz Championship", "TimeControl": "5400+30"}, "BLITZ"),
+        ({"Event": "Armageddon tiebreak"}, "ARMAGEDDON"),
+        ({"TimeControl": "40/7200:3600"}, "CLASSICAL"),
+        ({"TimeControl": "900+10"}, "RAPID"),
+        ({"TimeControl": "600"}, "BLITZ"),
+        ({"TimeControl": "180+7"}, "BLITZ"),
+        ({"TimeControl": "601"}, "RAPID"),
+        ({"TimeControl": "3599"}, "RAPID"),
+        ({"TimeControl": "3600"}, "CLASSICAL"),
+        ({"TimeControl": "3000+10"}, "CLASSICAL"),
+        ({"TimeControl": "180+2"}, "BLITZ"),
+        ({"TimeControl": "60"}, "BULLET"),
+        ({"Event": "Tata Steel", "TimeControl": "?"}, None),
+        ({}, None),
+    ],
+)
+def test_infer_game_type(headers, expected):
+    assert infer_game_type(headers) == expected
+
+
+def test_scrape_only_requests_what_the_fields_need():
+    # The game type is in the headers, so the game page is never fetched
+    client = FakeGameClient('[Event "Rapid Open"]')
+    game = asyncio.run(GameScrapper("1", client=client).scrape())
+
+    assert game["game_type"] == "RAPID"
+    assert game["result"] == "1-0"
+    assert game["fens"][0][0].startswith("rnbqkbnr/pppppppp/8/8/4P3")
+    assert len(client.requested) == 1
+
+    # Without a time control in the headers the game page is the fallback
+    client = FakeGameClient('[Event "Tata Steel"]')
+    game = asyncio.run(GameScrapper("1", client=client).scrape(["pgn", "game_type"]))
+
+    assert game == {"pgn": "1. e4 e5 2. Qh5 Nc6 1-0", "game_type": "CLASSICAL"}
+    assert len(client.requested) == 2
+
+    # A game type alone only needs the game page
+    client = FakeGameClient('[Event "Rapid Open"]')
+    game = asyncio.run(GameScrapper("1", client=client).scrape(["game_type"]))
+
+    assert game == {"game_type": "CLASSICAL"}
+    assert ["chessgame?gid=1" in url for url in client.requested] == [True]
+
+    with pytest.raises(ValueError):
+        asyncio.run(GameScrapper("1", client=client).scrape(["eco"]))
@@ -0,0 +1,93 @@
+import asyncio
+import io
+
+import chess.pgn
+import pytest
+
+from src.extraction.extraction import GameScrapper
+from src.extraction.fens import (
+    decode_move,
+    encode_move,
+    encode_moves,
+    iter_fens,
+    iter_games_fens,
+    moves_to_fens,
+    pair_fens,
+    replay_fens,
+)
+
+from .testing import test_games_dict
+
+
+@pytest.fixture
+def games():
+    return [
+        chess.pgn.read_game(io.StringIO(game["data"]["pgn"].replace("\\n", "\n")))
+        for game in test_games_dict
+    ]
+
+
+def naive_fens(game: chess.pgn.Game) -> list[str]:
+    fens = []
+    node = game
+    while node.next():
+        node = node.next()
+        fens.append(node.board().fen())
+    return fens
+
+
+def test_iter_fens_matches_replaying_every_node(games):
+    for game in games:
+        assert list(iter_fens(game)) == naive_fens(game)
+
+
+@pytest.mark.parametrize("notation,n_fields", [("fen", 6), ("epd", 4), ("board", 1)])
+def test_iter_fens_notations(games, notation, n_fields):
+    fens = list(iter_fens(games[0], notation=notation))
+
+    assert all(len(fen.split(" ")) == n_fields for fen in fens)
+
+
+def test_iter_games_fens_yields_one_list_per_game(games):
+    games_fens = list(iter_games_fens(games))
+
+    assert [len(fens) for fens in games_fens] == [101, 39]
+
+
+def test_convert_to_fen_pairs_positions(games):
+    game_scrapper = GameScrapper("1")
+    game_scrapper._game = games[1]
+
+    fens = asyncio.run(game_scrapper.convert_to_fen())
+
+    # Positions as they were stored before: every node but the last, without the root
+    node, expected = games[1], []
+    while node.next():
+        expected.append(node.board().fen())
+        node = node.next()
+    expected = pair_fens(expected[1:])
+
+    assert fens == expected
+    assert len(fens) == 19
+
+
+def test_encode_move_round_trips_special_moves():
+    moves = [
+        chess.Move.from_uci("e1g1"),
+        chess.Move.from_uci("a7a8q"),
+        chess.Move.from_uci("h2h1n"),
+        chess.Move.null(),
+    ]
+
+    for move in moves:
+        assert encode_move(move) < 2**16
+        assert decode_move(encode_move(move)) == move
+
+
+@pytest.mark.parametrize("notation", ["fen", "epd", "board"])
+def test_replay_fens_matches_iter_fens(games, notation):
+    for game in games:
+        codes = encode_moves(game)
+
+        assert list(replay_fens(codes, notation)) == list(iter_fens(game, notation))
+        assert moves_to_fens(codes) == pair_fens(list(iter_fens(game))[:-1])
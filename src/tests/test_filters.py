@@ -0,0 +1,49 @@
+import pytest
+
+from src.extraction.filters import HeaderFilter, pgn_headers
+
+test_pgn_text = """[Event "Norway Chess"]
+[White "Carlsen, Magnus"]
+[Black "Nakamura, Hikaru"]
+[WhiteElo "2830"]
+[BlackElo "?"]
+[TimeControl "7200+10"]
+[PlyCount "61"]
+
+1. e4 e5 2. Nf3 {[%clk 1:59:00]} Nc6 1-0
+"""
+
+
+def test_pgn_headers_only_reads_tag_lines():
+    headers = pgn_headers(test_pgn_text)
+
+    assert headers["White"] == "Carlsen, Magnus"
+    assert headers["BlackElo"] == "?"
+    assert "%clk" not in "".join(headers)
+    assert len(headers) == 7
+
+
+@pytest.mark.parametrize(
+    "header_filter, expected",
+    [
+        (HeaderFilter(), True),
+        (HeaderFilter(events_out="(blitz)|(norway)"), False),
+        (HeaderFilter(game_types=("CLASSICAL",)), True),
+        (HeaderFilter(game_types=("BLITZ", "RAPID")), False),
+        # The unknown BlackElo does not drop the game
+        (HeaderFilter(min_elo=2800), True),
+        (HeaderFilter(min_elo=2850), False),
+        (HeaderFilter(variants=("chess960",)), False),
+        (HeaderFilter(min_plies=61), True),
+        (HeaderFilter(min_plies=62), False),
+    ],
+)
+def test_header_filter(header_filter, expected):
+    assert header_filter.keep(test_pgn_text) is expected
+
+
+def test_header_filter_keeps_games_missing_the_tags():
+    header_filter = HeaderFilter(game_types=("CLASSICAL",), min_elo=2000, min_plies=40)
+
+    assert header_filter({"Event": "Casual game"})
+    assert not header_filter({"Variant": "Chess960"})
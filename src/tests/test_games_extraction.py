@@ -0,0 +1,85 @@
+import asyncio
+
+import pandas as pd
+
+from entrypoints.games_extraction import read_stored_games, scrape_games
+from extraction.client import HttpClient
+from extraction.game_index import GameIndex
+from extraction.processing import read_game_data
+from extraction.rate_limiter import RateLimiter
+from extraction.storage import GameDataWriter, append_partition
+
+PGN_TEXT = '[Event "Rapid Open"]\n[Result "1-0"]\n\n1. e4 e5 2. Qh5 Nc6 1-0\n'
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: str) -> None:
+        self.status = status
+        self.headers = {"Retry-After": "0"}
+        self.body = body.encode()
+
+    async def __aenter__(self) -> "FakeResponse":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def read(self) -> bytes:
+        return self.body
+
+    def get_encoding(self) -> str:
+        return "utf-8"
+
+
+class ThrottledSession:
+    """Answers every request for game 1 with 429, and serves game 2"""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self.requested = []
+
+    def get(self, url: str, headers: dict[str, str]) -> FakeResponse:
+        self.requested.append(url)
+
+        if url.endswith("gid=1"):
+            return FakeResponse(429, "<html>Too many requests</html>")
+
+        return FakeResponse(200, PGN_TEXT)
+
+
+def test_throttled_games_are_not_written_nor_checkpointed(tmp_path):
+    client = HttpClient(rate_limiter=RateLimiter(rate=1000.0, max_retries=2))
+    session = ThrottledSession()
+    writer = GameDataWriter(tmp_path / "game_data.parquet")
+    game_index = GameIndex(tmp_path / "game_index.sqlite")
+
+    async def scrape():
+        client._async_session = session
+        client._loop = asyncio.get_running_loop()
+        return await scrape_games(["1", "2"], client, writer, game_index=game_index)
+
+    assert asyncio.run(scrape()) == 1
+    assert sum(url.endswith("gid=1") for url in session.requested) == 3
+
+    # Game 1 is left for the next run to fetch again
+    assert read_game_data(tmp_path / "game_data.parquet")["gid"].tolist() == ["2"]
+    assert writer.completed_gids == {"2"}
+    assert "1" not in game_index and "2" in game_index
+    game_index.close()
+
+
+def test_stored_games_are_tagged_with_their_player(tmp_path):
+    path = tmp_path / "player_games.parquet"
+    assert read_stored_games(path).empty
+
+    # Games written before the player column, then games of an incremental run
+    pd.DataFrame({"gid": ["1"], "year": [2023]}).to_parquet(path)
+    append_partition(
+        pd.DataFrame({"gid": ["2"], "year": [2024], "player": ["Magnus Carlsen"]}),
+        path,
+    )
+
+    stored_games = read_stored_games(path).sort_values("gid")
+    assert stored_games["gid"].tolist() == ["1", "2"]
+    assert stored_games["player"].tolist() == [None, "Magnus Carlsen"]
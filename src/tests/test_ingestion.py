@@ -0,0 +1,96 @@
+import bz2
+import gzip
+
+import pytest
+
+from src.extraction.filters import pgn_headers
+from src.extraction.ingestion import (
+    INGESTED_GID_BIT,
+    ingested_gid,
+    open_pgn,
+    parse_ingested_batch,
+    parse_pgn_chunks,
+    split_games,
+)
+
+test_pgn_file = """[Event "Rapid Open"]
+[Result "1-0"]
+
+1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6
+4. Qxf7# 1-0
+
+% skipped by readers
+[Event "Tata Steel"]
+[TimeControl "40/7200:3600"]
+[Result "1/2-1/2"]
+
+1. d4 d5 1/2-1/2
+[Event "Broken"]
+[Result "*"]
+
+*
+"""
+
+
+@pytest.mark.parametrize(
+    "suffix, opener", [("", open), (".gz", gzip.open), (".bz2", bz2.open)]
+)
+def test_open_pgn_reads_plain_and_compressed_files(tmp_path, suffix, opener):
+    path = tmp_path / f"games.pgn{suffix}"
+
+    with opener(path, "wt") as f:
+        f.write(test_pgn_file)
+
+    with open_pgn(path) as pgn_file:
+        assert pgn_file.read() == test_pgn_file
+
+
+def test_open_pgn_reads_zstandard_archives(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "games.pgn.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(test_pgn_file.encode()))
+
+    with open_pgn(path) as pgn_file:
+        assert pgn_file.read() == test_pgn_file
+
+
+def test_split_games_cuts_at_headers_after_movetext():
+    games = list(split_games(test_pgn_file.splitlines(keepends=True)))
+
+    assert len(games) == 3
+    assert games[0].startswith('[Event "Rapid Open"]')
+    assert games[0].rstrip().endswith("4. Qxf7# 1-0")
+    assert "% skipped" not in games[0]
+    assert pgn_headers(games[1]) == {
+        "Event": "Tata Steel",
+        "TimeControl": "40/7200:3600",
+        "Result": "1/2-1/2",
+    }
+
+
+def test_parse_pgn_chunks_keeps_chunk_order():
+    games = [
+        (str(i), pgn_text)
+        for i, pgn_text in enumerate(split_games(test_pgn_file.splitlines(True)))
+    ]
+    chunks = [games[:1], games[1:]]
+
+    rows = list(parse_pgn_chunks(chunks, max_workers=2, max_pending=1))
+
+    # The game without moves is left out
+    assert rows == [parse_ingested_batch(games[:1]), parse_ingested_batch(games[1:])]
+    assert [[gid for gid, _ in chunk] for chunk in rows] == [["0"], ["1"]]
+
+    gid, data = rows[1][0]
+    assert data["game_type"] == "CLASSICAL"
+    assert data["result"] == "1/2-1/2"
+    assert data["fens"] is None
+    assert len(data["packed_moves"]) == 2
+
+
+def test_ingested_gids_are_stable_int64_out_of_the_scraped_range():
+    gids = [ingested_gid("games.pgn", n) for n in range(1, 1001)]
+
+    assert len(set(gids)) == len(gids)
+    assert gids[0] == ingested_gid("games.pgn", 1) != ingested_gid("other.pgn", 1)
+    assert all(INGESTED_GID_BIT <= int(gid) < 2**63 for gid in gids)
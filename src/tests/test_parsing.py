@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from src.extraction.extraction import GameScrapper
+from src.extraction.fens import moves_to_fens
+from src.extraction.parsing import PgnParsePool, parse_pgn, parse_pgn_batch
+
+from .testing import test_games_dict
+
+test_pgn_texts = [
+    '[Event "Test"]\n[Result "{result}"]\n\n{pgn}\n'.format(
+        result=game["data"]["result"].replace("\\/", "/"),
+        pgn=game["data"]["pgn"].replace("\\n", "\n").replace("\\/", "/"),
+    )
+    for game in test_games_dict
+]
+
+
+@pytest.mark.parametrize("pgn_text", test_pgn_texts)
+def test_parse_pgn_matches_game_scrapper(pgn_text):
+    game_scrapper = GameScrapper("1")
+    game_scrapper._pgn_text = pgn_text
+
+    parsed_game = parse_pgn(pgn_text, with_fens=True)
+    fens = asyncio.run(game_scrapper.convert_to_fen())
+
+    assert parsed_game["pgn"] == asyncio.run(game_scrapper.pgn)
+    assert parsed_game["result"] == asyncio.run(game_scrapper.result)
+    assert parsed_game["fens"] == fens
+    assert moves_to_fens(parse_pgn(pgn_text)["packed_moves"]) == fens
+
+
+def test_parse_pgn_batch_returns_none_for_invalid_games():
+    parsed_games = parse_pgn_batch(["", test_pgn_texts[1]])
+
+    assert parsed_games[0] is None
+    assert parsed_games[1]["result"] == "1/2-1/2"
+
+
+def test_parse_pgn_returns_none_without_moves():
+    # An error page reads as a game without moves
+    assert parse_pgn("<html>Too many requests</html>") is None
+    assert parse_pgn('[Result "1-0"]\n\n1-0\n') is None
+    assert parse_pgn_batch(["<html></html>"]) == [None]
+
+
+def test_parse_pgn_rejects_games_set_up_from_a_position():
+    setup_pgn_text = (
+        '[SetUp "1"]\n[FEN "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"]\n[Result "*"]\n\n'
+        "1. e4 Kd7 2. Kd2 *\n"
+    )
+
+    with pytest.raises(ValueError):
+        parse_pgn(setup_pgn_text, with_fens=True)
+
+    with pytest.raises(ValueError):
+        parse_pgn(setup_pgn_text)
+
+    # Batches skip the game, and a FEN header with the initial position is fine
+    assert parse_pgn_batch([setup_pgn_text]) == [None]
+    assert parse_pgn(
+        '[FEN "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"]\n\n1. e4 *\n'
+    )["packed_moves"]
+
+
+def test_parse_pool_chunks_games():
+    async def parse_all(parse_pool):
+        return await asyncio.gather(
+            *[parse_pool.parse(pgn_text) for pgn_text in test_pgn_texts * 3]
+        )
+
+    with PgnParsePool(max_workers=2, chunk_size=4) as parse_pool:
+        parsed_games = asyncio.run(parse_all(parse_pool))
+
+    assert [game["result"] for game in parsed_games] == ["1-0", "1/2-1/2"] * 3
+    assert parsed_games[0] == parse_pgn(test_pgn_texts[0])
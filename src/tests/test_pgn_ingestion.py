@@ -0,0 +1,35 @@
+from entrypoints.pgn_ingestion import ingest_pgn_file
+from extraction.game_index import GameIndex
+from extraction.processing import read_game_data
+from extraction.storage import GameDataWriter
+
+MONTHS = {
+    "2024-01": '[Event "January"]\n[Result "1-0"]\n\n1. e4 e5 2. Qh5 Nc6 1-0\n\n'
+    '[Event "January"]\n[Result "0-1"]\n\n1. f3 e5 2. g4 Qh4# 0-1\n',
+    "2024-02": '[Event "February"]\n[Result "1-0"]\n\n1. d4 d5 2. c4 e6 1-0\n\n'
+    '[Event "February"]\n[Result "1/2-1/2"]\n\n1. c4 c5 2. Nc3 Nc6 1/2-1/2\n',
+}
+
+
+def test_files_with_the_same_name_are_ingested_separately(tmp_path):
+    writer = GameDataWriter(tmp_path / "game_data.parquet")
+    game_index = GameIndex(tmp_path / "game_index.sqlite")
+
+    for month, pgn_text in MONTHS.items():
+        (tmp_path / month).mkdir()
+        (tmp_path / month / "games.pgn").write_text(pgn_text)
+
+    n_written = [
+        ingest_pgn_file(
+            tmp_path / month / "games.pgn", writer, game_index, max_workers=1
+        )
+        for month in MONTHS
+    ]
+
+    assert n_written == [2, 2]
+    assert len(set(read_game_data(tmp_path / "game_data.parquet")["gid"])) == 4
+
+    # The same file, wherever it is, is only ingested once
+    (tmp_path / "2024-01" / "games.pgn").rename(tmp_path / "games.pgn")
+    assert ingest_pgn_file(tmp_path / "games.pgn", writer, game_index) == 0
+    game_index.close()
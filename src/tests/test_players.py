@@ -0,0 +1,85 @@
+import asyncio
+
+from rapidfuzz import fuzz
+
+from src.extraction.extraction import PlayerGames, resolve_players
+from src.extraction.players import PlayerCache, score_names
+
+from .test_extraction import FakeClient
+from .testing import test_listing_pages
+
+
+def test_score_names_scores_each_name_once():
+    name_scores = {"Carlsen": -1.0}
+    scores = score_names(
+        "Magnus Carlsen", ["Carlsen", "Nakamura", "Nakamura"], name_scores
+    )
+
+    # Memoized names are not scored again
+    nakamura_score = fuzz.token_set_ratio("Nakamura", "Magnus Carlsen")
+    assert scores.tolist() == [-1.0, nakamura_score, nakamura_score]
+    assert set(name_scores) == {"Carlsen", "Nakamura"}
+
+
+def test_is_white_matches_per_game_scoring(tmp_path):
+    player_cache = PlayerCache(tmp_path / "players.sqlite")
+    player = PlayerGames(
+        "Carlsen", client=FakeClient(test_listing_pages), player_cache=player_cache
+    )
+    games = player.get_player_games(max_year=None, min_year=None)
+
+    expected = [
+        fuzz.token_set_ratio(white, "Carlsen") > fuzz.token_set_ratio(black, "Carlsen")
+        for white, black in games["players"]
+    ]
+    assert games["is_white"].tolist() == expected
+    assert games["is_white"].sum() == 4
+
+    # A later run starts from the names scored by this one
+    player_cache.close()
+    player_cache = PlayerCache(tmp_path / "players.sqlite")
+    assert player_cache.name_scores("Carlsen") == player.name_scores
+    assert player_cache.name_scores("Nakamura") == {}
+
+
+class RosterClient(FakeClient):
+    """Listing pages of every player, and no search result for unknown players"""
+
+    def get(self, url: str, revalidate: bool = False) -> bytes:
+        if "search=Nobody" in url:
+            self.requested.append(url)
+            return b"<p>No results</p>"
+
+        return super().get(url, revalidate=revalidate)
+
+
+def test_resolve_players_reuses_cache_and_first_page(tmp_path):
+    client = RosterClient(test_listing_pages)
+    player_cache = PlayerCache(tmp_path / "players.sqlite")
+
+    players = asyncio.run(
+        resolve_players(["Carlsen", "Nobody", "Carlsen"], client, player_cache)
+    )
+    assert players["Nobody"] is None
+    assert players["Carlsen"].pid == 1
+    assert len(client.requested) == 3
+
+    # The first page, fetched for the page count, is not fetched again by the crawl
+    client.requested.clear()
+    games = asyncio.run(
+        players["Carlsen"].get_player_games_async(max_year=None, min_year=None)
+    )
+    assert len(games) == 8
+    assert not any("page=1&" in url for url in client.requested)
+
+    # A later run takes no request to resolve the player
+    client.requested.clear()
+    players = asyncio.run(resolve_players(["Carlsen"], client, player_cache))
+    assert players["Carlsen"].page_numbers == len(test_listing_pages)
+    assert client.requested == []
+
+    # Page counts expire, pids are kept
+    player_cache.page_count_ttl = 0
+    asyncio.run(resolve_players(["Carlsen"], client, player_cache))
+    assert len(client.requested) == 1
+    assert "page=1&pid=1" in client.requested[0]
@@ -1,17 +1,36 @@
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
+from src.extraction.extraction import PlayerGames
+from src.extraction.game_index import GameIndex
+from src.extraction.parsing import parse_pgn
 from src.extraction.processing import (
+    PositionIndex,
+    expand_game_data,
     get_positions_with_black,
+    get_positions_sharded,
     get_positions_with_white,
+    iter_game_data,
+    iter_merged_data,
+    iter_positions,
     merge_data,
+    moves2array,
     pgn2array,
+    pgns2moves,
+    read_game_data,
+    sample_moves,
+    sample_moves_batch,
 )
+from src.extraction.storage import GameDataWriter, write_games
 
+from .test_extraction import FakeClient
 from .testing import (
     test_black_positions,
     test_games_dict,
+    test_listing_pages,
     test_pgns,
     test_player_games,
     test_white_positions,
@@ -37,6 +56,24 @@ def test_merge_data(player_games: pd.DataFrame, games_data: pd.DataFrame):
     assert player_games["result"].isna().sum() == 0
 
 
+def test_merge_data_accepts_flat_game_data(
+    player_games: pd.DataFrame, games_data: pd.DataFrame, tmp_path
+):
+    games_data_copy = games_data.copy()
+    games_data.to_parquet(tmp_path / "game_data.parquet")
+
+    nested = merge_data(player_games, games_data)
+    flat = merge_data(player_games, expand_game_data(games_data))
+    from_parquet = merge_data(
+        player_games, read_game_data(tmp_path / "game_data.parquet")
+    )
+
+    pd.testing.assert_frame_equal(nested, flat)
+    assert from_parquet["pgn"].tolist() == nested["pgn"].tolist()
+    assert not nested["pgn"].str.contains("1-0|1/2-1/2").any()
+    pd.testing.assert_frame_equal(games_data, games_data_copy)
+
+
 @pytest.mark.parametrize("test_pgn,expected", test_pgns)
 def test_pgn2array(test_pgn, expected):
     pgn_padded = pgn2array(test_pgn)
@@ -48,6 +85,24 @@ def test_pgn2array(test_pgn, expected):
     assert all(len(move) == 2 for move in pgn_padded)
 
 
+def test_pgns2moves_matches_pgn2array():
+    pgns = [pgn for pgn, _ in test_pgns] + [
+        game["data"]["pgn"].replace("\\n", " ") for game in test_games_dict
+    ]
+    moves = pgns2moves(pd.Series(pgns))
+
+    assert len(moves) == len(pgns)
+    for i, pgn in enumerate(pgns):
+        assert (moves2array(moves, i) == pgn2array(pgn)).all()
+
+
+def test_pgns2moves_handles_missing_pgns():
+    moves = pgns2moves(["1. e4 e5 2. Nf3 1-0", "", None, "1. d4 12... d5"])
+
+    assert moves.value_lengths().to_pylist() == [3, 0, 0, 2]
+    assert moves.values.to_pylist() == ["e4", "e5", "Nf3", "d4", "d5"]
+
+
 @pytest.mark.parametrize(
     "input_data,expected",
     test_white_positions,
@@ -84,3 +139,237 @@ def test_get_positions_with_black(input_data, expected):
         )
 
         assert position[1] == expected_position[1]
+
+
+def test_position_index_matches_position_functions():
+    pgns = [pgn for (pgn, _), _ in test_white_positions + test_black_positions] + [
+        game["data"]["pgn"].replace("\\n", " ") for game in test_games_dict
+    ]
+    is_white = np.arange(len(pgns)) % 2 == 0
+    gids = np.arange(len(pgns)) + 1000
+    positions = PositionIndex.from_games(
+        pgns2moves(pgns), is_white, seed=0, n_positions=12, game_keys=gids
+    )
+
+    expected = []
+    for pgn, white, gid in zip(pgns, is_white, gids):
+        get_positions = get_positions_with_white if white else get_positions_with_black
+        expected += get_positions(pgn, seed=0, n_positions=12, game_key=gid)
+
+    assert len(positions) == len(expected)
+    for position, expected_position in zip(positions, expected, strict=True):
+        assert np.array_equal(position[0], expected_position[0])
+        assert position[1] == expected_position[1]
+
+
+def test_sample_moves_batch_matches_single_game_streams():
+    n_moves = np.array([40, 0, 40, 7, 120])
+    gids = np.array([1044621, 1044622, 1044623, 1044624, 1044625])
+    game_indices, samples = sample_moves_batch(n_moves, 42, 12, gids)
+
+    assert not (game_indices == 1).any()
+    for i, (game_moves, gid) in enumerate(zip(n_moves, gids)):
+        expected = sample_moves(game_moves, 42, 12, gid)
+        assert np.array_equal(samples[game_indices == i], expected)
+        assert (expected < game_moves).all()
+        assert np.array_equal(expected, np.unique(expected))
+
+
+def test_sample_moves_batch_does_not_depend_on_the_batch():
+    n_moves = np.array([40, 40, 55, 3])
+    gids = np.array([11, 12, 13, 14])
+    game_indices, samples = sample_moves_batch(n_moves, 7, 12, gids)
+
+    # Sampling a shard, in another order, draws the same moves for each game
+    shard_indices, shard_samples = sample_moves_batch(
+        n_moves[2::-1], 7, 12, gids[2::-1]
+    )
+    for i in range(3):
+        assert np.array_equal(
+            shard_samples[shard_indices == 2 - i], samples[game_indices == i]
+        )
+
+    # Games of the same length get their own draws, and the seed changes all of them
+    assert not np.array_equal(samples[game_indices == 0], samples[game_indices == 1])
+    _, reseeded = sample_moves_batch(n_moves, 8, 12, gids)
+    assert not np.array_equal(reseeded, samples)
+
+
+def test_streaming_matches_merge_data(
+    player_games: pd.DataFrame, games_data: pd.DataFrame, tmp_path
+):
+    # One row group per game, so every game is its own batch
+    pq.write_table(
+        pa.Table.from_pandas(games_data),
+        tmp_path / "game_data.parquet",
+        row_group_size=1,
+    )
+    player_games.to_parquet(tmp_path / "player_games.parquet")
+
+    batches = list(iter_game_data(tmp_path / "game_data.parquet", batch_size=1))
+    assert len(batches) == 2
+    assert batches[0].columns.tolist() == ["gid", "pgn"]
+
+    merged = merge_data(player_games, games_data)
+    streamed = list(
+        iter_merged_data(
+            tmp_path / "player_games.parquet",
+            tmp_path / "game_data.parquet",
+            batch_size=1,
+        )
+    )
+    streamed = pd.concat(streamed, ignore_index=True)
+
+    assert streamed["gid"].tolist() == merged["gid"].tolist()
+    assert streamed["pgn"].tolist() == merged["pgn"].tolist()
+    assert streamed["is_white"].tolist() == merged["is_white"].tolist()
+
+    # Sampling batch by batch gives the positions of sampling everything at once
+    expected = PositionIndex.from_games(
+        pgns2moves(merged["pgn"]),
+        merged["is_white"].to_numpy(),
+        seed=0,
+        game_keys=merged["gid"].astype(int).to_numpy(),
+    )
+    streamed_positions = [
+        position
+        for _, positions in iter_positions(
+            iter_merged_data(
+                tmp_path / "player_games.parquet",
+                tmp_path / "game_data.parquet",
+                batch_size=1,
+            ),
+            seed=0,
+        )
+        for position in positions
+    ]
+
+    assert len(streamed_positions) == len(expected)
+    for position, expected_position in zip(streamed_positions, expected):
+        assert np.array_equal(position[0], expected_position[0])
+        assert position[1] == expected_position[1]
+
+
+def test_get_positions_sharded_reports_failed_games():
+    pgns = [pgn for (pgn, _), _ in test_white_positions + test_black_positions]
+    games = pd.DataFrame(
+        {
+            "gid": [str(100 + i) for i in range(len(pgns) + 2)],
+            "pgn": pgns + [None, "1. e4 1-0"],
+            "is_white": [i % 2 == 0 for i in range(len(pgns) + 2)],
+        }
+    )
+    games.loc[len(games) - 1, "gid"] = "not a gid"
+
+    results = get_positions_sharded(games, seed=0, shard_size=3, max_workers=2)
+
+    assert [result.shard for result in results] == [0, 1, 2]
+    errors = [gid for result in results for gid, _ in result.errors]
+    assert errors == [str(100 + len(pgns)), "not a gid"]
+    assert all(isinstance(e, Exception) for result in results for _, e in result.errors)
+
+    positions = [item for result in results for item in result.positions]
+    assert [gid for gid, _ in positions] == games["gid"].tolist()[: len(pgns)]
+
+    for (gid, game_positions), pgn, white in zip(
+        positions, games["pgn"], games["is_white"]
+    ):
+        get_positions = get_positions_with_white if white else get_positions_with_black
+        expected = get_positions(pgn, seed=0, game_key=int(gid))
+
+        assert len(game_positions) == len(expected)
+        for position, expected_position in zip(game_positions, expected):
+            assert np.array_equal(position[0], expected_position[0])
+            assert position[1] == expected_position[1]
+
+
+def test_merge_data_shares_duplicate_games(
+    player_games: pd.DataFrame, games_data: pd.DataFrame, tmp_path
+):
+    game_index = GameIndex(tmp_path / "game_index.sqlite")
+    game_index.add_many(["1", "2"], games_data["data"].map(lambda data: data["pgn"]))
+
+    # Game 3 is game 1 seen from another player, and was only stored once
+    game_index.add("3", games_data["data"].iloc[0]["pgn"])
+    other_player_games = pd.DataFrame(
+        [{**test_player_games[0], "gid": "3", "is_white": True}]
+    )
+    all_player_games = pd.concat([player_games, other_player_games], ignore_index=True)
+
+    merged = merge_data(all_player_games, games_data, game_index=game_index)
+
+    assert merged["gid"].tolist() == ["1", "2", "3"]
+    assert merged["is_white"].tolist() == [False, True, True]
+    assert merged["pgn"].iloc[2] == merged["pgn"].iloc[0]
+    assert merge_data(all_player_games, games_data).shape[0] == 2
+
+
+def test_duplicate_games_survive_the_pipeline(player_games: pd.DataFrame, tmp_path):
+    pgn_texts = {
+        game["gid"]: '[Result "{result}"]\n\n{pgn}\n'.format(
+            result=game["data"]["result"].replace("\\/", "/"),
+            pgn=game["data"]["pgn"].replace("\\n", "\n").replace("\\/", "/"),
+        )
+        for game in test_games_dict
+    }
+    writer = GameDataWriter(tmp_path / "game_data.parquet")
+    game_index = GameIndex(tmp_path / "game_index.sqlite")
+
+    scraped = [(gid, parse_pgn(pgn_text)) for gid, pgn_text in pgn_texts.items()]
+    assert write_games(scraped, writer, game_index, dedup_movetext=True) == 2
+
+    # Game 9, listed for another player, is game 1 again: only the index records it
+    game_9 = ("9", parse_pgn(pgn_texts["1"]))
+    assert write_games([game_9], writer, game_index, dedup_movetext=True) == 0
+
+    # Without movetext matching (the default) it is stored, and not matched later
+    game_10 = ("10", parse_pgn(pgn_texts["1"]))
+    assert write_games([game_10], writer, game_index) == 1
+    assert game_index.resolve(["10"], [game_10[1]["pgn"]]) == ["10"]
+    assert game_index.canonical_gids(["9", "10"]) == {"9": "1", "10": "10"}
+
+    other_player_games = player_games.loc[player_games["gid"] == "1"].assign(gid="9")
+    all_player_games = pd.concat([player_games, other_player_games], ignore_index=True)
+    all_player_games.to_parquet(tmp_path / "player_games.parquet")
+
+    games_data = read_game_data(tmp_path / "game_data.parquet")
+    merged = merge_data(all_player_games, games_data, game_index=game_index)
+    streamed = pd.concat(
+        iter_merged_data(
+            tmp_path / "player_games.parquet",
+            tmp_path / "game_data.parquet",
+            batch_size=1,
+            game_index=game_index,
+        )
+    )
+
+    assert sorted(merged["gid"]) == ["1", "2", "9"]
+    assert sorted(streamed["gid"]) == ["1", "2", "9"]
+    assert (
+        merged.set_index("gid").loc["9", "pgn"]
+        == merged.set_index("gid").loc["1", "pgn"]
+    )
+    assert sorted(merge_data(all_player_games, games_data)["gid"]) == ["1", "2"]
+
+
+def test_merge_data_keeps_listing_columns_apart_from_packed_moves(tmp_path):
+    # The columns of player_games.parquet, as the listing pages give them
+    player = PlayerGames("Carlsen", client=FakeClient(test_listing_pages))
+    player_games = player.get_player_games(max_year=None, min_year=None)
+    player_games = player_games.drop(columns="links")
+    assert "moves" in player_games.columns
+
+    writer = GameDataWriter(tmp_path / "game_data.parquet")
+    writer.write_batch(
+        [
+            (gid, parse_pgn(f'[Result "1-0"]\n\n1. e4 e5 2. Nf3 1-0\n'))
+            for gid in player_games["gid"]
+        ]
+    )
+
+    merged = merge_data(player_games, read_game_data(tmp_path / "game_data.parquet"))
+
+    assert len(merged) == len(player_games)
+    assert not any(column.endswith(("_x", "_y")) for column in merged.columns)
+    assert merged["moves"].tolist() == player_games["moves"].tolist()
+    assert all(len(packed_moves) == 3 for packed_moves in merged["packed_moves"])
@@ -0,0 +1,60 @@
+import asyncio
+
+from src.extraction.scheduling import FairQueue, run_jobs
+
+
+def test_fair_queue_interleaves_owners():
+    async def drain():
+        queue = FairQueue()
+        for i in range(4):
+            queue.put("a", f"a{i}")
+        queue.put("b", "b0")
+        queue.put("c", "c0")
+        queue.put("b", "b1")
+
+        items = []
+        while len(queue):
+            _, item = await queue.get()
+            items.append(item)
+            queue.task_done()
+
+        await queue.join()
+        return items
+
+    assert asyncio.run(drain()) == ["a0", "b0", "c0", "a1", "b1", "a2", "a3"]
+
+
+def test_run_jobs_limits_concurrency_and_runs_queued_jobs():
+    running, max_running, done, errors = 0, 0, [], []
+
+    async def crawl():
+        queue = FairQueue()
+
+        async def job(owner, i):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+
+            if i == 3:
+                raise ValueError(owner)
+
+            # Jobs may queue more work for their owner
+            if i == 0:
+                queue.put(owner, lambda: job(owner, 10))
+
+            done.append((owner, i))
+
+        for owner in ["a", "b", "c"]:
+            for i in range(5):
+                queue.put(owner, lambda owner=owner, i=i: job(owner, i))
+
+        await run_jobs(queue, 2, on_error=lambda owner, e: errors.append(owner))
+
+    asyncio.run(crawl())
+
+    assert max_running == 2
+    assert sorted(errors) == ["a", "b", "c"]
+    assert len(done) == 15
+    assert {(owner, 10) for owner in "abc"} <= set(done)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from src.extraction.processing import pgns2moves
+from src.extraction.tokens import (
+    MoveVocabulary,
+    TokenShards,
+    write_token_shards,
+)
+
+from .testing import test_games_dict
+
+
+def _test_pgns() -> list[str]:
+    return ["1. e4 e5 2. Nf3 1-0", "", "1. d4 d5 0-1"] + [
+        game["data"]["pgn"].replace("\\n", " ") for game in test_games_dict
+    ]
+
+
+def test_vocabulary_encode_decode():
+    moves = pgns2moves(_test_pgns())
+    vocabulary = MoveVocabulary.from_moves(moves)
+
+    assert vocabulary.tokens[:4] == ["<PAD>", "<BOG>", "<EOG>", "<UNK>"]
+    assert vocabulary.pad_id == 0
+
+    ids, offsets = vocabulary.encode(moves)
+    assert ids.dtype == np.uint16
+    assert offsets.size == len(moves) + 1
+
+    for i, game_moves in enumerate(moves.to_pylist()):
+        game_ids = ids[offsets[i] : offsets[i + 1]]
+        assert vocabulary.decode(game_ids).tolist() == ["<BOG>", *game_moves, "<EOG>"]
+
+
+def test_vocabulary_unknown_moves_and_save(tmp_path):
+    vocabulary = MoveVocabulary.from_moves(pgns2moves(["1. e4 e5 2. e4 1-0"]), 2)
+    assert vocabulary.tokens[4:] == ["e4"]
+
+    ids, _ = vocabulary.encode(pgns2moves(["1. e4 c5 1-0"]))
+    assert ids.tolist() == [vocabulary.bog_id, 4, vocabulary.unk_id, vocabulary.eog_id]
+
+    vocabulary.save(tmp_path / "vocabulary.txt")
+    assert MoveVocabulary.load(tmp_path / "vocabulary.txt").tokens == vocabulary.tokens
+
+
+def test_token_shards_round_trip(tmp_path):
+    moves = pgns2moves(_test_pgns())
+    vocabulary = MoveVocabulary.from_moves(moves)
+    ids, offsets = vocabulary.encode(moves)
+
+    paths = write_token_shards(moves, vocabulary, tmp_path, games_per_shard=2)
+    assert len(paths) == (len(moves) + 1) // 2
+
+    shards = TokenShards(tmp_path)
+    assert len(shards) == len(moves)
+    assert shards.vocabulary.tokens == vocabulary.tokens
+    assert all(isinstance(tokens, np.memmap) for tokens in shards.tokens)
+
+    for i in range(len(moves)):
+        assert np.array_equal(shards[i], ids[offsets[i] : offsets[i + 1]])
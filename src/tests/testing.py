@@ -384,3 +384,45 @@ test_games_dict = [
         },
     },
 ]
+
+
+def make_listing_page(
+    page_number: int, n_pages: int, games: list[tuple[str, str, str, int]]
+) -> str:
+    """Builds a chessgames.com listing page with the same table layout as the site
+
+    :param page_number: number of the page
+    :param n_pages: total number of pages of the player
+    :param games: (gid, white, black, year) of each game in the page
+    :return: html of the page
+    """
+    rows = "".join(
+        f'<tr><td><a href="/perl/chessgame?gid={gid}">{i + 1}. {white} vs {black}</a></td>'
+        f"<td>1-0</td><td>40</td><td>{year}</td><td>Event {gid}</td><td>B00 Opening</td></tr>"
+        for i, (gid, white, black, year) in enumerate(games)
+    )
+
+    return (
+        "<html><body>"
+        '<table><tr><td><a href="/perl/chessplayer?pid=1">Player</a></td></tr></table>'
+        "<table>"
+        f"<tr><td>page {page_number} of {n_pages}; games 1-{len(games)} of {len(games)}</td></tr>"
+        "<tr><td>"
+        "<table><tr><td>Navigation</td></tr></table>"
+        "<table>"
+        "<tr><td>Game</td><td>Result</td><td>Moves</td><td>Year</td><td>Event/Locale</td><td>Opening</td></tr>"
+        f"{rows}"
+        "</table>"
+        "</td></tr>"
+        "</table>"
+        "</body></html>"
+    )
+
+
+# Listing pages of a player, oldest games first like on chessgames.com
+test_listing_pages = {
+    1: [("11", "Carlsen", "A", 2012), ("12", "B", "Carlsen", 2013)],
+    2: [("21", "C", "Carlsen", 2014), ("22", "Carlsen", "D", 2015)],
+    3: [("31", "Carlsen", "E", 2016), ("32", "F", "Carlsen", 2017)],
+    4: [("41", "G", "Carlsen", 2023), ("42", "Carlsen", "H", 2024)],
+}